@@ -0,0 +1,166 @@
+"""
+Benchmark: torch vs ONNX Runtime inference backends for both models.
+
+Each backend runs in a fresh subprocess (so RSS is that backend's alone) that
+loads the scorer and the enhancer and reports:
+
+  load s        model construction time
+  score p50 ms  single-image forward pass latency (batch 1)
+  score img/s   throughput at --batch-size
+  enhance s     one --enhance-size input through the tile engine
+  rss MB        resident set after the runs, and its peak
+
+Parity against the torch backend is checked on fixed inputs: the largest
+scaled-score difference must stay within --score-tolerance and the enhanced
+image within --max-pixel-diff levels, otherwise the run fails (exit 1).
+The ONNX graphs must already exist (python -m models.onnx_export).
+
+Usage:
+    python benchmarks/backend_benchmark.py --backends torch onnx --threads 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def parity_diffs(
+    scores: Sequence[float],
+    reference_scores: Sequence[float],
+    pixels: np.ndarray,
+    reference_pixels: np.ndarray
+) -> Tuple[float, int]:
+    """Largest scaled-score and enhanced-pixel differences of a backend from the torch backend"""
+    score_diff = max(abs(a - b) for a, b in zip(scores, reference_scores))
+    pixel_diff = int(np.abs(pixels.astype(np.int16) - reference_pixels.astype(np.int16)).max())
+    return score_diff, pixel_diff
+
+def parity_failures(backend: str, score_diff: float, pixel_diff: int, score_tolerance: float, max_pixel_diff: int) -> List[str]:
+    """Why a backend fails the parity gate (empty when it passes)"""
+    failures = []
+    if score_diff > score_tolerance:
+        failures.append(f"{backend} scores differ from torch by {score_diff:.4f} (> {score_tolerance})")
+    if pixel_diff > max_pixel_diff:
+        failures.append(f"{backend} enhanced pixels differ from torch by {pixel_diff} (> {max_pixel_diff})")
+    return failures
+
+def child(args):
+    sys.path.insert(0, BACKEND_DIR)
+    import torch
+    from models.score_inference import ImageScoreDetector
+    from models.image_enhancer import ImageEnhancer
+    from benchmarks.response_memory import current_rss_mb, peak_rss_mb
+
+    torch.set_num_threads(args.threads or torch.get_num_threads())
+    start = time.perf_counter()
+    scorer = ImageScoreDetector(model_path=args.scorer, device="cpu", cache=None, backend=args.child)
+    enhancer = ImageEnhancer(
+        model_path=args.enhancer, device="cpu", scale=args.scale, num_block=args.num_block, cache=None,
+        tile_workers=1, backend=args.child
+    )
+    load_time = time.perf_counter() - start
+
+    generator = torch.Generator().manual_seed(0)
+    parity_batch = torch.randint(0, 256, (8, 224, 224, 3), dtype=torch.uint8, generator=generator)
+    scores = [result["scaled_score"] for result in scorer._predict_batch(parity_batch)]
+
+    single = parity_batch[:1]
+    scorer._predict_batch(single)
+    latencies = []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        scorer._predict_batch(single)
+        latencies.append(time.perf_counter() - start)
+
+    batch = parity_batch[:1].repeat(args.batch_size, 1, 1, 1)
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        scorer._predict_batch(batch)
+    score_rate = args.batch_size * args.rounds / (time.perf_counter() - start)
+
+    image = np.random.RandomState(0).randint(0, 256, (args.enhance_size, args.enhance_size, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    enhanced = enhancer.tile_engine.enhance(image)
+    enhance_time = time.perf_counter() - start
+    np.save(os.path.join(args.output_dir, f"{args.child}.npy"), np.asarray(enhanced))
+
+    print(json.dumps({
+        "load": load_time,
+        "score_p50_ms": float(np.median(latencies)) * 1000,
+        "score_rate": score_rate,
+        "enhance": enhance_time,
+        "rss": current_rss_mb(),
+        "peak_rss": peak_rss_mb(),
+        "scores": scores
+    }))
+
+def run_backend(args, backend, output_dir):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", backend, "--output-dir", output_dir,
+        "--scorer", args.scorer, "--enhancer", args.enhancer, "--scale", str(args.scale),
+        "--num-block", str(args.num_block), "--enhance-size", str(args.enhance_size),
+        "--batch-size", str(args.batch_size), "--rounds", str(args.rounds), "--threads", str(args.threads)
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(f"{backend}: failed\n{completed.stderr.strip().splitlines()[-1]}")
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main(args):
+    failures = []
+    results = {}
+    print(f"{'backend':<9}{'load s':>8}{'score p50 ms':>14}{'score img/s':>13}{'enhance s':>11}{'rss MB':>9}{'peak MB':>9}")
+    with tempfile.TemporaryDirectory(prefix="backends-") as output_dir:
+        for backend in args.backends:
+            result = run_backend(args, backend, output_dir)
+            if result is None:
+                failures.append(f"{backend} backend did not run")
+                continue
+            results[backend] = result
+            print(f"{backend:<9}{result['load']:>8.2f}{result['score_p50_ms']:>14.1f}{result['score_rate']:>13.1f}"
+                  f"{result['enhance']:>11.2f}{result['rss']:>9.0f}{result['peak_rss']:>9.0f}")
+
+        if "torch" in results:
+            reference = np.load(os.path.join(output_dir, "torch.npy"))
+            for backend, result in results.items():
+                if backend == "torch":
+                    continue
+                score_diff, pixel_diff = parity_diffs(
+                    result["scores"], results["torch"]["scores"],
+                    np.load(os.path.join(output_dir, f"{backend}.npy")), reference
+                )
+                print(f"{backend} vs torch: max score diff {score_diff:.4f}, max pixel diff {pixel_diff}")
+                failures += parity_failures(backend, score_diff, pixel_diff, args.score_tolerance, args.max_pixel_diff)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=("torch", "onnx"))
+    parser.add_argument("--scorer", default="ml_models/best_model_3.pth")
+    parser.add_argument("--enhancer", default="ml_models/RealESRGAN_x4plus_anime_6B.pth")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--num-block", type=int, default=6)
+    parser.add_argument("--enhance-size", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--score-tolerance", type=float, default=0.01, help="Maximum scaled-score difference from torch")
+    parser.add_argument("--max-pixel-diff", type=int, default=2, help="Maximum enhanced pixel difference from torch")
+    parser.add_argument("--output-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--child", choices=("torch", "onnx"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+    else:
+        sys.exit(main(args))
@@ -0,0 +1,117 @@
+"""
+Benchmark: cold start of each model, split into import, weight load and first inference.
+
+Every case runs in a fresh subprocess so imports and page cache effects are
+those of a newly started worker (run twice to compare cold vs warm page cache):
+
+  legacy       previous path: resnet18(pretrained=True) / RealESRGANer, plain torch.load
+  checkpoint   architecture only + torch.load(mmap=True, weights_only=True)
+  torchscript  TorchScript artifact saved by a previous start (MODEL_ARTIFACT_DIR)
+
+The scorer's legacy case needs the ImageNet weights in the torch hub cache or
+network access; without them it is reported as failed, which is the point.
+
+Usage:
+    python benchmarks/cold_start.py --scorer ml_models/best_model_3.pth --enhancer ml_models/RealESRGAN_x4plus_anime_6B.pth
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def child(args):
+    sys.path.insert(0, BACKEND_DIR)
+    timings = {}
+
+    start = time.perf_counter()
+    import torch
+    if args.model == "scorer":
+        from models.score_inference import ImageScoreDetector
+    else:
+        from models.image_enhancer import ImageEnhancer
+    timings["import"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if args.model == "scorer" and args.mode == "legacy":
+        import torch.nn as nn
+        from torchvision import models
+        network = models.resnet18(pretrained=True)
+        network.fc = nn.Linear(network.fc.in_features, 1)
+        network.load_state_dict(torch.load(args.path, map_location="cpu"))
+        network.eval()
+    elif args.model == "scorer":
+        network = ImageScoreDetector(model_path=args.path, device="cpu", artifact_dir=args.artifact_dir).model
+    elif args.mode == "legacy":
+        from basicsr.archs.rrdbnet_arch import RRDBNet
+        from realesrgan import RealESRGANer
+        rrdb = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=args.num_block, num_grow_ch=32, scale=args.scale)
+        network = RealESRGANer(scale=args.scale, model_path=args.path, model=rrdb, tile=256, tile_pad=10, pre_pad=0, half=False).model
+    else:
+        network = ImageEnhancer(
+            model_path=args.path, device="cpu", scale=args.scale, num_block=args.num_block, artifact_dir=args.artifact_dir
+        ).model
+    timings["weight_load"] = time.perf_counter() - start
+
+    size = 224 if args.model == "scorer" else args.enhance_size
+    example = torch.rand(1, 3, size, size)
+    start = time.perf_counter()
+    with torch.no_grad():
+        network(example)
+    timings["first_inference"] = time.perf_counter() - start
+
+    print(json.dumps(timings))
+
+def run_case(args, model, path, mode, artifact_dir):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", model, "--path", path, "--mode", mode,
+        "--scale", str(args.scale), "--num-block", str(args.num_block), "--enhance-size", str(args.enhance_size)
+    ]
+    if artifact_dir:
+        command += ["--artifact-dir", artifact_dir]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main(args):
+    print(f"{'model':<10}{'mode':<13}{'import s':>10}{'load s':>9}{'first inf s':>13}{'total s':>9}")
+    with tempfile.TemporaryDirectory(prefix="artifacts-") as artifact_dir:
+        for model, path in (("scorer", args.scorer), ("enhancer", args.enhancer)):
+            if not path:
+                continue
+            for mode in args.modes:
+                if mode == "torchscript":
+                    # A first start writes the artifact; the measured one reuses it
+                    run_case(args, model, path, "checkpoint", artifact_dir)
+                result = run_case(args, model, path, mode, artifact_dir if mode == "torchscript" else None)
+                if result is None:
+                    print(f"{model:<10}{mode:<13}{'failed':>41}")
+                    continue
+                total = sum(result.values())
+                print(f"{model:<10}{mode:<13}{result['import']:>10.2f}{result['weight_load']:>9.2f}"
+                      f"{result['first_inference']:>13.2f}{total:>9.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scorer", default="ml_models/best_model_3.pth")
+    parser.add_argument("--enhancer", default="ml_models/RealESRGAN_x4plus_anime_6B.pth")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--num-block", type=int, default=6)
+    parser.add_argument("--enhance-size", type=int, default=64, help="Side of the first enhancement input")
+    parser.add_argument("--modes", nargs="+", default=["legacy", "checkpoint", "torchscript"],
+                        choices=("legacy", "checkpoint", "torchscript"))
+    parser.add_argument("--mode", default="checkpoint", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--artifact-dir", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--child", choices=("scorer", "enhancer"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        args.model = args.child
+        child(args)
+    else:
+        main(args)
@@ -0,0 +1,67 @@
+"""
+Benchmark: encode time vs output size for the enhanced-image output formats.
+
+Encodes a photo-like RGB array (as after a 4x upscale of a 512px input) with
+each setting the API exposes, plus the previous default (PNG optimize=True),
+and prints the mean encode time and size per setting.
+
+Usage:
+    python benchmarks/encoder_benchmark.py --size 2048 --repeat 3
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models.image_encoder import OutputEncoding, ImageEncoder
+from benchmarks.response_memory import enhanced_output
+
+SETTINGS = [
+    ("png z1", OutputEncoding("png", compress_level=1)),
+    ("png z6 (default)", OutputEncoding("png", compress_level=6)),
+    ("png z9", OutputEncoding("png", compress_level=9)),
+    ("webp lossless", OutputEncoding("webp", lossless=True)),
+    ("webp q80", OutputEncoding("webp", quality=80)),
+    ("jpeg q90", OutputEncoding("jpeg", quality=90)),
+]
+
+def encode_optimized_png(array: np.ndarray) -> bytes:
+    """The encoder used before output settings were configurable"""
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        times.append(time.perf_counter() - start)
+    return value, float(np.mean(times))
+
+def main(args):
+    array = enhanced_output(args.size)
+    encoder = ImageEncoder()
+    raw_mb = array.nbytes / 1e6
+
+    print(f"{args.size}x{args.size} RGB output ({raw_mb:.1f} MB raw), mean of {args.repeat} runs")
+    print(f"{'setting':<22}{'encode ms':>12}{'size MB':>10}{'ratio':>8}")
+
+    rows = [("png optimize (old)", lambda: encode_optimized_png(array))]
+    rows += [(label, lambda encoding=encoding: encoder.encode(array, encoding)) for label, encoding in SETTINGS]
+    for label, fn in rows:
+        encoded, elapsed = timed(fn, args.repeat)
+        size_mb = len(encoded) / 1e6
+        print(f"{label:<22}{elapsed * 1000:>12.0f}{size_mb:>10.2f}{raw_mb / size_mb:>8.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,167 @@
+"""
+Soak test: enhancement latency and RSS stability over many requests.
+
+Each mode runs in a fresh subprocess that sends --requests enhance_sync calls
+(decode, tile engine, PNG encode) cycling through --sizes, so several buffer
+shape classes are in play:
+
+  pooled  output canvases from the enhancer's buffer pool, no forced GC (default)
+  gc      no pool, gc.collect() before and after the tile engine and after
+          encoding, as the enhancer used to do
+
+Reported: p50/p99 request latency, RSS after the first 10% of requests
+(warmup) and at the end, the RSS growth between the two, and the time spent
+in garbage collections (gc.callbacks). The pooled run fails (exit 1) if RSS
+grows by more than --max-rss-growth-mb after warmup.
+
+--stand-in swaps RRDBNet for a nearest-neighbour 4x upsample so the soak
+finishes in a minute or two; the allocation pattern is the same.
+
+Usage:
+    python benchmarks/enhance_soak.py --requests 1000 --sizes 96x96 128x96 160x120 --stand-in
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.response_memory import current_rss_mb
+
+class GcTimer:
+    """Count collections and their total pause through gc.callbacks"""
+
+    def __init__(self):
+        self.collections = 0
+        self.seconds = 0.0
+        self._start = None
+        gc.callbacks.append(self)
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+        elif self._start is not None:
+            self.collections += 1
+            self.seconds += time.perf_counter() - self._start
+
+def synthetic_png(width: int, height: int, seed: int) -> bytes:
+    pixels = np.random.RandomState(seed).randint(0, 256, (height, width, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def child(args):
+    import torch
+    from models.image_enhancer import ImageEnhancer
+    from models.decoded_image import DecodedImage
+
+    enhancer = ImageEnhancer(
+        model_path=args.model,
+        device="cpu",
+        scale=4,
+        cache=None,
+        buffer_pool_mb=args.buffer_pool_mb if args.mode == "pooled" else 0
+    )
+    if args.stand_in:
+        enhancer.tile_engine.model = torch.nn.Upsample(scale_factor=4, mode="nearest")
+    if args.mode == "gc":
+        # The enhancer's former collections around the network and the encode
+        run_tiles = enhancer.tile_engine.enhance
+        encode = enhancer._postprocess_image
+
+        def enhance_collecting(*call_args, **kwargs):
+            gc.collect()
+            output = run_tiles(*call_args, **kwargs)
+            gc.collect()
+            return output
+
+        def encode_collecting(*call_args, **kwargs):
+            data = encode(*call_args, **kwargs)
+            gc.collect()
+            return data
+
+        enhancer.tile_engine.enhance = enhance_collecting
+        enhancer._postprocess_image = encode_collecting
+
+    sizes = [tuple(int(value) for value in size.split("x")) for size in args.sizes]
+    inputs = [synthetic_png(width, height, seed) for seed, (width, height) in enumerate(sizes)]
+
+    gc_timer = GcTimer()
+    warmup = max(1, args.requests // 10)
+    latencies = []
+    rss = []
+    for index in range(args.requests):
+        image = DecodedImage.from_bytes(inputs[index % len(inputs)])
+        start = time.perf_counter()
+        enhancer.enhance_sync(image, "soak.png")
+        latencies.append(time.perf_counter() - start)
+        if index + 1 == warmup:
+            warm_rss = current_rss_mb()
+            gc_timer.collections, gc_timer.seconds = 0, 0.0
+        if (index + 1) % max(1, args.requests // 20) == 0:
+            rss.append(current_rss_mb())
+
+    measured = latencies[warmup:] or latencies
+    print(json.dumps({
+        "p50_ms": float(np.percentile(measured, 50)) * 1000,
+        "p99_ms": float(np.percentile(measured, 99)) * 1000,
+        "warm_rss": warm_rss,
+        "final_rss": current_rss_mb(),
+        "max_rss": max(rss + [warm_rss]),
+        "gc_collections": gc_timer.collections,
+        "gc_ms": gc_timer.seconds * 1000,
+        "pool": enhancer.buffer_pool.get_stats() if enhancer.buffer_pool else None
+    }))
+
+def main(args):
+    failures = []
+    print(f"{'mode':<8}{'p50 ms':>9}{'p99 ms':>9}{'warm MB':>9}{'final MB':>10}{'growth MB':>11}{'gc runs':>9}{'gc ms':>9}")
+    for mode in args.modes:
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--mode", mode, "--model", args.model,
+                   "--requests", str(args.requests), "--buffer-pool-mb", str(args.buffer_pool_mb), "--sizes", *args.sizes]
+        if args.stand_in:
+            command.append("--stand-in")
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{mode:<8}failed (exit {completed.returncode})")
+            failures.append(f"{mode} run did not complete")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        growth = result["final_rss"] - result["warm_rss"]
+        print(f"{mode:<8}{result['p50_ms']:>9.1f}{result['p99_ms']:>9.1f}{result['warm_rss']:>9.0f}{result['final_rss']:>10.0f}"
+              f"{growth:>11.1f}{result['gc_collections']:>9}{result['gc_ms']:>9.0f}")
+        if result["pool"]:
+            pool = result["pool"]
+            print(f"        pool: {pool['buffers']} buffers in {pool['shape_classes']} shape classes, "
+                  f"{pool['pooled_mb']:.0f} MB, {pool['reuses']} reuses, {pool['unpooled']} unpooled")
+        if mode == "pooled" and growth > args.max_rss_growth_mb:
+            failures.append(f"pooled RSS grew {growth:.1f} MB after warmup (> {args.max_rss_growth_mb} MB)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="ml_models/RealESRGAN_x4plus_anime_6B.pth")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--sizes", nargs="+", default=["96x96", "128x96", "160x120"])
+    parser.add_argument("--modes", nargs="+", default=["pooled", "gc"], choices=("pooled", "gc"))
+    parser.add_argument("--buffer-pool-mb", type=float, default=512)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=32)
+    parser.add_argument("--stand-in", action="store_true", help="Use a 4x nearest upsample instead of RRDBNet")
+    parser.add_argument("--mode", default="pooled", help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+    else:
+        sys.exit(main(args))
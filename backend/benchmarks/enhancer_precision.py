@@ -0,0 +1,117 @@
+"""
+Benchmark: enhancer compute precision and memory format across tile sizes.
+
+For each tile size, enhances the same inputs with every combination of
+--precisions (fp32, bf16 autocast) and --memory-formats (contiguous,
+channels_last) and reports latency, throughput and PSNR against the fp32
+contiguous output at that tile size. The fastest setting whose PSNR meets
+--min-psnr is printed at the end, ready for ENHANCE_PRECISION /
+ENHANCE_MEMORY_FORMAT.
+
+As the fidelity gate it fails (exit 1) when a setting listed in --require
+(e.g. bf16:channels_last, the one about to be deployed) falls below
+--min-psnr. Without --images, synthetic photo-like inputs are used.
+
+Usage:
+    python benchmarks/enhancer_precision.py --tile-sizes 128 256 512 --require bf16:channels_last
+"""
+import argparse
+import itertools
+import os
+import sys
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models.image_enhancer import ImageEnhancer
+from models.tile_engine import TileEngine, PRECISIONS, MEMORY_FORMATS, bf16_supported
+from benchmarks.tile_benchmark import load_inputs, run
+
+def psnr(reference: np.ndarray, output: np.ndarray) -> float:
+    mse = np.mean((reference.astype(np.float64) - output.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+def fidelity_failures(
+    fidelity: Dict[Tuple[str, str, int], float],
+    required: Sequence[str],
+    tile_sizes: Sequence[int],
+    min_psnr: float
+) -> List[str]:
+    """Required precision:memory_format settings that fall below min_psnr (or weren't run) at any tile size"""
+    failures = []
+    for setting in required:
+        precision, memory_format = setting.split(":")
+        for tile_size in tile_sizes:
+            quality = fidelity.get((precision, memory_format, tile_size))
+            if quality is None or quality < min_psnr:
+                failures.append(f"{setting} at tile {tile_size}: PSNR {quality} dB below {min_psnr}")
+    return failures
+
+def main(args):
+    inputs = load_inputs(args)
+    height, width = inputs[0].shape[:2]
+    print(f"{len(inputs)} images, {width}x{height}, {os.cpu_count()} cores, native bf16: {bf16_supported()}")
+    print(f"{'tile':>6}{'precision':>11}{'format':>15}{'mean s':>9}{'img/s':>9}{'psnr dB':>10}")
+
+    # The fp32 contiguous run is the reference for every other setting, so it always goes first
+    settings = [("fp32", "contiguous")] + [
+        setting for setting in itertools.product(args.precisions, args.memory_formats) if setting != ("fp32", "contiguous")
+    ]
+    references, fidelity = {}, {}
+    best = None
+    for precision, memory_format in settings:
+        # The network's weight layout follows the memory format, so each setting gets its own copy
+        enhancer = ImageEnhancer(
+            model_path=args.model, device="cpu", scale=args.scale, num_block=args.num_block, cache=None,
+            tile_workers=1, precision=precision, memory_format=memory_format
+        )
+        for tile_size in args.tile_sizes:
+            engine = TileEngine(
+                enhancer.model,
+                scale=enhancer.scale,
+                tile_size=tile_size,
+                tile_pad=enhancer.tile_pad,
+                workers=args.workers,
+                precision=precision,
+                memory_format=memory_format
+            )
+            outputs, latencies, total = run(engine.enhance, inputs)
+            engine.shutdown()
+
+            reference = references.setdefault(tile_size, outputs)
+            quality = min(psnr(a, b) for a, b in zip(reference, outputs))
+            fidelity[(precision, memory_format, tile_size)] = quality
+
+            rate = len(inputs) / total
+            print(f"{tile_size:>6}{precision:>11}{memory_format:>15}{latencies.mean():>9.2f}{rate:>9.2f}{quality:>10.1f}")
+            if quality >= args.min_psnr and (best is None or rate > best[0]):
+                best = (rate, precision, memory_format, tile_size)
+        enhancer.close()
+
+    if best is not None:
+        _, precision, memory_format, tile_size = best
+        print(f"fastest within {args.min_psnr} dB: ENHANCE_PRECISION={precision} "
+              f"ENHANCE_MEMORY_FORMAT={memory_format} (tile {tile_size})")
+
+    failures = fidelity_failures(fidelity, args.require, args.tile_sizes, args.min_psnr)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="ml_models/RealESRGAN_x4plus_anime_6B.pth")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--num-block", type=int, default=6)
+    parser.add_argument("--images", help="Glob of input images (default: synthetic)")
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--count", type=int, default=2)
+    parser.add_argument("--tile-sizes", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--precisions", nargs="+", default=list(PRECISIONS), choices=PRECISIONS)
+    parser.add_argument("--memory-formats", nargs="+", default=list(MEMORY_FORMATS), choices=list(MEMORY_FORMATS))
+    parser.add_argument("--workers", type=int, default=1, help="Tile worker threads")
+    parser.add_argument("--min-psnr", type=float, default=40.0, help="Minimum PSNR (dB) against the fp32 output")
+    parser.add_argument("--require", nargs="*", default=[], help="precision:memory_format settings that must pass")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Load test: /health latency while enhancements are in flight.
+
+Measures /health latency on an idle server, then again while N concurrent
+/process/complete requests are running. With the stages on the models'
+executors the two distributions should be close; a blocked event loop shows
+up as multi-second p99 latency under load. The run fails (exit 1) when the
+p99 under load exceeds the idle p99 by more than --max-p99-increase-ms.
+
+Run the server with RESULT_CACHE_MAX_MB=0 so repeated uploads of the same
+image are not served from the result cache.
+
+Usage (server must already be running):
+    python benchmarks/health_latency.py --url http://localhost:8000 --image sample.jpg --concurrency 4
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def probe_health(client, url, stop, interval):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(f"{url}/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+async def probe_loop(stop, interval):
+    """How late each sleep(interval) wakes up: the event loop's own responsiveness, without a server"""
+    delays = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        delays.append(max(0.0, time.perf_counter() - start - interval))
+    return delays
+
+def responsiveness_failure(idle: List[float], loaded: List[float], max_increase_ms: float) -> Optional[str]:
+    """Why the p99 latency under load is too far above the idle p99, or None if it isn't"""
+    if not loaded:
+        return "no latency samples under load"
+    increase_ms = (percentile(loaded, 99) - (percentile(idle, 99) if idle else 0.0)) * 1000
+    if increase_ms > max_increase_ms:
+        return f"p99 under load is {increase_ms:.1f}ms above idle (> {max_increase_ms}ms)"
+    return None
+
+async def run_enhancement(client, url, image_bytes, filename):
+    files = {"file": (filename, image_bytes, "image/jpeg")}
+    response = await client.post(f"{url}/process/complete", files=files)
+    response.raise_for_status()
+
+def report(label, latencies):
+    print(
+        f"{label:<24} n={len(latencies):<5} "
+        f"p50={percentile(latencies, 50) * 1000:8.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.2f}ms "
+        f"max={max(latencies) * 1000:8.2f}ms "
+        f"mean={statistics.mean(latencies) * 1000:8.2f}ms"
+    )
+
+async def main(args):
+    import httpx
+
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+
+    async with httpx.AsyncClient(timeout=None) as client:
+        # Baseline: idle server
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_health(client, args.url, stop, args.interval))
+        await asyncio.sleep(args.idle_seconds)
+        stop.set()
+        idle = await probe
+        report("idle", idle)
+
+        # Under load: /health probed while enhancements run
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_health(client, args.url, stop, args.interval))
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            run_enhancement(client, args.url, image_bytes, f"load_{i}.jpg")
+            for i in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        loaded = await probe
+        report(f"{args.concurrency} enhancements", loaded)
+        print(f"enhancement wall time: {elapsed:.2f}s")
+
+    failure = responsiveness_failure(idle, loaded, args.max_p99_increase_ms)
+    if failure is not None:
+        print(f"FAIL: {failure}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--image", required=True, help="Image to send to /process/complete")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between /health probes")
+    parser.add_argument("--idle-seconds", type=float, default=3.0)
+    parser.add_argument("--max-p99-increase-ms", type=float, default=250.0,
+                        help="Maximum p99 /health latency increase under load over idle")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,122 @@
+"""
+Benchmark: import cost of the API process per SERVER_ROLE, from python -X importtime.
+
+For each role a fresh interpreter imports main plus the model modules that
+role enables (what lifespan imports before serving):
+
+  api       main only (no role subsystems)
+  scorer    main + models.score_inference
+  enhancer  main + models.image_enhancer
+  all       main + both
+
+Reports the total import time (best of --repeat runs) and the heaviest
+top-level packages. As a regression check it fails (exit 1) when a role
+imports a package it must not (e.g. basicsr/cv2 in any role, torch for the
+bare API), or when --baseline is given and a role got slower than the saved
+total by more than --tolerance.
+
+Usage:
+    python benchmarks/import_time.py --save import_baseline.json
+    python benchmarks/import_time.py --baseline import_baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+ROLES = ("api", "scorer", "enhancer", "all")
+
+# Packages that must stay out of each role's startup imports
+FORBIDDEN = {
+    "api": ("torch", "torchvision", "basicsr", "realesrgan", "cv2"),
+    "scorer": ("torchvision", "basicsr", "realesrgan", "cv2"),
+    "enhancer": ("torchvision", "basicsr", "realesrgan", "cv2"),
+    "all": ("torchvision", "basicsr", "realesrgan", "cv2")
+}
+
+def import_statement(role: str) -> str:
+    if role == "api":
+        return "import main"
+    return f"import importlib, main; [importlib.import_module(main.MODEL_MODULES[k]) for k in main.ROLE_KINDS['{role}']]"
+
+def parse_importtime(stderr: str):
+    """Top-level (package, cumulative us) pairs and the set of every imported module"""
+    top_level, modules = [], set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name_field = line[len("import time:"):].split("|")
+        name = name_field.strip()
+        modules.add(name)
+        if len(name_field) - len(name_field.lstrip()) == 1:
+            top_level.append((name, int(cumulative)))
+    return top_level, modules
+
+def measure(role: str, repeat: int):
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", import_statement(role)],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "SERVER_ROLE": role if role != "api" else "all"}
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{role}: import failed\n{completed.stderr.splitlines()[-1]}")
+        top_level, modules = parse_importtime(completed.stderr)
+        total_us = sum(cumulative for _, cumulative in top_level)
+        if best is None or total_us < best["total_us"]:
+            best = {"total_us": total_us, "top_level": top_level, "modules": modules}
+    return best
+
+def main(args):
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    failures = []
+    results = {}
+    print(f"{'role':<10}{'total ms':>10}{'baseline':>10}  heaviest top-level imports")
+    for role in args.roles:
+        result = measure(role, args.repeat)
+        total_ms = result["total_us"] / 1000.0
+        results[role] = total_ms
+
+        heaviest = sorted(result["top_level"], key=lambda item: -item[1])[:args.top]
+        heaviest_text = ", ".join(f"{name} {us / 1000.0:.0f}ms" for name, us in heaviest)
+        reference = baseline.get(role)
+        reference_text = f"{reference:.0f}" if reference is not None else "-"
+        print(f"{role:<10}{total_ms:>10.0f}{reference_text:>10}  {heaviest_text}")
+
+        leaked = sorted(
+            package for package in FORBIDDEN[role]
+            if any(module == package or module.startswith(package + ".") for module in result["modules"])
+        )
+        if leaked:
+            failures.append(f"{role} imports {', '.join(leaked)}")
+        if reference is not None and total_ms > reference * (1 + args.tolerance):
+            failures.append(f"{role} import time {total_ms:.0f}ms exceeds baseline {reference:.0f}ms by more than {args.tolerance:.0%}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roles", nargs="+", default=list(ROLES), choices=ROLES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--baseline", help="JSON of per-role totals (ms) to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save", help="Write this run's per-role totals (ms) as a baseline")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,115 @@
+"""
+Benchmark: peak RSS of enhancing large inputs at full size (no 512px cap).
+
+Each case runs in a fresh subprocess: the input is built, the model loaded and
+VmHWM reset, then the tile engine upscales the image and the PNG is streamed
+to a byte-counting sink. Reported growth is the peak RSS above that baseline.
+
+  memmap     output buffer memory-mapped, PNG encoded band by band (default)
+  in-memory  output buffer and encode fully in RAM (memmap threshold 0)
+
+--stand-in swaps RRDBNet for a nearest-neighbour 4x upsample so 4K/8K cases
+finish in seconds on small machines; per-tile model activations are then not
+included, but they are bounded by the tile size either way.
+
+Usage:
+    python benchmarks/large_input_memory.py --sizes 3840x2160 7680x4320 --stand-in
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.response_memory import peak_rss_mb, current_rss_mb, reset_peak_rss
+
+class CountingSink(io.RawIOBase):
+    def __init__(self):
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        return len(data)
+
+def synthetic_input(width: int, height: int) -> np.ndarray:
+    rng = np.random.RandomState(0)
+    ramp = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    grain = rng.randint(0, 32, (height, width, 3)).astype(np.float32)
+    return np.clip(ramp + grain, 0, 255).astype(np.uint8)
+
+def child(args):
+    import torch
+    from models.image_enhancer import ImageEnhancer
+    from models.image_encoder import OutputEncoding
+
+    width, height = (int(value) for value in args.child.split("x"))
+    enhancer = ImageEnhancer(
+        model_path=args.model,
+        device="cpu",
+        scale=4,
+        cache=None,
+        memmap_threshold_mb=0 if args.mode == "in-memory" else args.memmap_threshold_mb
+    )
+    if args.stand_in:
+        enhancer.tile_engine.model = torch.nn.Upsample(scale_factor=4, mode="nearest")
+
+    image = synthetic_input(width, height)
+    reset_peak_rss()
+    baseline = current_rss_mb()
+    start = time.perf_counter()
+
+    output = enhancer.tile_engine.enhance(image)
+    enhance_peak = peak_rss_mb()
+    sink = CountingSink()
+    enhancer.encoder.encode(output, OutputEncoding("png", compress_level=1), output=sink)
+
+    print(json.dumps({
+        "baseline_mb": baseline,
+        "enhance_peak_mb": enhance_peak,
+        "peak_mb": peak_rss_mb(),
+        "output_mb": output.nbytes / 1e6,
+        "png_mb": sink.size / 1e6,
+        "seconds": time.perf_counter() - start
+    }))
+
+def main(args):
+    print(f"{'input':<12}{'mode':<11}{'output MB':>11}{'enhance peak':>14}{'total peak':>12}{'seconds':>9}")
+    for size in args.sizes:
+        for mode in args.modes:
+            command = [sys.executable, os.path.abspath(__file__), "--child", size, "--mode", mode, "--model", args.model,
+                       "--memmap-threshold-mb", str(args.memmap_threshold_mb)]
+            if args.stand_in:
+                command.append("--stand-in")
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"{size:<12}{mode:<11}{'failed (exit ' + str(completed.returncode) + ')':>46}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            enhance_growth = result["enhance_peak_mb"] - result["baseline_mb"]
+            growth = result["peak_mb"] - result["baseline_mb"]
+            print(f"{size:<12}{mode:<11}{result['output_mb']:>11.0f}{enhance_growth:>14.0f}{growth:>12.0f}{result['seconds']:>9.1f}")
+    print("peak columns are RSS growth in MB above the loaded-model baseline")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="ml_models/RealESRGAN_x4plus_anime_6B.pth")
+    parser.add_argument("--sizes", nargs="+", default=["3840x2160", "7680x4320"])
+    parser.add_argument("--modes", nargs="+", default=["memmap", "in-memory"], choices=("memmap", "in-memory"))
+    parser.add_argument("--memmap-threshold-mb", type=float, default=256)
+    parser.add_argument("--stand-in", action="store_true", help="Use a 4x nearest upsample instead of RRDBNet")
+    parser.add_argument("--mode", default="memmap", help=argparse.SUPPRESS)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+    else:
+        main(args)
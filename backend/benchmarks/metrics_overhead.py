@@ -0,0 +1,86 @@
+"""
+Benchmark: cost of the per-stage latency instrumentation behind /metrics.
+
+A fully instrumented /process/complete request records two context-manager
+timed stages (upload_read, serialize) and up to eleven direct observations
+(preprocess, queue_wait and forward for both ratings; queue_wait, decode,
+forward and encode for the enhancement). This times that set of calls spread
+over --models x endpoint label sets, and the /metrics render with them all
+populated.
+
+The per-request cost must stay under OVERHEAD_BUDGET_US (the smallest
+request, a cached /rate/image, takes a few milliseconds end to end), otherwise
+the run fails (exit 1).
+
+Usage:
+    python benchmarks/metrics_overhead.py --requests 20000 --models 4
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services.metrics import PipelineMetrics
+
+# Maximum instrumentation cost per request, in microseconds
+OVERHEAD_BUDGET_US = 100
+
+ENDPOINTS = ("/rate/image", "/enhance/image", "/process/complete")
+
+def record_request(metrics: PipelineMetrics, endpoint: str, scorer: str, enhancer: str):
+    """The stage observations main.py makes for one /process/complete request"""
+    with metrics.time(endpoint, enhancer, "upload_read"):
+        pass
+    for _ in range(2):
+        metrics.observe(endpoint, scorer, "preprocess", 0.004)
+        metrics.observe(endpoint, scorer, "queue_wait", 0.001)
+        metrics.observe(endpoint, scorer, "forward", 0.02)
+    metrics.observe(endpoint, enhancer, "queue_wait", 0.01)
+    metrics.observe(endpoint, enhancer, "decode", 0.03)
+    metrics.observe(endpoint, enhancer, "forward", 2.5)
+    metrics.observe(endpoint, enhancer, "encode", 0.2)
+    with metrics.time(endpoint, enhancer, "serialize"):
+        pass
+
+def main(args):
+    metrics = PipelineMetrics()
+    if not metrics.enabled:
+        print("FAIL: prometheus_client is not installed")
+        return 1
+
+    label_sets = [
+        (endpoint, f"scorer_{index}", f"enhancer_{index}")
+        for index in range(args.models)
+        for endpoint in ENDPOINTS
+    ]
+    for labels in label_sets:
+        record_request(metrics, *labels)
+
+    start = time.perf_counter()
+    for index in range(args.requests):
+        record_request(metrics, *label_sets[index % len(label_sets)])
+    per_request_us = (time.perf_counter() - start) / args.requests * 1e6
+
+    queue_depths = {"score_batch": 3, "enhance_executor": 1, "admission": 2, "jobs": 5, "inference_pool": 4}
+    start = time.perf_counter()
+    for _ in range(args.renders):
+        body, _ = metrics.render(queue_depths)
+    render_ms = (time.perf_counter() - start) / args.renders * 1000
+
+    print(f"label sets:        {len(label_sets)}")
+    print(f"per request:       {per_request_us:.1f} us (budget {OVERHEAD_BUDGET_US} us)")
+    print(f"/metrics render:   {render_ms:.2f} ms ({len(body) / 1024:.0f} KB)")
+
+    if per_request_us > OVERHEAD_BUDGET_US:
+        print(f"FAIL: instrumentation costs {per_request_us:.1f} us per request (> {OVERHEAD_BUDGET_US} us)")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--models", type=int, default=4, help="Distinct scorer/enhancer names to spread labels over")
+    parser.add_argument("--renders", type=int, default=100)
+    sys.exit(main(parser.parse_args()))
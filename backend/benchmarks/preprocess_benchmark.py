@@ -0,0 +1,94 @@
+"""
+Benchmark: scorer preprocessing, reference torchvision path vs fast path.
+
+Reference: full PIL decode -> Resize((224, 224)) -> ToTensor -> Normalize.
+Fast:      JPEG draft (reduced-size DCT) decode -> bilinear resize -> batched
+           uint8 -> float normalize into a preallocated buffer.
+
+Also checks that the scaled 0-10 scores agree within SCORE_TOLERANCE. Without
+--images, synthetic 12MP (4000x3000) JPEG photos are generated.
+
+Usage:
+    python benchmarks/preprocess_benchmark.py --model ml_models/best_model_3.pth --count 8
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models.score_inference import ImageScoreDetector
+from models.decoded_image import DecodedImage
+
+# Maximum allowed |fast - reference| on the scaled 0-10 score
+SCORE_TOLERANCE = 0.1
+
+def synthetic_photo(seed: int, width: int = 4000, height: int = 3000) -> bytes:
+    """Smooth photo-like content: low-frequency color fields plus fine grain"""
+    rng = np.random.RandomState(seed)
+    coarse = rng.rand(height // 100, width // 100, 3) * 255
+    image = Image.fromarray(coarse.astype(np.uint8)).resize((width, height), Image.Resampling.BICUBIC)
+    image = image.filter(ImageFilter.GaussianBlur(2))
+    grain = rng.normal(0, 6, (height, width, 3))
+    pixels = np.clip(np.asarray(image, dtype=np.float32) + grain, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+def main(args):
+    if args.images:
+        paths = sorted(glob.glob(args.images))[:args.count]
+        samples = [open(path, "rb").read() for path in paths]
+    else:
+        samples = [synthetic_photo(seed) for seed in range(args.count)]
+
+    detector = ImageScoreDetector(model_path=args.model, device="cpu", cache=None)
+
+    reference_times, fast_times, diffs, raw_diffs = [], [], [], []
+    for image_bytes in samples:
+        reference_tensor, reference_time = timed(detector._preprocess_reference, DecodedImage.from_bytes(image_bytes))
+        fast_tensor, fast_time = timed(detector._preprocess_image, DecodedImage.from_bytes(image_bytes))
+
+        # Normalization is part of the fast path cost
+        _, normalize_time = timed(detector.preprocessor.normalize_batch, fast_tensor)
+        fast_time += normalize_time
+
+        reference_result = detector._predict_batch(reference_tensor)[0]
+        fast_result = detector._predict_batch(fast_tensor)[0]
+
+        reference_times.append(reference_time)
+        fast_times.append(fast_time)
+        diffs.append(abs(fast_result["scaled_score"] - reference_result["scaled_score"]))
+        raw_diffs.append(abs(fast_result["raw_score"] - reference_result["raw_score"]))
+
+    width, height = Image.open(io.BytesIO(samples[0])).size
+    print(f"{len(samples)} images, {width}x{height}")
+    print(f"{'path':<12}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}")
+    for label, times in (("reference", reference_times), ("fast", fast_times)):
+        times_ms = np.array(times) * 1000
+        print(f"{label:<12}{times_ms.mean():>10.1f}{np.median(times_ms):>10.1f}{times_ms.max():>10.1f}")
+    print(f"speedup: {np.mean(reference_times) / np.mean(fast_times):.1f}x")
+    print(f"raw score |diff|: mean={np.mean(raw_diffs):.4f} max={np.max(raw_diffs):.4f}")
+    print(f"scaled score |diff|: mean={np.mean(diffs):.4f} max={np.max(diffs):.4f} (tolerance {SCORE_TOLERANCE})")
+
+    if max(diffs) > SCORE_TOLERANCE:
+        print("FAIL: fast preprocessing exceeds score tolerance")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="ml_models/best_model_3.pth")
+    parser.add_argument("--images", help="Glob of sample photos (default: synthetic 12MP JPEGs)")
+    parser.add_argument("--count", type=int, default=8)
+    main(parser.parse_args())
@@ -0,0 +1,95 @@
+"""
+Benchmark: FP32 vs INT8 (static post-training quantization) scorer.
+
+Scores the same images with both precisions through the fast preprocessing
+path and reports:
+
+  accuracy    mean and max |int8 - fp32| on the scaled 0-10 score
+  throughput  images/s of the forward pass at each --batch-sizes entry
+
+As the accuracy gate it fails (exit 1) when the mean absolute difference
+exceeds --max-mae. Without --images, deterministic synthetic photos are
+generated. The INT8 artifact must exist (python -m models.quantization),
+calibrated on other images than the ones checked here.
+
+Usage:
+    python benchmarks/quantization_benchmark.py --model ml_models/best_model_3.pth --images "holdout/*.jpg"
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models.score_inference import ImageScoreDetector
+from models.decoded_image import DecodedImage
+from benchmarks.preprocess_benchmark import synthetic_photo
+
+def scaled_scores(detector: ImageScoreDetector, batch: torch.Tensor):
+    return [result["scaled_score"] for result in detector._predict_batch(batch)]
+
+def score_drift(reference: List[float], candidate: List[float]) -> Tuple[float, float]:
+    """Mean and max |candidate - reference| on the scaled 0-10 score"""
+    diffs = [abs(a - b) for a, b in zip(reference, candidate)]
+    return sum(diffs) / len(diffs), max(diffs)
+
+def accuracy_failure(mae: float, max_mae: float) -> Optional[str]:
+    """Why INT8 scores drift too far from FP32, or None if they are within the gate"""
+    if mae > max_mae:
+        return f"INT8 score MAE {mae:.4f} exceeds {max_mae}"
+    return None
+
+def throughput(detector: ImageScoreDetector, batch_size: int, rounds: int) -> float:
+    batch = torch.randint(0, 256, (batch_size, 224, 224, 3), dtype=torch.uint8)
+    detector._predict_batch(batch)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        detector._predict_batch(batch)
+    return batch_size * rounds / (time.perf_counter() - start)
+
+def main(args):
+    torch.set_num_threads(args.threads or torch.get_num_threads())
+    if args.images:
+        paths = sorted(glob.glob(args.images))[:args.count]
+        samples = [open(path, "rb").read() for path in paths]
+    else:
+        samples = [synthetic_photo(seed, 1600, 1200) for seed in range(args.count)]
+
+    fp32 = ImageScoreDetector(model_path=args.model, device="cpu", cache=None)
+    int8 = ImageScoreDetector(model_path=args.model, device="cpu", cache=None, precision="int8")
+
+    batch = torch.cat([fp32.preprocessor.load_tensor(DecodedImage.from_bytes(data)) for data in samples], dim=0)
+    mae, worst = score_drift(scaled_scores(fp32, batch), scaled_scores(int8, batch))
+    print(f"{len(samples)} images, engine {int8.quantized_engine}: "
+          f"score MAE {mae:.4f}, max |diff| {worst:.4f} (gate {args.max_mae})")
+    print(f"model size: fp32 {fp32.memory_bytes() / 1e6:.1f} MB, int8 {int8.memory_bytes() / 1e6:.1f} MB")
+
+    print(f"{'batch':>6}{'fp32 img/s':>12}{'int8 img/s':>12}{'speedup':>9}")
+    for batch_size in args.batch_sizes:
+        fp32_rate = throughput(fp32, batch_size, args.rounds)
+        int8_rate = throughput(int8, batch_size, args.rounds)
+        print(f"{batch_size:>6}{fp32_rate:>12.1f}{int8_rate:>12.1f}{int8_rate / fp32_rate:>8.2f}x")
+
+    fp32.close()
+    int8.close()
+    failure = accuracy_failure(mae, args.max_mae)
+    if failure is not None:
+        print(f"FAIL: {failure}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="ml_models/best_model_3.pth")
+    parser.add_argument("--images", help="Glob of held-out images (default: synthetic)")
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--max-mae", type=float, default=0.15, help="Maximum mean |int8 - fp32| on the 0-10 score")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=0)
+    sys.exit(main(parser.parse_args()))
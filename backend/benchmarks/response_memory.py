@@ -0,0 +1,110 @@
+"""
+Benchmark: peak RSS of building an enhanced-image response, JSON+base64 vs streamed PNG.
+
+Each mode runs in a fresh subprocess holding a 2048x2048 enhanced output
+array (as after a 4x upscale of a 512px input) and measures how much peak RSS
+grows while the response body is produced:
+
+  json    PNG bytes -> base64 string -> serialized JSON body (current default)
+  stream  PNG encoded into fixed-size chunks that are consumed as produced
+
+Usage:
+    python benchmarks/response_memory.py --size 2048
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+def peak_rss_mb() -> float:
+    """Peak RSS since the last reset_peak_rss() (VmHWM), falling back to ru_maxrss"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def current_rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return peak_rss_mb()
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS so setup allocations don't mask the measurement"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def enhanced_output(size: int) -> np.ndarray:
+    """Photo-like output so PNG compression behaves realistically"""
+    rng = np.random.RandomState(0)
+    coarse = (rng.rand(size // 32, size // 32, 3) * 255).astype(np.uint8)
+    smooth = np.asarray(Image.fromarray(coarse).resize((size, size), Image.Resampling.BICUBIC), dtype=np.int16)
+    grain = rng.randint(-4, 5, smooth.shape)
+    return np.clip(smooth + grain, 0, 255).astype(np.uint8)
+
+def run_json(array: np.ndarray) -> int:
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="PNG", optimize=True)
+    png_bytes = buffer.getvalue()
+    body = json.dumps({"enhanced_image_base64": base64.b64encode(png_bytes).decode("utf-8")}).encode("utf-8")
+    return len(body)
+
+def run_stream(array: np.ndarray) -> int:
+    from models.streaming import iter_writer_output
+
+    async def consume():
+        total = 0
+        stream = iter_writer_output(lambda output: Image.fromarray(array).save(output, format="PNG", optimize=True))
+        async for chunk in stream:
+            total += len(chunk)
+        return total
+
+    return asyncio.run(consume())
+
+def child(mode: str, size: int):
+    array = enhanced_output(size)
+    reset_peak_rss()
+    baseline = current_rss_mb()
+    body_bytes = run_json(array) if mode == "json" else run_stream(array)
+    print(json.dumps({"mode": mode, "baseline_mb": baseline, "peak_mb": peak_rss_mb(), "body_bytes": body_bytes}))
+
+def main(args):
+    print(f"{args.size}x{args.size} RGB output ({args.size * args.size * 3 / 1e6:.1f} MB raw)")
+    print(f"{'mode':<8}{'body MB':>10}{'peak RSS growth MB':>22}")
+    for mode in ("json", "stream"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--size", str(args.size)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        growth = result["peak_mb"] - result["baseline_mb"]
+        print(f"{mode:<8}{result['body_bytes'] / 1e6:>10.1f}{growth:>22.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--child", choices=("json", "stream"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.size)
+    else:
+        main(args)
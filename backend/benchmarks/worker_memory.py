@@ -0,0 +1,87 @@
+"""
+Benchmark: resident memory per inference worker process with shared weights.
+
+Loads the scorer and enhancer once, starts an InferencePool with each worker
+count, and reads /proc/<pid>/smaps_rollup of every worker:
+
+  uss     private memory (Private_Clean + Private_Dirty): what one more worker costs
+  shared  pages shared with the supervisor and other workers (the weights)
+  pss     proportional share
+
+Each row is measured right after fork and again after a warm-up round
+(scorer batches plus one enhancement spread over the workers), where uss
+also includes per-worker activations and allocator caches. Without sharing
+every worker would hold its own copy of the weights (weights MB column).
+
+Usage:
+    python benchmarks/worker_memory.py --workers 1 2 4 --enhance-size 256
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models.score_inference import ImageScoreDetector
+from models.image_enhancer import ImageEnhancer
+from services.inference_pool import InferencePool
+
+def smaps_rollup_mb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024.0
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "uss": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "shared": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0)
+    }
+
+def worker_memory(pool: InferencePool) -> dict:
+    samples = [smaps_rollup_mb(pid) for pid in pool.get_stats()["worker_pids"]]
+    return {key: sum(sample[key] for sample in samples) / len(samples) for key in samples[0]}
+
+def warm_up(scorer, enhancer, workers: int, enhance_size: int):
+    batch = torch.randint(0, 256, (8, 224, 224, 3), dtype=torch.uint8)
+    with ThreadPoolExecutor(max_workers=2 * workers) as executor:
+        list(executor.map(lambda _: scorer._predict_batch(batch), range(2 * workers)))
+    image = np.random.RandomState(0).randint(0, 256, (enhance_size, enhance_size, 3), dtype=np.uint8)
+    enhancer.tile_engine.enhance(image)
+
+def main(args):
+    print(f"{'workers':>8}{'phase':>9}{'uss MB':>9}{'shared MB':>11}{'pss MB':>9}{'weights MB':>12}")
+    for workers in args.workers:
+        # A fresh pair of models per row so every pool forks from the same state
+        scorer = ImageScoreDetector(model_path=args.scorer, device="cpu", cache=None)
+        enhancer = ImageEnhancer(model_path=args.enhancer, device="cpu", scale=4, num_block=args.num_block, cache=None)
+        weights_mb = (scorer.memory_bytes() + enhancer.memory_bytes()) / (1024 * 1024)
+
+        pool = InferencePool(workers=workers)
+        pool.start({"scorer": scorer, "enhancer": enhancer})
+        try:
+            for phase in ("forked", "warm"):
+                if phase == "warm":
+                    warm_up(scorer, enhancer, workers, args.enhance_size)
+                memory = worker_memory(pool)
+                print(f"{workers:>8}{phase:>9}{memory['uss']:>9.0f}{memory['shared']:>11.0f}{memory['pss']:>9.0f}{weights_mb:>12.0f}")
+        finally:
+            pool.shutdown()
+            scorer.close()
+            enhancer.close()
+    print("memory columns are averages per worker process")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scorer", default="ml_models/best_model_3.pth")
+    parser.add_argument("--enhancer", default="ml_models/RealESRGAN_x4plus_anime_6B.pth")
+    parser.add_argument("--num-block", type=int, default=6)
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--enhance-size", type=int, default=256)
+    main(parser.parse_args())
@@ -1,13 +1,22 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request, Depends, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+from starlette.datastructures import MutableHeaders
 import uvicorn
 import os
-from typing import Dict, Any
+import time
+from typing import TYPE_CHECKING, Dict, Any, List, Iterator, Tuple, Optional, AsyncIterator
 import logging
-import torch
-from contextlib import asynccontextmanager
+import importlib
+from contextlib import asynccontextmanager, AsyncExitStack
+from concurrent.futures import ThreadPoolExecutor
 import base64
+import asyncio
+import json
+import tarfile
+import uuid
+import zipfile
 
 # Load environment variables from .env file
 try:
@@ -17,51 +26,396 @@ try:
 except ImportError:
     logging.info("python-dotenv not installed, relying on system environment variables")
 
-from models.score_inference import ImageScoreDetector
-from models.image_enhancer import ImageEnhancer
+from models.result_cache import ResultCache
+from models.score_store import ScoreStore
+from models.decoded_image import DecodedImage
+from models.streaming import iter_bytes
+from models.image_encoder import OutputEncoding
+from services.job_queue import EnhancementJobQueue, JobQueueFullError
+from services.model_registry import ModelRegistry, UnknownModelError
+from services.metrics import PipelineMetrics
+from services.profiling import RequestProfiler
+from services.admission import AdmissionController, AdmissionRejectedError, RequestTooLargeError, estimate_enhance_bytes
+
+if TYPE_CHECKING:
+    from models.image_enhancer import ImageEnhancer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Set device based on availability
-device = "cuda" if torch.cuda.is_available() else "cpu"
+# Which subsystems this worker serves: "all", "scorer" or "enhancer". torch and the
+# model modules (torchvision, basicsr, cv2) are only imported for enabled roles.
+SERVER_ROLE = os.getenv("SERVER_ROLE", "all")
+ROLE_KINDS = {"all": ("scorer", "enhancer"), "scorer": ("scorer",), "enhancer": ("enhancer",)}
+MODEL_MODULES = {"scorer": "models.score_inference", "enhancer": "models.image_enhancer"}
+
+# Set on startup based on availability
+device = None
+
+# Scoring micro-batch settings
+SCORE_MAX_BATCH_SIZE = int(os.getenv("SCORE_MAX_BATCH_SIZE", "8"))
+SCORE_BATCH_WAIT_MS = float(os.getenv("SCORE_BATCH_WAIT_MS", "5"))
+MAX_BULK_BATCH_SIZE = int(os.getenv("MAX_BULK_BATCH_SIZE", "64"))
+
+# Scorer precision: "fp32", or "int8" to serve the statically quantized model
+# (CPU only; create it with python -m models.quantization). A catalog entry's
+# "precision" overrides this.
+SCORE_PRECISION = os.getenv("SCORE_PRECISION", "fp32")
+
+# Result cache settings (0 MB disables the cache)
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "256"))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR") or None
+RESULT_CACHE_DISK_MAX_MB = float(os.getenv("RESULT_CACHE_DISK_MAX_MB", "2048"))
+
+# Persistent score index (SQLite file shared by the workers; unset disables it).
+# Scores are keyed by input content hash and scorer checkpoint, and served by
+# GET /scores/{hash} and POST /scores/lookup without re-uploading the image.
+SCORE_STORE_PATH = os.getenv("SCORE_STORE_PATH") or None
+SCORE_LOOKUP_MAX_HASHES = int(os.getenv("SCORE_LOOKUP_MAX_HASHES", "1000"))
+
+# Background enhancement job settings
+ENHANCE_JOB_SPOOL_DIR = os.getenv("ENHANCE_JOB_SPOOL_DIR", "spool/enhanced")
+ENHANCE_JOB_WORKERS = int(os.getenv("ENHANCE_JOB_WORKERS", "1"))
+ENHANCE_JOB_MAX_PENDING = int(os.getenv("ENHANCE_JOB_MAX_PENDING", "32"))
+ENHANCE_JOB_TTL_SECONDS = float(os.getenv("ENHANCE_JOB_TTL_SECONDS", "3600"))
+
+# Tile-parallel enhancement (0 = size from the available cores)
+ENHANCE_TILE_WORKERS = int(os.getenv("ENHANCE_TILE_WORKERS", "0"))
+ENHANCE_TILE_THREADS = int(os.getenv("ENHANCE_TILE_THREADS", "0"))
+
+# Inputs are enhanced at full size unless a maximum dimension is set; outputs
+# above the threshold are written to a memory-mapped buffer
+ENHANCE_MAX_INPUT_SIZE = int(os.getenv("ENHANCE_MAX_INPUT_SIZE", "0"))
+ENHANCE_MEMMAP_THRESHOLD_MB = float(os.getenv("ENHANCE_MEMMAP_THRESHOLD_MB", "256"))
+ENHANCE_MEMMAP_DIR = os.getenv("ENHANCE_MEMMAP_DIR") or None
+
+# Output canvases below the memmap threshold are reused from a per-enhancer pool
+# of this many MB instead of being allocated per request (0 = no pool)
+ENHANCE_BUFFER_POOL_MB = float(os.getenv("ENHANCE_BUFFER_POOL_MB", "512"))
+
+# Admission control for synchronous enhancements: estimated memory of the requests in
+# flight (0 = uncapped) and how many may wait for room before new ones get a 429
+ENHANCE_ADMISSION_MAX_MB = float(os.getenv("ENHANCE_ADMISSION_MAX_MB", "2048"))
+ENHANCE_ADMISSION_MAX_QUEUE = int(os.getenv("ENHANCE_ADMISSION_MAX_QUEUE", "8"))
+
+# Enhancer compute settings: "fp32" or "bf16" (bfloat16 autocast), and "contiguous"
+# or "channels_last"; pick with benchmarks/enhancer_precision.py. A catalog
+# entry's "precision" / "memory_format" overrides these.
+ENHANCE_PRECISION = os.getenv("ENHANCE_PRECISION", "fp32")
+ENHANCE_MEMORY_FORMAT = os.getenv("ENHANCE_MEMORY_FORMAT", "contiguous")
+
+# Model variants selectable per request; MODEL_CATALOG may name a JSON file of
+# {"scorer": {name: spec}, "enhancer": {name: spec}} to add or override entries
+SCORER_MODELS = {
+    "best_model_3": {"model_path": "ml_models/best_model_3.pth"}
+}
+ENHANCER_MODELS = {
+    "anime_6b": {"model_path": "ml_models/RealESRGAN_x4plus_anime_6B.pth", "scale": 4, "num_block": 6},
+    "x4plus": {"model_path": "ml_models/RealESRGAN_x4plus.pth", "scale": 4, "num_block": 23},
+    "x2plus": {"model_path": "ml_models/RealESRGAN_x2plus.pth", "scale": 2, "num_block": 23}
+}
+MODEL_CATALOG = os.getenv("MODEL_CATALOG") or None
+
+# Keys a catalog entry may set; others are ignored with a warning
+MODEL_SPEC_KEYS = {
+    "scorer": ("model_path", "precision", "backend", "compile"),
+    "enhancer": ("model_path", "scale", "num_block", "precision", "memory_format", "backend", "compile")
+}
+DEFAULT_SCORER_MODEL = os.getenv("DEFAULT_SCORER_MODEL", "best_model_3")
+DEFAULT_ENHANCER_MODEL = os.getenv("DEFAULT_ENHANCER_MODEL", "anime_6b")
+
+# TorchScript artifacts saved on first load and reused on later cold starts (unset = disabled)
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR") or None
+
+# Inference runtime for both models: "torch", or "onnx" to run graphs exported with
+# python -m models.onnx_export on ONNX Runtime. A catalog entry's "backend" overrides it.
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+
+# Graph optimization for torch models: "none", "torchscript" (freeze + optimize_for_inference)
+# or "compile" (torch.compile). A catalog entry's "compile" overrides it.
+COMPILE_MODE = os.getenv("COMPILE_MODE", "none")
+
+# Models loaded and run over their serving input shapes before /health reports ready
+# (default: each enabled role's default model; "none" = skip warmup)
+WARMUP_MODELS = [name.strip() for name in os.getenv("WARMUP_MODELS", "").split(",") if name.strip()]
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "2"))
+
+# Inference worker processes forked from this one, sharing its model weights
+# (0 = run inference in-process). The pool serves INFERENCE_POOL_MODELS, by default
+# each enabled role's default model; those are loaded at startup and never evicted.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_WORKER_THREADS = int(os.getenv("INFERENCE_WORKER_THREADS", "0"))
+INFERENCE_CALL_TIMEOUT_S = float(os.getenv("INFERENCE_CALL_TIMEOUT_S", "300"))
+INFERENCE_POOL_MODELS = [name.strip() for name in os.getenv("INFERENCE_POOL_MODELS", "").split(",") if name.strip()]
+
+# Models load on first use; idle ones are evicted LRU-first above this budget (0 = unlimited)
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "1024"))
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Limits on what one /rate/batch archive may expand to (guards against zip/tar bombs)
+ARCHIVE_MAX_MEMBERS = int(os.getenv("ARCHIVE_MAX_MEMBERS", "10000"))
+ARCHIVE_MAX_MEMBER_MB = float(os.getenv("ARCHIVE_MAX_MEMBER_MB", "64"))
+ARCHIVE_MAX_TOTAL_MB = float(os.getenv("ARCHIVE_MAX_TOTAL_MB", "4096"))
 
-# Global model instances
-score_detector = None
-image_enhancer = None
+# Response modes for endpoints that return an enhanced image
+# "png" is kept as an alias of "binary" (raw image body in the requested output format)
+RESPONSE_FORMATS = ("json", "binary", "png", "multipart")
+METADATA_HEADER = "X-Result-Metadata"
+
+# Prometheus /metrics with per-stage latency histograms (needs prometheus_client)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Request profiling (unset PROFILE_DIR = off): every PROFILE_SAMPLE_EVERY-th request to
+# a PROFILED_PATHS endpoint (0 = none), and any request with an X-Profile header, runs
+# under torch.profiler plus a stack sampler. Traces are kept up to PROFILE_MAX_MB and
+# served by /admin/profiles. If PROFILE_TOKEN is set, X-Profile must carry it both to
+# force a profile and to use the admin endpoints.
+PROFILE_DIR = os.getenv("PROFILE_DIR") or None
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+PROFILE_MAX_MB = float(os.getenv("PROFILE_MAX_MB", "256"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+PROFILED_PATHS = ("/rate/image", "/rate/batch", "/enhance/image", "/process/complete")
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Global model registry and services
+enabled_kinds: Tuple[str, ...] = ()
+model_registry = None
+inference_pool = None
+result_cache = None
+score_store = None
+job_queue = None
+admission = None
+profiler = None
+metrics = PipelineMetrics(enabled=METRICS_ENABLED)
+
+# Set once startup warmup has finished; /health reports 503 until then
+ready = False
+warmup_info: Dict[str, Any] = {}
+
+def _load_model_catalog() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Built-in model variants merged with the optional MODEL_CATALOG file"""
+    catalog = {"scorer": dict(SCORER_MODELS), "enhancer": dict(ENHANCER_MODELS)}
+    if MODEL_CATALOG:
+        with open(MODEL_CATALOG) as f:
+            for kind, models in json.load(f).items():
+                catalog.setdefault(kind, {}).update(models)
+    
+    for kind, models in catalog.items():
+        for name, spec in models.items():
+            if "model_path" not in spec:
+                raise ValueError(f"Model catalog entry {kind}/{name} has no model_path")
+            ignored = sorted(set(spec) - set(MODEL_SPEC_KEYS.get(kind, ())))
+            if ignored:
+                logger.warning(f"Ignoring unknown keys in model catalog entry {kind}/{name}: {', '.join(ignored)}")
+            models[name] = {key: value for key, value in spec.items() if key in MODEL_SPEC_KEYS.get(kind, ())}
+    return catalog
+
+def _detect_device() -> str:
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def _scorer_factory(spec: Dict[str, Any]):
+    from models.score_inference import ImageScoreDetector
+    
+    precision = spec.get("precision", SCORE_PRECISION)
+    return lambda: ImageScoreDetector(
+        model_path=spec["model_path"],
+        device="cpu" if precision == "int8" else device,
+        max_batch_size=SCORE_MAX_BATCH_SIZE,
+        batch_wait_ms=SCORE_BATCH_WAIT_MS,
+        cache=result_cache,
+        artifact_dir=MODEL_ARTIFACT_DIR,
+        precision=precision,
+        backend=spec.get("backend", INFERENCE_BACKEND),
+        compile_mode=spec.get("compile", COMPILE_MODE),
+        score_store=score_store
+    )
+
+def _enhancer_factory(spec: Dict[str, Any]):
+    from models.image_enhancer import ImageEnhancer
+    
+    return lambda: ImageEnhancer(
+        model_path=spec["model_path"],
+        device=device,
+        scale=spec.get("scale", 4),
+        num_block=spec.get("num_block", 6),
+        cache=result_cache,
+        tile_workers=ENHANCE_TILE_WORKERS,
+        tile_threads=ENHANCE_TILE_THREADS,
+        max_image_size=ENHANCE_MAX_INPUT_SIZE,
+        memmap_threshold_mb=ENHANCE_MEMMAP_THRESHOLD_MB,
+        memmap_dir=ENHANCE_MEMMAP_DIR,
+        artifact_dir=MODEL_ARTIFACT_DIR,
+        precision=spec.get("precision", ENHANCE_PRECISION),
+        memory_format=spec.get("memory_format", ENHANCE_MEMORY_FORMAT),
+        backend=spec.get("backend", INFERENCE_BACKEND),
+        compile_mode=spec.get("compile", COMPILE_MODE),
+        buffer_pool_mb=ENHANCE_BUFFER_POOL_MB
+    )
+
+def _start_inference_pool():
+    """Load the pool's models once, pinned for the process lifetime, and fork the workers"""
+    from services.inference_pool import InferencePool
+    
+    names = INFERENCE_POOL_MODELS or [model_registry.resolve(kind) for kind in enabled_kinds]
+    models = {}
+    for name in names:
+        kind = model_registry.kind_of(name)
+        if kind not in enabled_kinds:
+            raise ValueError(f"Pool model '{name}' is a {kind} model, which SERVER_ROLE={SERVER_ROLE} disables")
+        models[name] = model_registry.acquire(kind, name)
+    
+    pool = InferencePool(
+        workers=INFERENCE_WORKERS,
+        threads_per_worker=INFERENCE_WORKER_THREADS,
+        call_timeout=INFERENCE_CALL_TIMEOUT_S
+    )
+    pool.start(models)
+    return pool
+
+def _warm_up_models(names: List[str]):
+    """Load each model and run it over its serving input shapes (blocking)"""
+    for name in names:
+        try:
+            kind = model_registry.kind_of(name)
+            with model_registry.lease(kind, name) as instance:
+                # Pool calls go to the next free worker, so one concurrent warmup per worker reaches them all
+                parallel = inference_pool.workers if inference_pool and name in inference_pool.models else 1
+                with ThreadPoolExecutor(max_workers=parallel) as executor:
+                    seconds = max(executor.map(lambda _: instance.warmup(WARMUP_ROUNDS), range(parallel)))
+            warmup_info[name] = {"status": "warm", "seconds": round(seconds, 3)}
+            logger.info(f"Warmed up {name} in {seconds:.2f}s")
+        except Exception as e:
+            # The model is loaded lazily again on its first request; don't keep the worker out of rotation
+            warmup_info[name] = {"status": "failed", "error": str(e)}
+            logger.error(f"Warmup of {name} failed: {e}")
+
+async def _run_warmup():
+    """Warm up the configured models off the event loop, then mark the worker ready"""
+    global ready
+    
+    if WARMUP_MODELS == ["none"]:
+        names = []
+    elif WARMUP_MODELS:
+        names = list(WARMUP_MODELS)
+    else:
+        names = []
+        for kind in enabled_kinds:
+            try:
+                names.append(model_registry.resolve(kind))
+            except UnknownModelError:
+                logger.warning(f"No default {kind} model to warm up")
+    for name in names:
+        warmup_info[name] = {"status": "pending"}
+    
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _warm_up_models, names)
+    ready = True
+    logger.info("Worker ready")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize models on startup"""
-    global score_detector, image_enhancer
+    """Set up the model registry and services for this worker's role on startup"""
+    global device, enabled_kinds, model_registry, inference_pool, result_cache, score_store, job_queue, admission, profiler
     
     try:
-        logger.info("Loading models...")
+        if SERVER_ROLE not in ROLE_KINDS:
+            raise ValueError(f"SERVER_ROLE must be one of {', '.join(ROLE_KINDS)}, got '{SERVER_ROLE}'")
+        enabled_kinds = ROLE_KINDS[SERVER_ROLE]
         
-        # Initialize image score detector
-        score_detector = ImageScoreDetector(
-            model_path="ml_models/best_model_3.pth",
-            device=device
-        )
+        # Pay the heavy imports before serving, and only for enabled roles
+        logger.info(f"Starting {SERVER_ROLE} worker, importing {', '.join(MODEL_MODULES[kind] for kind in enabled_kinds)}...")
+        for kind in enabled_kinds:
+            importlib.import_module(MODEL_MODULES[kind])
+        device = _detect_device()
         
-        # Initialize image enhancer
-        image_enhancer = ImageEnhancer(
-            model_path="ml_models/RealESRGAN_x4plus_anime_6B.pth",
-            device=device,
-            scale=4
-        )
+        logger.info("Registering models...")
+        
+        # Shared content-addressed cache for scores and enhanced images
+        if RESULT_CACHE_MAX_MB > 0:
+            result_cache = ResultCache(
+                max_bytes=int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+                disk_dir=RESULT_CACHE_DIR,
+                disk_max_bytes=int(RESULT_CACHE_DISK_MAX_MB * 1024 * 1024)
+            )
+        if SCORE_STORE_PATH and "scorer" in enabled_kinds:
+            score_store = ScoreStore(SCORE_STORE_PATH)
         
-        logger.info("Models loaded successfully!")
+        # Weights are loaded lazily, on the first request for each model
+        model_registry = ModelRegistry(max_bytes=int(MODEL_MEMORY_BUDGET_MB * 1024 * 1024))
+        catalog = _load_model_catalog()
+        factories = {"scorer": _scorer_factory, "enhancer": _enhancer_factory}
+        defaults = {"scorer": DEFAULT_SCORER_MODEL, "enhancer": DEFAULT_ENHANCER_MODEL}
+        for kind in enabled_kinds:
+            for name, spec in catalog.get(kind, {}).items():
+                model_registry.register(
+                    name,
+                    kind,
+                    factories[kind](spec),
+                    default=name == defaults[kind],
+                    **spec,
+                    weights_present=os.path.exists(spec["model_path"])
+                )
+        
+        # Fork the inference workers before anything else starts threads or runs a model
+        if INFERENCE_WORKERS > 0:
+            if device != "cpu":
+                logger.warning("Inference worker processes need CPU inference (CUDA can't be forked); running in-process")
+            else:
+                inference_pool = _start_inference_pool()
+        
+        # Background enhancement jobs lease enhancers from the registry
+        if "enhancer" in enabled_kinds:
+            admission = AdmissionController(
+                max_bytes=int(ENHANCE_ADMISSION_MAX_MB * 1024 * 1024),
+                max_queue=ENHANCE_ADMISSION_MAX_QUEUE
+            )
+            job_queue = EnhancementJobQueue(
+                model_registry,
+                spool_dir=ENHANCE_JOB_SPOOL_DIR,
+                max_workers=ENHANCE_JOB_WORKERS,
+                max_pending=ENHANCE_JOB_MAX_PENDING,
+                ttl_seconds=ENHANCE_JOB_TTL_SECONDS
+            )
+        
+        if PROFILE_DIR:
+            profiler = RequestProfiler(
+                PROFILE_DIR,
+                sample_every=PROFILE_SAMPLE_EVERY,
+                max_bytes=int(PROFILE_MAX_MB * 1024 * 1024)
+            )
+        
+        logger.info(f"Registered models: {', '.join(f'{kind}/{name}' for kind in enabled_kinds for name in model_registry.names(kind))}")
         
     except Exception as e:
-        logger.error(f"Failed to load models: {e}")
+        logger.error(f"Failed to set up models: {e}")
         raise e
     
+    cleanup_task = None
+    if job_queue:
+        cleanup_task = asyncio.create_task(job_queue.run_cleanup(interval=min(60.0, ENHANCE_JOB_TTL_SECONDS / 4)))
+    
+    # Serve /health while warming up so the load balancer sees "warming" rather than a refused connection
+    warmup_task = asyncio.create_task(_run_warmup())
+    
     yield
     
     # Cleanup
     logger.info("Shutting down...")
+    warmup_task.cancel()
+    if cleanup_task:
+        cleanup_task.cancel()
+    if job_queue:
+        job_queue.shutdown()
+    if inference_pool:
+        inference_pool.shutdown()
+    if model_registry:
+        model_registry.shutdown()
+    if score_store:
+        score_store.close()
 
 # Create FastAPI app with lifespan
 app = FastAPI(
@@ -78,8 +432,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[METADATA_HEADER, PROFILE_ID_HEADER],
 )
 
+def _profile_authorized(request: Request) -> bool:
+    return PROFILE_TOKEN is None or request.headers.get(PROFILE_HEADER) == PROFILE_TOKEN
+
+class ProfileRequestsMiddleware:
+    """Profile sampled or X-Profile requests, streamed body included.
+
+    Plain ASGI, so the profile only closes once the app has sent the whole
+    response, and unprofiled requests pass straight through.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if profiler is None or scope["type"] != "http" or scope["path"] not in PROFILED_PATHS:
+            return await self.app(scope, receive, send)
+        
+        request = Request(scope)
+        forced = PROFILE_HEADER in request.headers and _profile_authorized(request)
+        if not profiler.should_profile(forced):
+            return await self.app(scope, receive, send)
+        
+        async with profiler.profile(scope["path"]) as trace_id:
+            async def send_with_trace_id(message):
+                if trace_id and message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append(PROFILE_ID_HEADER, trace_id)
+                await send(message)
+            
+            await self.app(scope, receive, send_with_trace_id)
+
+# Only installed when profiling is configured
+if PROFILE_DIR:
+    app.add_middleware(ProfileRequestsMiddleware)
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -87,21 +476,113 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Detailed health check"""
-    return {
-        "status": "healthy",
-        "score_detector": "loaded" if score_detector else "not loaded",
-        "image_enhancer": "loaded" if image_enhancer else "not loaded",
-        "device": device
+    """Detailed health check; 503 until startup warmup has finished"""
+    health = {
+        "status": "ready" if ready else "warming",
+        "role": SERVER_ROLE,
+        "models": {
+            name: "loaded" if model["loaded"] else "not loaded"
+            for name, model in (model_registry.get_info()["models"].items() if model_registry else [])
+        },
+        "warmup": warmup_info,
+        "device": device,
+        "cache": result_cache.get_stats() if result_cache else None,
+        "admission": admission.get_stats() if admission else None
     }
+    return health if ready else JSONResponse(status_code=503, content=health)
+
+def _observe_score(endpoint: str, model: str, result: Dict[str, Any]):
+    """Record a scoring result's stage timings (only preprocessing runs on a cache hit)"""
+    metrics.observe(endpoint, model, "preprocess", result.get("preprocess_time"))
+    if not result.get("cache_hit"):
+        metrics.observe(endpoint, model, "queue_wait", result.get("queue_time"))
+        metrics.observe(endpoint, model, "forward", result.get("inference_time"))
+
+def _observe_enhancement(endpoint: str, model: str, result: Dict[str, Any]):
+    """Record an enhancement result's stage timings; streamed responses encode after this"""
+    metrics.observe(endpoint, model, "queue_wait", result.get("queue_time"))
+    if not result.get("cache_hit"):
+        metrics.observe(endpoint, model, "decode", result.get("decode_time"))
+        metrics.observe(endpoint, model, "forward", result["enhancement_info"].get("inference_time"))
+        metrics.observe(endpoint, model, "encode", result.get("encode_time"))
+
+def _queue_depths() -> Dict[str, int]:
+    """Current depth of every request queue in this worker"""
+    depths = {}
+    if model_registry:
+        depths["score_batch"] = sum(
+            instance.batcher.get_stats()["queued"] for instance in model_registry.loaded("scorer").values()
+        )
+        depths["enhance_executor"] = sum(instance.pending for instance in model_registry.loaded("enhancer").values())
+    if admission:
+        depths["admission"] = admission.get_stats()["queue_depth"]
+    if job_queue:
+        depths["jobs"] = job_queue.get_stats()["jobs"].get("queued", 0)
+    if inference_pool:
+        depths["inference_pool"] = inference_pool.get_stats()["in_flight"]
+    return depths
+
+def _check_admission(enhancer_model: str):
+    """429 before decoding and inference when the enhancement queue is already full (the upload is already received)"""
+    if admission is None:
+        return
+    try:
+        admission.check()
+    except AdmissionRejectedError as e:
+        metrics.count_rejection(enhancer_model, "queue_full")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@asynccontextmanager
+async def _admit_enhancement(image: DecodedImage, enhancer_model: str) -> AsyncIterator[None]:
+    """Hold admission for enhancing an image, sized from its header dimensions; 429/413 when over budget.
+    Callers keep it until the response body has been sent, since encoding is part of the cost."""
+    if admission is None:
+        yield
+        return
+    
+    width, height = image.size
+    cost = estimate_enhance_bytes(
+        width,
+        height,
+        model_registry.details(enhancer_model).get("scale", 4),
+        int(ENHANCE_MEMMAP_THRESHOLD_MB * 1024 * 1024)
+    )
+    requested_at = time.monotonic()
+    try:
+        admitted_at = await admission.acquire(cost)
+    except AdmissionRejectedError as e:
+        metrics.count_rejection(enhancer_model, "queue_full")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except RequestTooLargeError as e:
+        metrics.count_rejection(enhancer_model, "too_large")
+        raise HTTPException(status_code=413, detail=str(e))
+    metrics.observe_admission(enhancer_model, admitted_at - requested_at)
+    
+    try:
+        yield
+    finally:
+        admission.release(cost, admitted_at)
+
+def _resolve_model(kind: str, name: Optional[str]) -> str:
+    """Registered model name for a request, or 400 for an unknown one"""
+    if not model_registry:
+        raise HTTPException(status_code=503, detail="Models not initialized")
+    if kind not in enabled_kinds:
+        raise HTTPException(status_code=503, detail=f"{kind} models are disabled in this worker (SERVER_ROLE={SERVER_ROLE})")
+    try:
+        return model_registry.resolve(kind, name)
+    except UnknownModelError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/rate/image")
-async def rate_image_quality(file: UploadFile = File(...)):
+async def rate_image_quality(
+    file: UploadFile = File(...),
+    scorer_model: Optional[str] = Query(None, description="Scorer variant (default if omitted)")
+):
     """
     Rate the quality of an uploaded image
     """
-    if not score_detector:
-        raise HTTPException(status_code=503, detail="Image scoring model not loaded")
+    scorer_model = _resolve_model("scorer", scorer_model)
     
     # Validate file type
     if not file.content_type.startswith("image/"):
@@ -109,152 +590,608 @@ async def rate_image_quality(file: UploadFile = File(...)):
     
     try:
         # Read file content
-        content = await file.read()
+        with metrics.time("/rate/image", scorer_model, "upload_read"):
+            content = await file.read()
         
         # Run inference
-        result = await score_detector.predict(content, file.filename)
+        async with model_registry.alease("scorer", scorer_model) as score_detector:
+            result = await score_detector.predict(content, file.filename)
+        _observe_score("/rate/image", scorer_model, result)
         
-        return JSONResponse(content={
-            "filename": file.filename,
-            "raw_score": result["raw_score"],
-            "quality_score": result["scaled_score"],
-            "processing_time": result["processing_time"],
-            "image_info": result["image_info"]
-        })
+        with metrics.time("/rate/image", scorer_model, "serialize"):
+            return JSONResponse(content={
+                "filename": file.filename,
+                "scorer_model": scorer_model,
+                "raw_score": result["raw_score"],
+                "quality_score": result["scaled_score"],
+                "processing_time": result["processing_time"],
+                "image_info": result["image_info"]
+            })
         
     except Exception as e:
         logger.error(f"Error rating image: {e}")
         raise HTTPException(status_code=500, detail=f"Error rating image: {str(e)}")
 
+def _is_archive(file: UploadFile) -> bool:
+    """Check whether an upload is a zip/tar archive of images"""
+    filename = (file.filename or "").lower()
+    return filename.endswith(ARCHIVE_SUFFIXES) or file.content_type in (
+        "application/zip", "application/x-zip-compressed", "application/x-tar", "application/gzip"
+    )
+
+def _read_member(name: str, size: int, open_member, budget: Dict[str, int]) -> bytes:
+    """Decompress one archive member within the per-member, member count and total limits"""
+    max_member = int(ARCHIVE_MAX_MEMBER_MB * 1024 * 1024)
+    budget["members"] += 1
+    if budget["members"] > ARCHIVE_MAX_MEMBERS:
+        raise ValueError(f"Archive has more than {ARCHIVE_MAX_MEMBERS} files")
+    if size > max_member:
+        raise ValueError(f"{name} is {size / 1e6:.0f} MB uncompressed, over the {ARCHIVE_MAX_MEMBER_MB:g} MB limit")
+    
+    # Read at most one byte past the limit rather than trusting the declared size
+    with open_member() as member:
+        data = member.read(max_member + 1)
+    if len(data) > max_member:
+        raise ValueError(f"{name} is over the {ARCHIVE_MAX_MEMBER_MB:g} MB limit")
+    budget["bytes"] -= len(data)
+    if budget["bytes"] < 0:
+        raise ValueError(f"Archive expands to more than {ARCHIVE_MAX_TOTAL_MB:g} MB")
+    return data
+
+def _iter_archive_images(file: UploadFile) -> Iterator[Tuple[str, bytes]]:
+    """Yield (name, bytes) for each regular file in a zip or tar upload; ValueError past the archive limits"""
+    file.file.seek(0)
+    budget = {"members": 0, "bytes": int(ARCHIVE_MAX_TOTAL_MB * 1024 * 1024)}
+    
+    if zipfile.is_zipfile(file.file):
+        file.file.seek(0)
+        with zipfile.ZipFile(file.file) as archive:
+            for member in archive.infolist():
+                if member.is_dir() or member.filename.startswith("__MACOSX/"):
+                    continue
+                yield member.filename, _read_member(
+                    member.filename, member.file_size, lambda: archive.open(member), budget
+                )
+        return
+    
+    file.file.seek(0)
+    with tarfile.open(fileobj=file.file, mode="r:*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            yield member.name, _read_member(member.name, member.size, lambda: archive.extractfile(member), budget)
+
+def _iter_upload_images(files: List[UploadFile]) -> Iterator[Tuple[str, bytes]]:
+    """Yield (name, bytes) for uploaded images, expanding archives in place"""
+    for file in files:
+        if _is_archive(file):
+            yield from _iter_archive_images(file)
+        else:
+            file.file.seek(0)
+            yield file.filename, file.file.read()
+
+@app.post("/rate/batch")
+async def rate_image_batch(
+    files: List[UploadFile] = File(...),
+    batch_size: int = Query(None, ge=1),
+    scorer_model: Optional[str] = Query(None, description="Scorer variant (default if omitted)")
+):
+    """
+    Rate many images (or a zip/tar archive of images) in one request.
+    Results are streamed back as NDJSON, one line per image in input order.
+    """
+    scorer_model = _resolve_model("scorer", scorer_model)
+    
+    for file in files:
+        if not _is_archive(file) and not (file.content_type or "").startswith("image/"):
+            raise HTTPException(status_code=400, detail=f"File must be an image or archive: {file.filename}")
+    
+    batch_size = min(batch_size or SCORE_MAX_BATCH_SIZE, MAX_BULK_BATCH_SIZE)
+    
+    async def generate_results():
+        # Reads the uploads after the endpoint returns: FastAPI >= 0.118 keeps them open until the response ends
+        # The lease spans the whole stream so the scorer can't be evicted mid-batch
+        async with model_registry.alease("scorer", scorer_model) as score_detector:
+            try:
+                async for item in score_detector.predict_many(_iter_upload_images(files), batch_size=batch_size):
+                    if "error" in item:
+                        line = {
+                            "index": item["index"],
+                            "filename": item["filename"],
+                            "error": item["error"]
+                        }
+                    else:
+                        line = {
+                            "index": item["index"],
+                            "filename": item["filename"],
+                            "raw_score": item["raw_score"],
+                            "quality_score": item["scaled_score"],
+                            "processing_time": item["processing_time"],
+                            "image_info": item["image_info"]
+                        }
+                    yield json.dumps(line) + "\n"
+            except Exception as e:
+                # The 200 is already sent: a corrupt or oversized archive ends the stream with an error line
+                logger.error(f"Error rating batch: {e}")
+                yield json.dumps({"error": str(e)}) + "\n"
+    
+    return StreamingResponse(generate_results(), media_type="application/x-ndjson")
+
+def _negotiate_response_format(request: Request, response_format: Optional[str]) -> str:
+    """Pick json, binary or multipart from the query parameter, then the Accept header"""
+    if response_format:
+        if response_format not in RESPONSE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"response_format must be one of {', '.join(RESPONSE_FORMATS)}")
+        return "binary" if response_format == "png" else response_format
+    
+    accept = request.headers.get("accept", "")
+    if "multipart/mixed" in accept:
+        return "multipart"
+    if any(media_type in accept for media_type in ("image/png", "image/webp", "image/jpeg")):
+        return "binary"
+    return "json"
+
+def _output_encoding(
+    output_format: str = Query("png", description="png, webp or jpeg"),
+    quality: Optional[int] = Query(None, ge=1, le=100, description="WebP lossy / JPEG quality"),
+    compress_level: Optional[int] = Query(None, ge=0, le=9, description="PNG zlib level"),
+    lossless: bool = Query(False, description="WebP lossless mode")
+) -> OutputEncoding:
+    """Per-request output encoder settings"""
+    try:
+        return OutputEncoding(output_format, compress_level=compress_level, quality=quality, lossless=lossless)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _enhanced_image_stream(
+    image_enhancer: "ImageEnhancer",
+    enhancement_result: Dict[str, Any],
+    encoding: OutputEncoding
+) -> AsyncIterator[bytes]:
+    """Chunks of the enhanced image, encoded on the fly unless already encoded (cache hit)"""
+    if enhancement_result["enhanced_image_bytes"] is not None:
+        return iter_bytes(enhancement_result["enhanced_image_bytes"])
+    return image_enhancer.iter_encoded(enhancement_result["enhanced_image"].rgb, encoding)
+
+async def _release_after(chunks: AsyncIterator[bytes], held: AsyncExitStack) -> AsyncIterator[bytes]:
+    """Pass a response body through, then release what the request held (admission, model leases)"""
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        await held.aclose()
+
+def _binary_image_response(
+    metadata: Dict[str, Any],
+    image_stream: AsyncIterator[bytes],
+    response_format: str,
+    filename: str,
+    encoding: OutputEncoding,
+    held: Optional[AsyncExitStack] = None
+) -> StreamingResponse:
+    """Raw image body with metadata in a header, or multipart/mixed with JSON + image parts.
+    held is closed once the body has been sent, or the client has gone away."""
+    download_name = f"enhanced_{os.path.splitext(filename or 'image')[0]}.{encoding.extension}"
+    metadata_json = json.dumps(metadata)
+    
+    # A body that never starts (disconnect before the first chunk) still releases through the background task
+    background = None
+    if held is not None:
+        image_stream = _release_after(image_stream, held)
+        background = BackgroundTask(held.aclose)
+    
+    if response_format == "binary":
+        return StreamingResponse(
+            image_stream,
+            media_type=encoding.media_type,
+            headers={
+                METADATA_HEADER: metadata_json,
+                "Content-Disposition": f'inline; filename="{download_name}"'
+            },
+            background=background
+        )
+    
+    boundary = uuid.uuid4().hex
+    
+    async def generate_parts():
+        yield (
+            f"--{boundary}\r\n"
+            f"Content-Type: application/json\r\n\r\n"
+            f"{metadata_json}\r\n"
+            f"--{boundary}\r\n"
+            f"Content-Type: {encoding.media_type}\r\n"
+            f'Content-Disposition: attachment; filename="{download_name}"\r\n\r\n'
+        ).encode("utf-8")
+        async for chunk in image_stream:
+            yield chunk
+        yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+    
+    return StreamingResponse(generate_parts(), media_type=f"multipart/mixed; boundary={boundary}", background=background)
+
+async def _base64_encode(data: bytes) -> str:
+    """Base64-encode a large payload off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, lambda: base64.b64encode(data).decode('utf-8'))
+
 @app.post("/enhance/image")
-async def enhance_image_quality(file: UploadFile = File(...)):
+async def enhance_image_quality(
+    request: Request,
+    file: UploadFile = File(...),
+    response_format: Optional[str] = Query(None),
+    encoding: OutputEncoding = Depends(_output_encoding),
+    enhancer_model: Optional[str] = Query(None, description="Enhancer variant (default if omitted)")
+):
     """
-    Enhance the quality of an uploaded image using AI
+    Enhance the quality of an uploaded image using AI.
+    Returns JSON with base64 by default; response_format=binary|multipart (or an
+    Accept header of image/* or multipart/mixed) streams the image instead.
     """
-    if not image_enhancer:
-        raise HTTPException(status_code=503, detail="Image enhancement model not loaded")
+    enhancer_model = _resolve_model("enhancer", enhancer_model)
     
     # Validate file type
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
+    response_format = _negotiate_response_format(request, response_format)
+    _check_admission(enhancer_model)
+    
     try:
         # Read file content
-        content = await file.read()
-        
-        # Run enhancement
-        result = await image_enhancer.enhance(content, file.filename)
+        with metrics.time("/enhance/image", enhancer_model, "upload_read"):
+            content = await file.read()
+        image = DecodedImage.from_bytes(content)
         
-        # Convert enhanced image bytes to base64 for JSON response
-        enhanced_image_b64 = base64.b64encode(result["enhanced_image_bytes"]).decode('utf-8')
-        
-        return JSONResponse(content={
-            "filename": result["filename"],
-            "original_info": result["original_info"],
-            "enhancement_info": result["enhancement_info"],
-            "enhanced_image_base64": enhanced_image_b64,
-            "processing_time": result["total_processing_time"],
-            "success": result["success"]
-        })
+        # Run enhancement once admitted; binary responses encode while streaming
+        async with AsyncExitStack() as held:
+            await held.enter_async_context(_admit_enhancement(image, enhancer_model))
+            image_enhancer = await held.enter_async_context(model_registry.alease("enhancer", enhancer_model))
+            result = await image_enhancer.enhance(
+                image,
+                file.filename,
+                encode=response_format == "json",
+                encoding=encoding
+            )
+            _observe_enhancement("/enhance/image", enhancer_model, result)
+            
+            metadata = {
+                "filename": result["filename"],
+                "enhancer_model": enhancer_model,
+                "original_info": result["original_info"],
+                "enhancement_info": result["enhancement_info"],
+                "output_encoding": result["output_encoding"],
+                "processing_time": result["total_processing_time"],
+                "success": result["success"]
+            }
+            
+            if response_format != "json":
+                # Admission and the lease move to the response: the output's memory is held until it has been sent
+                return _binary_image_response(
+                    metadata, _enhanced_image_stream(image_enhancer, result, encoding), response_format, file.filename, encoding,
+                    held.pop_all()
+                )
+            
+            # Convert enhanced image bytes to base64 for JSON response
+            with metrics.time("/enhance/image", enhancer_model, "serialize"):
+                metadata["enhanced_image_base64"] = await _base64_encode(result["enhanced_image_bytes"])
+                return JSONResponse(content=metadata)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error enhancing image: {e}")
         raise HTTPException(status_code=500, detail=f"Error enhancing image: {str(e)}")
 
 @app.post("/process/complete")
-async def complete_image_processing(file: UploadFile = File(...)):
+async def complete_image_processing(
+    request: Request,
+    file: UploadFile = File(...),
+    response_format: Optional[str] = Query(None),
+    encoding: OutputEncoding = Depends(_output_encoding),
+    scorer_model: Optional[str] = Query(None, description="Scorer variant (default if omitted)"),
+    enhancer_model: Optional[str] = Query(None, description="Enhancer variant (default if omitted)")
+):
     """
-    Complete image processing: rate original, enhance, then rate enhanced image
+    Complete image processing: rate original, enhance, then rate enhanced image.
+    Supports the same response formats as /enhance/image.
     """
-    if not score_detector or not image_enhancer:
-        raise HTTPException(status_code=503, detail="Required models not loaded")
+    scorer_model = _resolve_model("scorer", scorer_model)
+    enhancer_model = _resolve_model("enhancer", enhancer_model)
     
     # Validate file type
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
+    response_format = _negotiate_response_format(request, response_format)
+    _check_admission(enhancer_model)
+    
     try:
-        # Read file content
-        content = await file.read()
+        # Read file content and decode it once for all stages
+        with metrics.time("/process/complete", enhancer_model, "upload_read"):
+            content = await file.read()
+        image = DecodedImage.from_bytes(content)
         
-        # Step 1: Rate original image
-        logger.info("Rating original image...")
-        original_rating = score_detector.predict_sync(content, file.filename)
-        
-        # Step 2: Enhance image
-        logger.info("Enhancing image...")
-        enhancement_result = image_enhancer.enhance_sync(content, file.filename)
-        
-        # Step 3: Rate enhanced image
-        logger.info("Rating enhanced image...")
-        enhanced_rating = score_detector.predict_sync(
-            enhancement_result["enhanced_image_bytes"], 
-            f"enhanced_{file.filename}"
-        )
-        
-        # Convert enhanced image bytes to base64 for JSON response
-        enhanced_image_b64 = base64.b64encode(enhancement_result["enhanced_image_bytes"]).decode('utf-8')
-        
-        # Calculate improvement
-        score_improvement = enhanced_rating["scaled_score"] - original_rating["scaled_score"]
-        percentage_improvement = (score_improvement / original_rating["scaled_score"]) * 100 if original_rating["scaled_score"] > 0 else 0
-        
-        return JSONResponse(content={
-            "filename": file.filename,
-            "original_rating": {
-                "raw_score": original_rating["raw_score"],
-                "quality_score": original_rating["scaled_score"],
-                "processing_time": original_rating["processing_time"],
-                "image_info": original_rating["image_info"]
-            },
-            "enhancement_info": {
-                "original_size": enhancement_result["enhancement_info"]["original_size"],
-                "enhanced_size": enhancement_result["enhancement_info"]["enhanced_size"],
-                "scale_factor": enhancement_result["enhancement_info"]["scale_factor"],
-                "size_increase": enhancement_result["enhancement_info"]["size_increase"],
-                "processing_time": enhancement_result["total_processing_time"]
-            },
-            "enhanced_rating": {
-                "raw_score": enhanced_rating["raw_score"],
-                "quality_score": enhanced_rating["scaled_score"],
-                "processing_time": enhanced_rating["processing_time"]
-            },
-            "improvement_analysis": {
-                "score_improvement": score_improvement,
-                "percentage_improvement": percentage_improvement,
-                "improved": score_improvement > 0
-            },
-            "enhanced_image_base64": enhanced_image_b64,
-            "success": True
-        })
+        # Steps 1 and 2: rate and enhance the original image concurrently,
+        # both on the models' executors so the event loop stays responsive
+        async with AsyncExitStack() as held:
+            await held.enter_async_context(_admit_enhancement(image, enhancer_model))
+            score_detector = await held.enter_async_context(model_registry.alease("scorer", scorer_model))
+            image_enhancer = await held.enter_async_context(model_registry.alease("enhancer", enhancer_model))
+            logger.info("Rating and enhancing original image...")
+            original_rating, enhancement_result = await asyncio.gather(
+                score_detector.predict(image, file.filename),
+                image_enhancer.enhance(
+                    image,
+                    file.filename,
+                    encode=response_format == "json",
+                    encoding=encoding,
+                    scored_by=score_detector.model_id
+                )
+            )
+            
+            # Step 3: Rate enhanced image straight from the enhanced pixels. A cached
+            # enhancement only has its (possibly lossy) encoding left, so it carries
+            # the rating that was made from the pixels
+            logger.info("Rating enhanced image...")
+            enhanced_rating = enhancement_result["enhanced_scores"].get(score_detector.model_id)
+            if enhanced_rating is not None:
+                enhanced_rating = {**enhanced_rating, "processing_time": 0.0, "cache_hit": True}
+            else:
+                enhanced_rating = await score_detector.predict(
+                    enhancement_result["enhanced_image"], 
+                    f"enhanced_{file.filename}"
+                )
+                await asyncio.get_running_loop().run_in_executor(
+                    None, image_enhancer.store_score, enhancement_result, score_detector.model_id, enhanced_rating
+                )
+            
+            for rating in (original_rating, enhanced_rating):
+                _observe_score("/process/complete", scorer_model, rating)
+            _observe_enhancement("/process/complete", enhancer_model, enhancement_result)
+            
+            # Calculate improvement
+            score_improvement = enhanced_rating["scaled_score"] - original_rating["scaled_score"]
+            percentage_improvement = (score_improvement / original_rating["scaled_score"]) * 100 if original_rating["scaled_score"] > 0 else 0
+            
+            metadata = {
+                "filename": file.filename,
+                "scorer_model": scorer_model,
+                "enhancer_model": enhancer_model,
+                "original_rating": {
+                    "raw_score": original_rating["raw_score"],
+                    "quality_score": original_rating["scaled_score"],
+                    "processing_time": original_rating["processing_time"],
+                    "image_info": original_rating["image_info"]
+                },
+                "enhancement_info": {
+                    "original_size": enhancement_result["enhancement_info"]["original_size"],
+                    "enhanced_size": enhancement_result["enhancement_info"]["enhanced_size"],
+                    "scale_factor": enhancement_result["enhancement_info"]["scale_factor"],
+                    "size_increase": enhancement_result["enhancement_info"]["size_increase"],
+                    "output_encoding": enhancement_result["output_encoding"],
+                    "processing_time": enhancement_result["total_processing_time"]
+                },
+                "enhanced_rating": {
+                    "raw_score": enhanced_rating["raw_score"],
+                    "quality_score": enhanced_rating["scaled_score"],
+                    "processing_time": enhanced_rating["processing_time"]
+                },
+                "improvement_analysis": {
+                    "score_improvement": score_improvement,
+                    "percentage_improvement": percentage_improvement,
+                    "improved": score_improvement > 0
+                },
+                "success": True
+            }
+            
+            if response_format != "json":
+                # Admission and the leases move to the response: the output's memory is held until it has been sent
+                return _binary_image_response(
+                    metadata, _enhanced_image_stream(image_enhancer, enhancement_result, encoding), response_format, file.filename, encoding,
+                    held.pop_all()
+                )
+            
+            # Convert enhanced image bytes to base64 for JSON response
+            with metrics.time("/process/complete", enhancer_model, "serialize"):
+                metadata["enhanced_image_base64"] = await _base64_encode(enhancement_result["enhanced_image_bytes"])
+                return JSONResponse(content=metadata)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in complete image processing: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
+@app.post("/jobs/enhance", status_code=202)
+async def submit_enhancement_job(
+    file: UploadFile = File(...),
+    encoding: OutputEncoding = Depends(_output_encoding),
+    enhancer_model: Optional[str] = Query(None, description="Enhancer variant (default if omitted)")
+):
+    """
+    Queue an image for background enhancement and return a job id immediately
+    """
+    if not job_queue:
+        raise HTTPException(status_code=503, detail="Image enhancement model not loaded")
+    
+    # Validate file type
+    if not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    content = await file.read()
+    
+    try:
+        job = job_queue.submit(content, file.filename, encoding=encoding, model=enhancer_model)
+    except UnknownModelError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    return {
+        "job_id": job["job_id"],
+        "enhancer_model": job["model"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['job_id']}",
+        "result_url": f"/enhanced-image/{job['job_id']}.{job['extension']}"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_enhancement_job(job_id: str):
+    """
+    Get the status and progress of a background enhancement job
+    """
+    job = job_queue.get(job_id) if job_queue else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    
+    if job["status"] == "completed":
+        job["result_url"] = f"/enhanced-image/{job_id}.{job['extension']}"
+    
+    return job
+
 @app.get("/enhanced-image/{filename}")
 async def get_enhanced_image(filename: str):
     """
-    Download enhanced image as binary file
-    Note: This is a placeholder. In production, you'd want to store enhanced images 
-    temporarily and serve them via this endpoint.
+    Download the enhanced image of a completed job as a binary stream
     """
-    raise HTTPException(status_code=501, detail="Enhanced image download not implemented. Use base64 from /process/complete endpoint.")
+    job_id = filename.split(".", 1)[0]
+    job = job_queue.get(job_id) if job_queue else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    
+    path = job_queue.result_path(job_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Enhanced image expired")
+    
+    download_name = f"enhanced_{os.path.splitext(job['filename'] or job_id)[0]}.{job['extension']}"
+    return FileResponse(path, media_type=job["media_type"], filename=download_name)
 
 @app.get("/models/info")
 async def get_models_info():
-    """Get information about loaded models"""
-    info = {}
+    """Get information about registered, loaded and resident models"""
+    info = model_registry.get_info() if model_registry else {}
+    info["inference_pool"] = inference_pool.get_stats() if inference_pool else None
+    info["score_store"] = score_store.get_stats() if score_store else None
+    info["device"] = device
+    
+    return info
+
+def _score_response(content_hash: str, scorer_model: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "content_hash": content_hash,
+        "scorer_model": scorer_model,
+        "raw_score": result["raw_score"],
+        "quality_score": result["scaled_score"],
+        "image_info": result["image_info"]
+    }
+
+# Scorer model_ids by (weights file, mtime, size), so a lookup hashes a checkpoint once per version
+_scorer_ids: Dict[Tuple[str, int, int], str] = {}
+
+def _scorer_model_id(scorer_model: str) -> str:
+    """model_id a registered scorer stores its scores under, computed from its weights file without loading it"""
+    from models.score_inference import scorer_weights_path, scorer_identity
     
-    if score_detector:
-        info["score_model"] = score_detector.get_model_info()
+    spec = model_registry.details(scorer_model)
+    weights_path = scorer_weights_path(
+        spec["model_path"],
+        spec.get("precision", SCORE_PRECISION),
+        spec.get("backend", INFERENCE_BACKEND)
+    )
+    stat = os.stat(weights_path)
+    key = (weights_path, stat.st_mtime_ns, stat.st_size)
+    if key not in _scorer_ids:
+        _scorer_ids[key] = scorer_identity(weights_path)
+    return _scorer_ids[key]
+
+async def _lookup_scores(content_hashes: List[str], scorer_model: Optional[str]) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+    """Stored scores of the resolved scorer for SHA-256 content hashes"""
+    if score_store is None:
+        raise HTTPException(status_code=404, detail="Score store is disabled (set SCORE_STORE_PATH)")
+    scorer_model = _resolve_model("scorer", scorer_model)
     
-    if image_enhancer:
-        info["enhancement_model"] = image_enhancer.get_model_info()
+    content_hashes = [content_hash.lower() for content_hash in content_hashes]
+    for content_hash in content_hashes:
+        if len(content_hash) != 64 or not all(c in "0123456789abcdef" for c in content_hash):
+            raise HTTPException(status_code=400, detail=f"Not a SHA-256 hex digest: {content_hash!r}")
     
-    info["device"] = device
+    # Every computed score is written to the store, so it alone answers lookups; no model is loaded
+    loop = asyncio.get_running_loop()
+    try:
+        model_id = await loop.run_in_executor(None, _scorer_model_id, scorer_model)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Weights of scorer '{scorer_model}' not found")
+    found = await loop.run_in_executor(None, score_store.get_many, content_hashes, model_id)
+    return scorer_model, found
+
+@app.get("/scores/{content_hash}")
+async def get_score(
+    content_hash: str,
+    scorer_model: Optional[str] = Query(None, description="Scorer variant (default if omitted)")
+):
+    """
+    Look up the stored score of an image by the SHA-256 of its bytes
+    """
+    scorer_model, found = await _lookup_scores([content_hash], scorer_model)
+    result = found.get(content_hash.lower())
+    if result is None:
+        raise HTTPException(status_code=404, detail="No score stored for this image and scorer checkpoint")
+    return _score_response(content_hash.lower(), scorer_model, result)
+
+@app.post("/scores/lookup")
+async def lookup_scores(
+    hashes: List[str] = Body(..., embed=True),
+    scorer_model: Optional[str] = Query(None, description="Scorer variant (default if omitted)")
+):
+    """
+    Look up stored scores for many SHA-256 content hashes; unknown ones are listed as missing
+    """
+    if len(hashes) > SCORE_LOOKUP_MAX_HASHES:
+        raise HTTPException(status_code=413, detail=f"At most {SCORE_LOOKUP_MAX_HASHES} hashes per lookup")
     
-    return info
+    scorer_model, found = await _lookup_scores(hashes, scorer_model)
+    return {
+        "scorer_model": scorer_model,
+        "scores": [_score_response(content_hash, scorer_model, result) for content_hash, result in found.items()],
+        "missing": [content_hash for content_hash in dict.fromkeys(value.lower() for value in hashes) if content_hash not in found]
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: per-stage latency histograms, queue depths and process RSS"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=503, detail="Metrics are disabled (METRICS_ENABLED or prometheus_client missing)")
+    
+    body, content_type = metrics.render(_queue_depths())
+    return Response(content=body, media_type=content_type)
+
+def _require_profiler(request: Request) -> RequestProfiler:
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILE_DIR)")
+    if not _profile_authorized(request):
+        raise HTTPException(status_code=403, detail=f"Missing or wrong {PROFILE_HEADER} token")
+    return profiler
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    """List recent request profiles, newest first"""
+    request_profiler = _require_profiler(request)
+    return {"profiles": request_profiler.list_traces(), "stats": request_profiler.get_stats()}
+
+@app.get("/admin/profiles/{name}")
+async def get_profile(name: str, request: Request):
+    """
+    Download a profile: .pt.trace.json.gz opens in Perfetto or chrome://tracing,
+    .stacks.folded in speedscope or flamegraph.pl
+    """
+    path = _require_profiler(request).trace_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found or evicted")
+    
+    media_type = "application/gzip" if name.endswith(".gz") else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=name)
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,62 @@
+import os
+import logging
+from typing import Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Runtimes a model's forward pass can run on
+BACKENDS = ("torch", "onnx")
+
+def onnx_artifact_path(model_path: str) -> str:
+    """Where the exported ONNX graph of a checkpoint is stored"""
+    return f"{os.path.splitext(model_path)[0]}.onnx"
+
+class OnnxBackend:
+    """ONNX Runtime session behind the same call interface as the torch module it replaces.
+
+    Takes and returns torch tensors so the surrounding pre- and post-processing
+    is shared with the torch backend. The session is created on first use in
+    each process: ONNX Runtime's thread pools don't survive fork, so forked
+    inference workers build their own instead of inheriting the supervisor's.
+    """
+
+    def __init__(self, path: str, device: str = "cpu", threads: int = 0):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The onnx backend needs onnxruntime (pip install onnxruntime)") from e
+
+        self.path = path
+        self.threads = threads
+        self.providers = ["CPUExecutionProvider"]
+        if torch.device(device).type == "cuda":
+            self.providers.insert(0, "CUDAExecutionProvider")
+        self._session = None
+        self._pid: Optional[int] = None
+
+        # Load once here so a broken export fails at startup rather than on the first request
+        self._get_session()
+
+    def _get_session(self):
+        if self._session is None or self._pid != os.getpid():
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            if self.threads > 0:
+                options.intra_op_num_threads = self.threads
+            self._session = onnxruntime.InferenceSession(self.path, sess_options=options, providers=self.providers)
+            self._input_name = self._session.get_inputs()[0].name
+            self._pid = os.getpid()
+            logger.info(f"Opened ONNX Runtime session for {self.path} ({self._session.get_providers()[0]})")
+        return self._session
+
+    def __call__(self, tensor: torch.Tensor) -> torch.Tensor:
+        session = self._get_session()
+        output = session.run(None, {self._input_name: tensor.detach().float().cpu().numpy()})[0]
+        return torch.from_numpy(output)
+
+    def memory_bytes(self) -> int:
+        """Size of the serialized graph and weights, which the session holds in memory"""
+        return os.path.getsize(self.path)
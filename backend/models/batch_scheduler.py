@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Callable, Optional
+from concurrent.futures import Executor
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+class BatchScheduler:
+    """Dynamic micro-batching queue in front of a batched predict function"""
+
+    def __init__(
+        self,
+        predict_batch: Callable[[torch.Tensor], List[Dict[str, Any]]],
+        executor: Executor,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0
+    ):
+        self.predict_batch = predict_batch
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        # Created lazily so the queue binds to the running event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._pending = set()
+
+        # Counters
+        self.total_requests = 0
+        self.total_batches = 0
+        self.batch_size_counts: Dict[int, int] = {}
+        self.total_queue_time = 0.0
+        self.max_queue_time = 0.0
+
+    def _ensure_started(self):
+        """Start the collector task on the current event loop"""
+        loop = asyncio.get_running_loop()
+        if self._collector is None or self._collector.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._collector = loop.create_task(self._collect())
+
+    async def submit(self, image_tensor: torch.Tensor) -> Dict[str, Any]:
+        """Queue a (1, 224, 224, 3) uint8 tensor and wait for its batched result"""
+        self._ensure_started()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_tensor, future, time.time()))
+        return await future
+
+    async def _collect(self):
+        """Group queued requests by max batch size or wait window"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                try:
+                    if timeout <= 0:
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+
+            # Dispatch without waiting so the next batch can be collected
+            task = loop.create_task(self._dispatch(batch))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def _run_batch(self, tensors: List[torch.Tensor]):
+        """Stack tensors and run one forward pass (executor thread)"""
+        started_at = time.time()
+        return self.predict_batch(torch.cat(tensors, dim=0)), started_at
+
+    async def _dispatch(self, batch: List[tuple]):
+        """Run a collected batch and fan results back out to the waiters"""
+        tensors = [tensor for tensor, _, _ in batch]
+
+        try:
+            loop = asyncio.get_running_loop()
+            results, started_at = await loop.run_in_executor(
+                self.executor,
+                self._run_batch,
+                tensors
+            )
+        except Exception as e:
+            logger.error(f"Error in batched image scoring: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        batch_size = len(batch)
+        self.total_batches += 1
+        self.batch_size_counts[batch_size] = self.batch_size_counts.get(batch_size, 0) + 1
+
+        for (_, future, enqueued_at), result in zip(batch, results):
+            queue_time = max(0.0, started_at - enqueued_at)
+            self.total_requests += 1
+            self.total_queue_time += queue_time
+            self.max_queue_time = max(self.max_queue_time, queue_time)
+
+            result["queue_time"] = queue_time
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batch size distribution and queueing counters"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "batch_size_distribution": {
+                str(size): count for size, count in sorted(self.batch_size_counts.items())
+            },
+            "average_batch_size": self.total_requests / self.total_batches if self.total_batches else 0.0,
+            "average_queue_time": self.total_queue_time / self.total_requests if self.total_requests else 0.0,
+            "max_queue_time": self.max_queue_time,
+            "queued": self._queue.qsize() if self._queue is not None else 0
+        }
+
+    def stop(self):
+        """Cancel the collector from any thread; nothing may still be queued"""
+        if self._collector is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._collector.cancel)
+        self._collector = None
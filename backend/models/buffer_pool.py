@@ -0,0 +1,115 @@
+import sys
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Spatial dimensions are rounded up to a multiple of this, so images of nearby
+# sizes share a shape class (and a buffer)
+SHAPE_GRANULARITY = 64
+
+def shape_class(shape: Tuple[int, ...], granularity: int = SHAPE_GRANULARITY) -> Tuple[int, ...]:
+    """Round every dimension but the last (channels) up to the granularity"""
+    return tuple(-(-dim // granularity) * granularity for dim in shape[:-1]) + tuple(shape[-1:])
+
+def _refcounts(buffers: List[np.ndarray]) -> List[int]:
+    return [sys.getrefcount(buffer) for buffer in buffers]
+
+# What _refcounts reports for a buffer that only a pool list references (interpreter dependent)
+IDLE_REFCOUNT = _refcounts([np.empty(1)])[0]
+
+class BufferPool:
+    """Reusable ndarrays keyed by (shape class, dtype), holding at most max_bytes.
+
+    take() returns a view of a pooled buffer. Views, torch.from_numpy tensors
+    and DecodedImage all keep a reference to the buffer they came from, so a
+    buffer is free again once the pool holds the only reference: nothing is
+    handed back, and plain reference counting (no gc.collect) releases it.
+    Requests that don't fit in the budget next to the buffers in use get an
+    unpooled array.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._buffers: "OrderedDict[Tuple[Tuple[int, ...], str], List[np.ndarray]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.reuses = 0
+        self.allocations = 0
+        self.unpooled = 0
+        self.evictions = 0
+
+    def take(self, shape: Tuple[int, ...], dtype: Any = np.uint8) -> np.ndarray:
+        """A C-contiguous array of the given shape; contents are undefined"""
+        dtype = np.dtype(dtype)
+        pooled_shape = shape_class(shape)
+        count = int(np.prod(shape))
+        key = (pooled_shape, dtype.str)
+
+        with self._lock:
+            buffers = self._buffers.get(key, [])
+            if buffers:
+                self._buffers.move_to_end(key)
+            for buffer, refcount in zip(buffers, _refcounts(buffers)):
+                if refcount == IDLE_REFCOUNT:
+                    self.reuses += 1
+                    return buffer[:count].reshape(shape)
+
+            nbytes = int(np.prod(pooled_shape)) * dtype.itemsize
+            if not self._make_room(nbytes):
+                self.unpooled += 1
+                return np.empty(shape, dtype=dtype)
+
+            buffer = np.empty(int(np.prod(pooled_shape)), dtype=dtype)
+            self._buffers.setdefault(key, []).append(buffer)
+            self._bytes += nbytes
+            self.allocations += 1
+            return buffer[:count].reshape(shape)
+
+    def _make_room(self, nbytes: int) -> bool:
+        """Drop idle buffers, least recently used shape class first, until nbytes fit"""
+        if nbytes > self.max_bytes:
+            return False
+
+        for key in list(self._buffers):
+            if self._bytes + nbytes <= self.max_bytes:
+                break
+            kept = []
+            for buffer, refcount in zip(self._buffers[key], _refcounts(self._buffers[key])):
+                if refcount == IDLE_REFCOUNT and self._bytes + nbytes > self.max_bytes:
+                    self._bytes -= buffer.nbytes
+                    self.evictions += 1
+                else:
+                    kept.append(buffer)
+            if kept:
+                self._buffers[key] = kept
+            else:
+                del self._buffers[key]
+
+        return self._bytes + nbytes <= self.max_bytes
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_use = sum(
+                buffer.nbytes
+                for buffers in self._buffers.values()
+                for buffer, refcount in zip(buffers, _refcounts(buffers))
+                if refcount > IDLE_REFCOUNT
+            )
+            return {
+                "shape_classes": len(self._buffers),
+                "buffers": sum(len(buffers) for buffers in self._buffers.values()),
+                "pooled_mb": self._bytes / (1024 * 1024),
+                "in_use_mb": in_use / (1024 * 1024),
+                "max_mb": self.max_bytes / (1024 * 1024),
+                "reuses": self.reuses,
+                "allocations": self.allocations,
+                "unpooled": self.unpooled,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,70 @@
+import os
+import logging
+from typing import Dict, Optional, Sequence
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+def load_state_dict(path: str, device: torch.device) -> Dict[str, torch.Tensor]:
+    """Load a checkpoint memory-mapped and restricted to plain tensors and containers.
+
+    Tensors are paged in from the file as they are copied into the model rather
+    than read up front. Legacy (pre-zipfile) checkpoints can't be mapped and are
+    read normally.
+    """
+    try:
+        return torch.load(path, map_location=device, mmap=True, weights_only=True)
+    except RuntimeError as e:
+        if "mmap" not in str(e):
+            raise
+        logger.warning(f"{path} is not a zipfile checkpoint, loading without mmap")
+        return torch.load(path, map_location=device, weights_only=True)
+
+def scripted_artifact_path(artifact_dir: Optional[str], model_path: str, identity: str) -> Optional[str]:
+    """Where the TorchScript artifact for a checkpoint and settings identity lives (None = disabled)"""
+    if not artifact_dir:
+        return None
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(artifact_dir, f"{name}-{identity}.ts")
+
+def load_scripted(path: Optional[str], device: torch.device) -> Optional[torch.jit.ScriptModule]:
+    """Load a saved TorchScript module, or None if there is none or it can't be read"""
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        module = torch.jit.load(path, map_location=device)
+        module.eval()
+        logger.info(f"Loaded TorchScript artifact {path}")
+        return module
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable TorchScript artifact {path}: {e}")
+        return None
+
+def save_scripted(
+    model: nn.Module,
+    path: Optional[str],
+    example: torch.Tensor,
+    check_inputs: Sequence[torch.Tensor] = ()
+) -> bool:
+    """Trace a model and save it for the next cold start.
+
+    check_inputs (differently shaped examples) must give the same outputs as
+    the eager model, so a trace that baked in the example's shape is never
+    saved. Returns whether an artifact was written.
+    """
+    if path is None:
+        return False
+    try:
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example, check_inputs=[(example,)] + [(x,) for x in check_inputs])
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        torch.jit.save(traced, tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved TorchScript artifact {path}")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not save TorchScript artifact {path}: {e}")
+        return False
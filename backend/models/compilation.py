@@ -0,0 +1,29 @@
+import logging
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+# How a loaded network is optimized before serving:
+#   none         eager (or the loaded TorchScript module) as is
+#   torchscript  traced, frozen and optimize_for_inference'd (weights folded into the graph)
+#   compile      torch.compile; kernels are generated on the first call of each input shape
+COMPILE_MODES = ("none", "torchscript", "compile")
+
+def compile_model(model: nn.Module, mode: str, example: torch.Tensor) -> nn.Module:
+    """Optimize an eval-mode network for inference; example is a typical input"""
+    if mode not in COMPILE_MODES:
+        raise ValueError(f"Unknown compile mode {mode!r} (expected one of {', '.join(COMPILE_MODES)})")
+    if mode == "none":
+        return model
+
+    if mode == "compile":
+        logger.info("Wrapping model with torch.compile; kernels are built during warmup")
+        return torch.compile(model)
+
+    with torch.no_grad():
+        scripted = model if isinstance(model, torch.jit.ScriptModule) else torch.jit.trace(model, example)
+        optimized = torch.jit.optimize_for_inference(torch.jit.freeze(scripted.eval()))
+    logger.info("Froze and optimized TorchScript module for inference")
+    return optimized
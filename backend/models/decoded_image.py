@@ -0,0 +1,113 @@
+import io
+import threading
+from typing import Dict, Any, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from .result_cache import hash_bytes
+
+class DecodedImage:
+    """Image decoded once and shared between the scoring and enhancement stages"""
+
+    def __init__(
+        self,
+        image_bytes: Optional[bytes] = None,
+        array: Optional[np.ndarray] = None,
+        format: Optional[str] = None
+    ):
+        if image_bytes is None and array is None:
+            raise ValueError("DecodedImage needs either encoded bytes or an RGB array")
+
+        self.image_bytes = image_bytes
+        self._rgb = array
+        self._format = format
+        self._info: Optional[Dict[str, Any]] = None
+        self._content_hash: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_bytes(cls, image_bytes: bytes) -> "DecodedImage":
+        """Wrap encoded upload bytes; decoding happens on first use"""
+        return cls(image_bytes=image_bytes)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, format: Optional[str] = None) -> "DecodedImage":
+        """Wrap an already decoded (H, W, 3) uint8 RGB array"""
+        if array.dtype != np.uint8:
+            array = np.clip(array, 0, 255).astype(np.uint8)
+        return cls(array=array, format=format)
+
+    @classmethod
+    def ensure(cls, image: Union[bytes, "DecodedImage"]) -> "DecodedImage":
+        """Accept either raw bytes or an existing DecodedImage"""
+        if isinstance(image, DecodedImage):
+            return image
+        return cls.from_bytes(image)
+
+    def _open(self) -> Image.Image:
+        return Image.open(io.BytesIO(self.image_bytes))
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        """Source dimensions, format and mode (header only, no pixel decode)"""
+        with self._lock:
+            if self._info is None:
+                if self.image_bytes is not None:
+                    image = self._open()
+                    self._info = {
+                        "width": image.width,
+                        "height": image.height,
+                        "format": image.format,
+                        "mode": image.mode
+                    }
+                else:
+                    self._info = {
+                        "width": self._rgb.shape[1],
+                        "height": self._rgb.shape[0],
+                        "format": self._format,
+                        "mode": "RGB"
+                    }
+            return dict(self._info)
+
+    @property
+    def size(self):
+        """(width, height) of the source image"""
+        info = self.info
+        return info["width"], info["height"]
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """Full-resolution (H, W, 3) uint8 RGB pixels, decoded on first access"""
+        with self._lock:
+            if self._rgb is None:
+                image = self._open()
+                self._format = image.format
+                self._rgb = np.asarray(image.convert("RGB"))
+            return self._rgb
+
+    @property
+    def has_pixels(self) -> bool:
+        """Whether full-resolution pixels are already decoded"""
+        return self._rgb is not None
+
+    def open_draft(self, min_size: int) -> Image.Image:
+        """Decode an RGB image no smaller than min_size, using JPEG DCT scaling when possible.
+        The reduced decode is not cached; it does not replace the full-resolution pixels."""
+        image = self._open()
+        if image.format == "JPEG":
+            image.draft("RGB", (min_size, min_size))
+        return image.convert("RGB")
+
+    def to_pil(self) -> Image.Image:
+        """RGB PIL view of the decoded pixels"""
+        return Image.fromarray(self.rgb)
+
+    @property
+    def content_hash(self) -> Optional[str]:
+        """Hash of the encoded bytes, or None for in-memory arrays"""
+        if self.image_bytes is None:
+            return None
+        if self._content_hash is None:
+            self._content_hash = hash_bytes(self.image_bytes)
+        return self._content_hash
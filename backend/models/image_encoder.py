@@ -0,0 +1,189 @@
+import io
+import time
+import zlib
+import struct
+import logging
+import threading
+from typing import Dict, Any, Optional, BinaryIO
+
+import numpy as np
+from PIL import Image
+
+from .output_buffer import release_rows
+
+logger = logging.getLogger(__name__)
+
+class OutputEncoding:
+    """Per-request output format and quality settings"""
+
+    FORMATS = {
+        "png": ("PNG", "image/png", "png"),
+        "webp": ("WEBP", "image/webp", "webp"),
+        "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    }
+
+    def __init__(
+        self,
+        format: str = "png",
+        compress_level: Optional[int] = None,
+        quality: Optional[int] = None,
+        lossless: bool = False
+    ):
+        format = (format or "png").lower()
+        if format == "jpg":
+            format = "jpeg"
+        if format not in self.FORMATS:
+            raise ValueError(f"output_format must be one of {', '.join(self.FORMATS)}")
+        if compress_level is not None and not 0 <= compress_level <= 9:
+            raise ValueError("compress_level must be between 0 and 9")
+        if quality is not None and not 1 <= quality <= 100:
+            raise ValueError("quality must be between 1 and 100")
+
+        self.format = format
+        self.compress_level = 6 if compress_level is None else compress_level
+        self.quality = (90 if format == "jpeg" else 80) if quality is None else quality
+        self.lossless = lossless if format == "webp" else format == "png"
+
+    @property
+    def pil_format(self) -> str:
+        return self.FORMATS[self.format][0]
+
+    @property
+    def media_type(self) -> str:
+        return self.FORMATS[self.format][1]
+
+    @property
+    def extension(self) -> str:
+        return self.FORMATS[self.format][2]
+
+    def save_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for PIL Image.save"""
+        if self.format == "png":
+            return {"compress_level": self.compress_level}
+        if self.format == "webp":
+            # method 4 is PIL's speed/size middle ground; 6 is far slower for little gain
+            return {"lossless": self.lossless, "quality": self.quality, "method": 4}
+        return {"quality": self.quality, "optimize": False}
+
+    def cache_tag(self) -> str:
+        """Stable description of everything that changes the encoded bytes"""
+        if self.format == "png":
+            return f"png-z{self.compress_level}"
+        if self.format == "webp":
+            return f"webp-{'lossless' if self.lossless else 'lossy'}-q{self.quality}"
+        return f"jpeg-q{self.quality}"
+
+    def describe(self) -> Dict[str, Any]:
+        return {"format": self.format, "media_type": self.media_type, **self.save_kwargs()}
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+def _paeth_filter(band: np.ndarray, previous_row: np.ndarray) -> np.ndarray:
+    """PNG Paeth-filtered scanlines (filter byte included) for an (h, w, 3) uint8 band"""
+    current = band.reshape(band.shape[0], -1).astype(np.int16)
+    above = np.vstack([previous_row.reshape(1, -1).astype(np.int16), current[:-1]])
+
+    left = np.zeros_like(current)
+    left[:, 3:] = current[:, :-3]
+    upper_left = np.zeros_like(current)
+    upper_left[:, 3:] = above[:, :-3]
+
+    estimate = left + above - upper_left
+    distance_left = np.abs(estimate - left)
+    distance_above = np.abs(estimate - above)
+    distance_upper_left = np.abs(estimate - upper_left)
+    predictor = np.where(
+        (distance_left <= distance_above) & (distance_left <= distance_upper_left),
+        left,
+        np.where(distance_above <= distance_upper_left, above, upper_left)
+    )
+
+    filtered = np.empty((current.shape[0], current.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = 4
+    filtered[:, 1:] = (current - predictor).astype(np.uint8)
+    return filtered
+
+def write_png_bands(
+    array: np.ndarray,
+    output: BinaryIO,
+    compress_level: int = 6,
+    band_bytes: int = 2 * 1024 * 1024
+):
+    """Encode an (H, W, 3) uint8 array as PNG one row band at a time.
+
+    Only a band of rows is held in filtered form, so memory stays flat for
+    outputs that would not fit through PIL (which copies the whole image).
+    Bands of memory-mapped arrays are paged out once written.
+    """
+    height, width = array.shape[:2]
+    band_rows = max(1, band_bytes // (width * 3))
+    output.write(b"\x89PNG\r\n\x1a\n")
+    output.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+
+    compressor = zlib.compressobj(compress_level)
+    previous_row = np.zeros((width, 3), dtype=np.uint8)
+    for start in range(0, height, band_rows):
+        band = np.asarray(array[start:start + band_rows])
+        data = compressor.compress(_paeth_filter(band, previous_row).tobytes())
+        if data:
+            output.write(_png_chunk(b"IDAT", data))
+        previous_row = band[-1].copy()
+        release_rows(array, start, start + band.shape[0])
+
+    output.write(_png_chunk(b"IDAT", compressor.flush()))
+    output.write(_png_chunk(b"IEND", b""))
+
+class ImageEncoder:
+    """Encodes enhanced arrays and keeps per-format timing counters.
+
+    PNG outputs larger than band_threshold bytes are encoded band by band
+    instead of through PIL.
+    """
+
+    def __init__(self, band_threshold: int = 256 * 1024 * 1024):
+        self.band_threshold = band_threshold
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def encode(self, array: np.ndarray, encoding: OutputEncoding, output: Optional[BinaryIO] = None) -> Optional[bytes]:
+        """Encode an RGB array to bytes, or straight into output if given"""
+        start_time = time.time()
+
+        if array.dtype != np.uint8:
+            array = np.clip(array, 0, 255).astype(np.uint8)
+
+        target = output if output is not None else io.BytesIO()
+        if encoding.format == "png" and 0 < self.band_threshold < array.nbytes:
+            write_png_bands(array, target, encoding.compress_level)
+        else:
+            Image.fromarray(array).save(target, format=encoding.pil_format, **encoding.save_kwargs())
+        encoded = None if output is not None else target.getvalue()
+
+        self._record(encoding, time.time() - start_time, len(encoded) if encoded is not None else None)
+        return encoded
+
+    def _record(self, encoding: OutputEncoding, elapsed: float, size: Optional[int]):
+        with self._lock:
+            stats = self._stats.setdefault(encoding.cache_tag(), {
+                "count": 0, "total_time": 0.0, "max_time": 0.0, "total_bytes": 0, "sized": 0
+            })
+            stats["count"] += 1
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+            if size is not None:
+                stats["total_bytes"] += size
+                stats["sized"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Average/max encode time and average output size per encoding"""
+        with self._lock:
+            return {
+                tag: {
+                    "count": stats["count"],
+                    "average_time": stats["total_time"] / stats["count"],
+                    "max_time": stats["max_time"],
+                    "average_bytes": stats["total_bytes"] / stats["sized"] if stats["sized"] else None
+                }
+                for tag, stats in self._stats.items()
+            }
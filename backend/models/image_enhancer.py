@@ -222,66 +222,229 @@ from PIL import Image
 import io
 import logging
 import time
-from typing import Dict, Any, Tuple
+from typing import TYPE_CHECKING, Dict, Any, Tuple, Optional, Union, Callable, AsyncIterator, BinaryIO
 import asyncio
+import functools
 from concurrent.futures import ThreadPoolExecutor
-from basicsr.archs.rrdbnet_arch import RRDBNet
-from realesrgan import RealESRGANer
-import gc
+from .result_cache import ResultCache, file_sha256, model_identity
+from .decoded_image import DecodedImage
+from .streaming import iter_writer_output
+from .image_encoder import ImageEncoder, OutputEncoding
+from .tile_engine import TileEngine, bf16_supported
+from .buffer_pool import BufferPool
+from .backends import BACKENDS, OnnxBackend, onnx_artifact_path
+from .compilation import compile_model
+from .checkpoints import load_state_dict, scripted_artifact_path, load_scripted, save_scripted
+
+# basicsr (and with it cv2 and torchvision) is only imported when a network is
+# built from a checkpoint; a saved TorchScript artifact loads without it
+if TYPE_CHECKING:
+    from realesrgan import RealESRGANer
 
 logger = logging.getLogger(__name__)
 
 class ImageEnhancer:
     """Memory-optimized Image enhancement using Real-ESRGAN"""
     
-    def __init__(self, model_path: str, device: str = "cpu", scale: int = 4):
+    def __init__(
+        self,
+        model_path: str,
+        device: str = "cpu",
+        scale: int = 4,
+        num_block: int = 6,
+        cache: Optional[ResultCache] = None,
+        tile_workers: int = 0,
+        tile_threads: int = 0,
+        max_image_size: int = 0,
+        memmap_threshold_mb: float = 256,
+        memmap_dir: Optional[str] = None,
+        artifact_dir: Optional[str] = None,
+        precision: str = "fp32",
+        memory_format: str = "contiguous",
+        backend: str = "torch",
+        compile_mode: str = "none",
+        buffer_pool_mb: float = 512
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown enhancer backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+        if backend == "onnx" and (precision, memory_format) != ("fp32", "contiguous"):
+            raise ValueError("The onnx backend runs the exported fp32 graph; precision and memory_format are torch-only")
+        
         self.device = device
         self.model_path = model_path
         self.scale = scale
-        self.upsampler = None
+        self.num_block = num_block
+        self.precision = precision
+        self.memory_format = memory_format
+        self.backend = backend
+        self.compile_mode = compile_mode
+        self.model = None
+        self.loaded_from = None
+        self._memory_bytes: Optional[int] = None
+        self.cache = cache
         self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = 0  # enhance() calls waiting for or running on the executor
         
         # Memory optimization settings
-        self.max_image_size = 512  # Maximum dimension for input images
+        self.max_image_size = max_image_size  # Maximum dimension for input images (0 = no limit)
+        self.memmap_threshold = int(memmap_threshold_mb * 1024 * 1024)
+        # Output canvases (and padded inputs) are reused instead of reclaimed with gc.collect()
+        self.buffer_pool = BufferPool(int(buffer_pool_mb * 1024 * 1024)) if buffer_pool_mb > 0 else None
         self.tile_size = 256 if device == "cpu" else 512  # Smaller tiles for CPU
+        self.tile_pad = 10
+        
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Model file not found: {self.model_path}")
+        
+        # Everything that changes the enhanced output is part of the cache identity
+        weights_hash = file_sha256(self.model_path)
+        self.model_id = model_identity(
+            weights_hash,
+            scale=self.scale,
+            tile_size=self.tile_size,
+            max_image_size=self.max_image_size,
+            precision=self.precision,
+            memory_format=self.memory_format,
+            backend=self.backend,
+            compile_mode=self.compile_mode
+        )
+        
+        # TorchScript artifact reused across cold starts (None = disabled)
+        self.artifact_path = scripted_artifact_path(
+            artifact_dir,
+            self.model_path,
+            model_identity(weights_hash, num_block=self.num_block, scale=self.scale, torch=torch.__version__, device=self.device)
+        )
         
         self._load_model()
+        self._compile()
+        
+        # Runs the network's tiles in parallel; output matches RealESRGANer.enhance exactly
+        self.tile_engine = TileEngine(
+            self.model,
+            scale=self.scale,
+            tile_size=self.tile_size,
+            tile_pad=self.tile_pad,
+            workers=tile_workers,
+            threads_per_worker=tile_threads,
+            device=self.device,
+            memmap_threshold=self.memmap_threshold,
+            memmap_dir=memmap_dir,
+            precision=self.precision,
+            memory_format=self.memory_format,
+            buffer_pool=self.buffer_pool
+        )
+        # Large outputs are memory-mapped, so encode them in bands rather than through PIL
+        self.encoder = ImageEncoder(band_threshold=self.memmap_threshold)
+    
+    def _build_network(self) -> torch.nn.Module:
+        """RRDBNet backbone; the block count must match the checkpoint"""
+        from basicsr.archs.rrdbnet_arch import RRDBNet
+        
+        return RRDBNet(
+            num_in_ch=3, 
+            num_out_ch=3, 
+            num_feat=64,
+            num_block=self.num_block,  # 6 for RealESRGAN_x4plus_anime_6B and 23 for RealESRGAN_x4plus 
+            num_grow_ch=32, 
+            scale=self.scale
+        )
     
     def _load_model(self):
-        """Load the Real-ESRGAN model with memory optimizations"""
+        """Load the Real-ESRGAN network, from its TorchScript artifact if one was saved"""
         try:
-            if not os.path.exists(self.model_path):
-                raise FileNotFoundError(f"Model file not found: {self.model_path}")
-            
-            # Corrected model definition for 6-block architecture
-            model = RRDBNet(
-                num_in_ch=3, 
-                num_out_ch=3, 
-                num_feat=64,
-                num_block=6,  # 6 for RealESRGAN_x4plus_anime_6B and 23 for RealESRGAN_x4plus 
-                num_grow_ch=32, 
-                scale=self.scale
-            )
-            
-            # Initialize upsampler with memory optimizations
-            self.upsampler = RealESRGANer(
-                scale=self.scale,
-                model_path=self.model_path,
-                model=model,
-                tile=self.tile_size,  # Enable tiling for memory efficiency
-                tile_pad=10,
-                pre_pad=0,
-                half=False,  # Disable half precision on CPU for stability
-                gpu_id=None  # Force CPU usage
-            )
+            device = torch.device(self.device)
+            if self.backend == "onnx":
+                onnx_path = onnx_artifact_path(self.model_path)
+                if not os.path.exists(onnx_path):
+                    raise FileNotFoundError(
+                        f"No exported enhancer at {onnx_path}; create it with python -m models.onnx_export enhancer "
+                        f"--model {self.model_path} --scale {self.scale} --num-block {self.num_block}"
+                    )
+                self.model = OnnxBackend(onnx_path, device=self.device)
+                self.loaded_from = "onnx"
+                return
+            
+            self.model = load_scripted(self.artifact_path, device)
+            if self.model is not None:
+                self.loaded_from = "torchscript"
+                self._apply_compute_settings()
+                return
+            
+            # Same weights RealESRGANer would pick, read from the mapped checkpoint
+            checkpoint = load_state_dict(self.model_path, device)
+            key = "params_ema" if "params_ema" in checkpoint else "params"
+            model = self._build_network()
+            model.load_state_dict(checkpoint[key] if key in checkpoint else checkpoint, strict=True, assign=True)
+            
+            # Full precision: half is unstable on CPU
+            self.model = model.to(device).eval()
+            self.loaded_from = "checkpoint"
             
             logger.info(f"Loaded Real-ESRGAN model from {self.model_path}")
             logger.info(f"Using tile size: {self.tile_size} for memory optimization")
             
+            # x2 networks pixel-unshuffle, so every traced and checked shape stays even
+            tile = self.tile_size + 2 * self.tile_pad
+            save_scripted(
+                self.model,
+                self.artifact_path,
+                torch.rand(1, 3, tile, tile, device=device),
+                check_inputs=[torch.rand(1, 3, 36, 52, device=device)]
+            )
+            self._apply_compute_settings()
+            
         except Exception as e:
             logger.error(f"Failed to load image enhancement model: {e}")
             raise e
     
+    def _apply_compute_settings(self):
+        """Lay the weights out for the tile memory format; bf16 is applied per tile by autocast"""
+        if self.memory_format == "channels_last":
+            self.model = self.model.to(memory_format=torch.channels_last)
+        if self.precision == "bf16" and self.device == "cpu" and not bf16_supported():
+            logger.warning("This CPU has no native bfloat16 support; bf16 enhancement will be emulated and slow")
+    
+    def _compile(self):
+        """Optimize the loaded network for serving (compile_mode); the first calls pay for it, see warmup()"""
+        if self.compile_mode == "none":
+            return
+        if isinstance(self.model, OnnxBackend):
+            raise ValueError("compile_mode applies to the torch backend only")
+        
+        # Frozen modules fold their weights into the graph, so measure them first
+        self._memory_bytes = self.memory_bytes()
+        tile = self.tile_size + 2 * self.tile_pad
+        example = torch.rand(1, 3, tile, tile, device=torch.device(self.device))
+        if self.memory_format == "channels_last":
+            example = example.contiguous(memory_format=torch.channels_last)
+        self.model = compile_model(self.model, self.compile_mode, example)
+    
+    def warmup(self, rounds: int = 2) -> float:
+        """Run interior (padded) and single-tile sized tiles through the network; returns the seconds taken"""
+        start_time = time.time()
+        infer_tile = self.tile_engine.remote or self.tile_engine.infer_tile
+        for _ in range(rounds):
+            for side in (self.tile_size + 2 * self.tile_pad, self.tile_size):
+                full = slice(0, side * self.scale)
+                infer_tile(np.zeros((side, side, 3), dtype=np.uint8), full, full)
+        return time.time() - start_time
+    
+    def reference_upsampler(self) -> "RealESRGANer":
+        """RealESRGANer over this network, the sequential path the tile engine reproduces"""
+        from realesrgan import RealESRGANer
+        
+        return RealESRGANer(
+            scale=self.scale,
+            model_path=self.model_path,
+            model=self._build_network(),
+            tile=self.tile_size,
+            tile_pad=self.tile_pad,
+            pre_pad=0,
+            half=False,
+            device=torch.device(self.device)
+        )
+    
     def _resize_if_too_large(self, image: Image.Image) -> Tuple[Image.Image, bool]:
         """Resize image if it's too large to prevent memory issues"""
         max_dim = max(image.width, image.height)
@@ -298,25 +461,19 @@ class ImageEnhancer:
         
         return image, False
     
-    def _enhance_single_image(self, image_array: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+    def _enhance_single_image(
+        self,
+        image_array: np.ndarray,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
         """Enhance a single image with memory management"""
         start_time = time.time()
         
         try:
-            # Clear GPU cache if using CUDA
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-            
-            # Force garbage collection
-            gc.collect()
-            
             logger.info(f"Input image shape: {image_array.shape}")
             
             # Enhance the image
-            enhanced_output, _ = self.upsampler.enhance(image_array, outscale=self.scale)
-            
-            # Clear memory after enhancement
-            gc.collect()
+            enhanced_output = self.tile_engine.enhance(image_array, progress_callback)
             
             inference_time = time.time() - start_time
             
@@ -338,155 +495,241 @@ class ImageEnhancer:
             
         except Exception as e:
             logger.error(f"Error enhancing image: {e}")
-            # Clean up memory on error
-            gc.collect()
+            # Hand cached blocks back after a failure (often an out-of-memory one)
             if torch.cuda.is_available():
                 torch.cuda.empty_cache()
             raise e
     
-    def _preprocess_image(self, image_bytes: bytes) -> Tuple[np.ndarray, Dict[str, Any]]:
-        """Convert image bytes to numpy array with memory optimization"""
+    def _preprocess_image(self, decoded: DecodedImage) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Get the RGB array of a decoded image with memory optimization"""
         try:
-            # Load image from bytes
-            image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+            image_array = decoded.rgb
             
             # Store original info
             original_info = {
-                "original_width": image.width,
-                "original_height": image.height,
-                "format": image.format,
-                "mode": image.mode,
-                "channels": len(image.getbands())
+                "original_width": image_array.shape[1],
+                "original_height": image_array.shape[0],
+                "format": decoded.info["format"],
+                "mode": "RGB",
+                "channels": image_array.shape[2]
             }
             
-            # Resize if too large
-            image, was_resized = self._resize_if_too_large(image)
+            # Resize if too large; otherwise reuse the shared pixels as-is
+            was_resized = False
+            if self.max_image_size and max(image_array.shape[:2]) > self.max_image_size:
+                image, was_resized = self._resize_if_too_large(decoded.to_pil())
+                image_array = np.asarray(image)
             
             # Update info with processed dimensions
             image_info = {
                 **original_info,
-                "processed_width": image.width,
-                "processed_height": image.height,
+                "processed_width": image_array.shape[1],
+                "processed_height": image_array.shape[0],
                 "was_resized": was_resized
             }
             
-            # Convert to numpy array
-            image_array = np.array(image)
-            
-            # Clear PIL image from memory
-            del image
-            gc.collect()
-            
             return image_array, image_info
             
         except Exception as e:
             logger.error(f"Error preprocessing image: {e}")
             raise e
     
-    def _postprocess_image(self, enhanced_array: np.ndarray) -> bytes:
-        """Convert enhanced numpy array back to image bytes"""
+    def _postprocess_image(
+        self,
+        enhanced_array: np.ndarray,
+        output: Optional[BinaryIO] = None,
+        encoding: Optional[OutputEncoding] = None
+    ) -> Optional[bytes]:
+        """Encode the enhanced array to bytes, or straight into output if given"""
         try:
-            # Ensure array is in correct format
-            if enhanced_array.dtype != np.uint8:
-                enhanced_array = np.clip(enhanced_array, 0, 255).astype(np.uint8)
-            
-            # Convert to PIL Image
-            enhanced_image = Image.fromarray(enhanced_array)
-            
-            # Save to bytes with compression to reduce memory usage
-            output_buffer = io.BytesIO()
-            enhanced_image.save(output_buffer, format='PNG', optimize=True)
-            output_bytes = output_buffer.getvalue()
-            
-            # Clean up
-            del enhanced_image, enhanced_array
-            gc.collect()
-            
-            return output_bytes
+            return self.encoder.encode(enhanced_array, encoding or OutputEncoding(), output=output)
             
         except Exception as e:
             logger.error(f"Error postprocessing image: {e}")
             raise e
     
-    async def enhance(self, image_bytes: bytes, filename: str) -> Dict[str, Any]:
-        """Enhance uploaded image file with memory management"""
-        start_time = time.time()
+    def _cache_key(self, image: DecodedImage, encoding: OutputEncoding) -> Optional[str]:
+        """Content-addressed cache key for an input image and output encoding"""
+        if self.cache is None or image.content_hash is None:
+            return None
+        return ResultCache.make_key(f"enhance-{encoding.cache_tag()}", self.model_id, image.content_hash)
+    
+    def _get_cached(
+        self,
+        cache_key: Optional[str],
+        image: DecodedImage,
+        filename: str,
+        start_time: float,
+        scored_by: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Rebuild an enhancement result from a cached entry (one without scored_by's score is a miss)"""
+        if cache_key is None:
+            return None
+        
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        
+        result, enhanced_bytes = cached
+        result.setdefault("enhanced_scores", {})
+        if scored_by is not None and scored_by not in result["enhanced_scores"]:
+            return None
+        
+        result.update({
+            "cache_key": cache_key,
+            "filename": filename,
+            "original_image_bytes": image.image_bytes,
+            "enhanced_image_bytes": enhanced_bytes,
+            "enhanced_image": DecodedImage.from_bytes(enhanced_bytes),
+            "total_processing_time": time.time() - start_time,
+            "cache_hit": True
+        })
+        
+        logger.info(f"Enhancement cache hit for {filename}")
+        return result
+    
+    def _store_cached(self, cache_key: Optional[str], result: Dict[str, Any]):
+        """Store the enhanced bytes and their metadata"""
+        if cache_key is None:
+            return
+        
+        self.cache.put(
+            cache_key,
+            {
+                "original_info": result["original_info"],
+                "enhancement_info": result["enhancement_info"],
+                "output_encoding": result["output_encoding"],
+                "success": result["success"],
+                "enhanced_scores": result["enhanced_scores"]
+            },
+            result["enhanced_image_bytes"]
+        )
+    
+    def store_score(self, result: Dict[str, Any], scorer_id: str, score: Dict[str, Any]):
+        """Keep a scorer's rating of the enhanced pixels with the cached enhancement.
         
+        On a cache hit only the encoded output is left, which may be lossy, so
+        the rating made from the original pixels is reused instead of rescoring it.
+        """
+        if result.get("cache_key") is None or result["enhanced_image_bytes"] is None:
+            return
+        
+        result["enhanced_scores"][scorer_id] = {"raw_score": score["raw_score"], "scaled_score": score["scaled_score"]}
+        self._store_cached(result["cache_key"], result)
+    
+    async def enhance(
+        self,
+        image: Union[bytes, DecodedImage],
+        filename: str,
+        encode: bool = True,
+        encoding: Optional[OutputEncoding] = None,
+        scored_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Enhance uploaded image file without blocking the event loop"""
+        # Decode, inference and encode all run on the enhancement executor
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        self.pending += 1
         try:
-            logger.info(f"Starting enhancement for {filename}")
-            
-            # Preprocess image
-            image_array, original_info = self._preprocess_image(image_bytes)
-            
-            # Run enhancement in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            enhanced_array, enhancement_info = await loop.run_in_executor(
-                self.executor,
-                self._enhance_single_image,
-                image_array
-            )
-            
-            # Convert enhanced image back to bytes
-            enhanced_bytes = self._postprocess_image(enhanced_array)
-            
-            total_time = time.time() - start_time
-            
-            # Combine all information
-            result = {
-                "filename": filename,
-                "original_image_bytes": image_bytes,
-                "enhanced_image_bytes": enhanced_bytes,
-                "original_info": original_info,
-                "enhancement_info": enhancement_info,
-                "total_processing_time": total_time,
-                "success": True
-            }
-            
-            logger.info(f"Enhancement completed in {total_time:.2f}s")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error in image enhancement: {e}")
-            # Force cleanup on error
-            gc.collect()
-            raise e
+            result = await loop.run_in_executor(self.executor, self.enhance_sync, image, filename, None, encode, encoding, scored_by)
+        finally:
+            self.pending -= 1
+        
+        # Whatever enhance_sync didn't account for was spent waiting for the executor
+        result["queue_time"] = max(0.0, time.time() - submitted_at - result["total_processing_time"])
+        return result
     
-    def enhance_sync(self, image_bytes: bytes, filename: str) -> Dict[str, Any]:
-        """Synchronous image enhancement with memory management"""
+    def write_encoded(self, result: Dict[str, Any], output: BinaryIO, encoding: Optional[OutputEncoding] = None):
+        """Write an enhancement result's image to a file, encoding it there if needed"""
+        if result["enhanced_image_bytes"] is not None:
+            output.write(result["enhanced_image_bytes"])
+        else:
+            self._postprocess_image(result["enhanced_image"].rgb, output=output, encoding=encoding)
+    
+    def iter_encoded(self, enhanced_array: np.ndarray, encoding: Optional[OutputEncoding] = None) -> AsyncIterator[bytes]:
+        """Encode the enhanced array and yield chunks as the encoder produces them"""
+        return iter_writer_output(lambda output: self._postprocess_image(enhanced_array, output=output, encoding=encoding))
+    
+    def enhance_sync(
+        self,
+        image: Union[bytes, DecodedImage],
+        filename: str,
+        progress_callback: Optional[Callable[[float, str], None]] = None,
+        encode: bool = True,
+        encoding: Optional[OutputEncoding] = None,
+        scored_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Synchronous image enhancement with memory management.
+        With encode=False the output is not encoded (enhanced_image_bytes is None
+        unless served from cache) so the caller can stream it with iter_encoded.
+        With scored_by (a scorer's model_id), cached entries count only if they
+        hold that scorer's rating of the output (see store_score)."""
         start_time = time.time()
+        encoding = encoding or OutputEncoding()
+        
+        def report(progress: float, stage: str):
+            if progress_callback is not None:
+                progress_callback(progress, stage)
         
         try:
+            image = DecodedImage.ensure(image)
             logger.info(f"Starting sync enhancement for {filename}")
             
+            cache_key = self._cache_key(image, encoding)
+            cached = self._get_cached(cache_key, image, filename, start_time, scored_by)
+            if cached is not None:
+                return cached
+            
             # Preprocess image
-            image_array, original_info = self._preprocess_image(image_bytes)
+            report(0.05, "decoding")
+            decode_start = time.time()
+            image_array, original_info = self._preprocess_image(image)
+            decode_time = time.time() - decode_start
             
             # Enhance image
-            enhanced_array, enhancement_info = self._enhance_single_image(image_array)
+            report(0.1, "enhancing")
+            enhanced_array, enhancement_info = self._enhance_single_image(
+                image_array,
+                lambda done, total: report(0.1 + 0.8 * done / total, "enhancing")
+            )
             
             # Convert enhanced image back to bytes
-            enhanced_bytes = self._postprocess_image(enhanced_array)
+            enhanced_bytes = None
+            encode_time = None
+            if encode:
+                report(0.9, "encoding")
+                encode_start = time.time()
+                enhanced_bytes = self._postprocess_image(enhanced_array, encoding=encoding)
+                encode_time = time.time() - encode_start
             
             total_time = time.time() - start_time
             
             # Combine all information
             result = {
+                "cache_key": cache_key,
                 "filename": filename,
-                "original_image_bytes": image_bytes,
+                "original_image_bytes": image.image_bytes,
                 "enhanced_image_bytes": enhanced_bytes,
+                # Hand the enhanced pixels to the next stage without a PNG round trip
+                "enhanced_image": DecodedImage.from_array(enhanced_array, format=encoding.pil_format),
                 "original_info": original_info,
                 "enhancement_info": enhancement_info,
+                "output_encoding": encoding.describe(),
                 "total_processing_time": total_time,
+                "decode_time": decode_time,
+                "encode_time": encode_time,
+                "enhanced_scores": {},
                 "success": True
             }
             
+            if enhanced_bytes is not None:
+                self._store_cached(cache_key, result)
+            
             logger.info(f"Sync enhancement completed in {total_time:.2f}s")
             return result
             
         except Exception as e:
             logger.error(f"Error in sync image enhancement: {e}")
-            # Force cleanup on error
-            gc.collect()
             raise e
     
     def get_model_info(self) -> Dict[str, Any]:
@@ -494,16 +737,45 @@ class ImageEnhancer:
         return {
             "model_type": "Real-ESRGAN",
             "scale_factor": self.scale,
-            "architecture": "RRDBNet (6 blocks)",
+            "architecture": f"RRDBNet ({self.num_block} blocks)",
+            "loaded_from": self.loaded_from,
             "device": self.device,
             "tile_processing": True,
             "tile_size": self.tile_size,
-            "max_input_size": self.max_image_size,
-            "output_format": "PNG"
+            "precision": self.precision,
+            "memory_format": self.memory_format,
+            "backend": self.backend,
+            "compile_mode": self.compile_mode,
+            "tile_engine": self.tile_engine.get_info(),
+            "buffer_pool": self.buffer_pool.get_stats() if self.buffer_pool else None,
+            "max_input_size": self.max_image_size or None,
+            "output_formats": list(OutputEncoding.FORMATS),
+            "default_output": OutputEncoding().describe(),
+            "encoder_timing": self.encoder.get_stats()
         }
     
+    def memory_bytes(self) -> int:
+        """Bytes held by the network's parameters and buffers"""
+        if self._memory_bytes is not None:
+            return self._memory_bytes
+        if isinstance(self.model, OnnxBackend):
+            return self.model.memory_bytes()
+        model = self.model
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    
+    def attach_pool(self, pool, name: str):
+        """Run tiles on a pool's worker processes, which share this model's weights"""
+        self.tile_engine.use_remote(functools.partial(pool.call, name, "tile_engine.infer_tile"), pool.workers)
+    
+    def close(self):
+        """Release the worker pools once no enhancement is in flight"""
+        self.executor.shutdown(wait=False)
+        self.tile_engine.shutdown()
+    
     def __del__(self):
         """Cleanup resources"""
         if hasattr(self, 'executor'):
             self.executor.shutdown(wait=False)
-        gc.collect()
\ No newline at end of file
+        if hasattr(self, 'tile_engine'):
+            self.tile_engine.shutdown()
\ No newline at end of file
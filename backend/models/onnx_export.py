@@ -0,0 +1,92 @@
+"""
+Export the scorer (ResNet18 regression head) or the enhancer (RRDBNet) to ONNX.
+
+The graph is written next to the checkpoint (<checkpoint>.onnx), where the
+onnx backend (INFERENCE_BACKEND=onnx) loads it from. Batch size, and for the
+enhancer the tile height and width, are dynamic. After exporting, the graph is
+run on ONNX Runtime against the torch model on random inputs of several shapes
+and the export is removed again if the outputs differ by more than --atol.
+
+Usage:
+    python -m models.onnx_export scorer --model ml_models/best_model_3.pth
+    python -m models.onnx_export enhancer --model ml_models/RealESRGAN_x4plus_anime_6B.pth --scale 4 --num-block 6
+"""
+import os
+import logging
+import argparse
+from typing import List, Sequence
+
+import torch
+import torch.nn as nn
+
+from .backends import OnnxBackend, onnx_artifact_path
+
+logger = logging.getLogger(__name__)
+
+OPSET = 17
+
+def export_onnx(model: nn.Module, path: str, example: torch.Tensor, dynamic_axes: Sequence[int]):
+    """Export a model with the given input/output axes dynamic, writing the file atomically"""
+    axes = {axis: f"dim{axis}" for axis in dynamic_axes}
+    tmp_path = f"{path}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            example,
+            tmp_path,
+            opset_version=OPSET,
+            input_names=["input"],
+            output_names=["output"],
+            dynamic_axes={"input": axes, "output": axes}
+        )
+    os.replace(tmp_path, path)
+
+def parity_error(model: nn.Module, backend: OnnxBackend, inputs: List[torch.Tensor]) -> float:
+    """Largest absolute difference between the torch and ONNX Runtime outputs"""
+    worst = 0.0
+    with torch.no_grad():
+        for tensor in inputs:
+            expected = model(tensor).float()
+            worst = max(worst, (backend(tensor) - expected).abs().max().item())
+    return worst
+
+def main(args):
+    if args.kind == "scorer":
+        from .score_inference import ImageScoreDetector
+
+        detector = ImageScoreDetector(model_path=args.model, device="cpu", cache=None)
+        model = detector.model
+        example = torch.randn(1, 3, 224, 224)
+        checks = [torch.randn(batch, 3, 224, 224) for batch in (1, 4)]
+        dynamic_axes = [0]
+    else:
+        from .image_enhancer import ImageEnhancer
+
+        detector = ImageEnhancer(model_path=args.model, device="cpu", scale=args.scale, num_block=args.num_block, cache=None)
+        model = detector.model
+        tile = detector.tile_size + 2 * detector.tile_pad
+        example = torch.rand(1, 3, tile, tile)
+        # x2/x1 networks pixel-unshuffle, so keep every checked side a multiple of 4
+        checks = [torch.rand(1, 3, 36, 52), torch.rand(1, 3, tile, tile)]
+        dynamic_axes = [0, 2, 3]
+
+    output = args.output or onnx_artifact_path(args.model)
+    export_onnx(model, output, example, dynamic_axes)
+
+    error = parity_error(model, OnnxBackend(output), checks)
+    detector.close()
+    if error > args.atol:
+        os.remove(output)
+        raise SystemExit(f"ONNX output differs from torch by {error:.2e} (> {args.atol}); removed {output}")
+    print(f"Exported {args.kind} to {output} (opset {OPSET}, max |onnx - torch| {error:.2e})")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=("scorer", "enhancer"))
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--num-block", type=int, default=6)
+    parser.add_argument("--atol", type=float, default=1e-3, help="Maximum absolute difference from the torch output")
+    parser.add_argument("--output", help="Defaults to <checkpoint>.onnx")
+    main(parser.parse_args())
@@ -0,0 +1,49 @@
+import mmap
+import tempfile
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .buffer_pool import BufferPool
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = mmap.PAGESIZE
+
+def allocate_output(
+    shape: Tuple[int, ...],
+    memmap_threshold: int,
+    memmap_dir: Optional[str] = None,
+    pool: Optional[BufferPool] = None
+) -> np.ndarray:
+    """uint8 array for an enhanced image; file-backed above memmap_threshold bytes.
+
+    In-memory outputs come from pool when given. The backing file is unlinked
+    right away, so it disappears with the last reference to the array.
+    """
+    nbytes = int(np.prod(shape))
+    if memmap_threshold <= 0 or nbytes <= memmap_threshold:
+        return pool.take(shape) if pool is not None else np.empty(shape, dtype=np.uint8)
+
+    with tempfile.TemporaryFile(dir=memmap_dir, prefix="enhanced-") as backing:
+        backing.truncate(nbytes)
+        array = np.memmap(backing, dtype=np.uint8, mode="w+", shape=shape)
+    logger.info(f"Using a memory-mapped output buffer for {shape} ({nbytes / 1e6:.0f} MB)")
+    return array
+
+def release_rows(array: np.ndarray, start: int, end: int):
+    """Drop rows [start, end) of a memory-mapped array from this process's resident set.
+
+    The data stays in the backing file (page cache) and is paged back in on
+    the next access. No-op for in-memory arrays.
+    """
+    mapping = getattr(array, "_mmap", None)
+    if mapping is None or not hasattr(mapping, "madvise") or end <= start:
+        return
+
+    row_bytes = array.strides[0]
+    byte_start = (start * row_bytes) // PAGE_SIZE * PAGE_SIZE
+    byte_end = min(end * row_bytes, len(mapping))
+    if byte_end > byte_start:
+        mapping.madvise(mmap.MADV_DONTNEED, byte_start, byte_end - byte_start)
@@ -0,0 +1,83 @@
+import threading
+from typing import Sequence
+
+import numpy as np
+import torch
+from PIL import Image
+
+from .decoded_image import DecodedImage
+from .output_buffer import release_rows
+
+# Array-backed images larger than the draft size are box-reduced this many bytes
+# of rows at a time, so a memory-mapped enhanced output is never copied whole
+REDUCE_BAND_BYTES = 16 * 1024 * 1024
+
+# JPEGs are decoded at no less than this multiple of the target size
+DRAFT_FACTOR = 2
+
+class ScorePreprocessor:
+    """Vectorized resize + normalize for the scorer with reduced-size JPEG decoding"""
+
+    def __init__(
+        self,
+        size: int = 224,
+        mean: Sequence[float] = (0.485, 0.456, 0.406),
+        std: Sequence[float] = (0.229, 0.224, 0.225),
+        draft_factor: int = DRAFT_FACTOR
+    ):
+        self.size = size
+        self.mean = torch.tensor(mean, dtype=torch.float32).view(1, 3, 1, 1)
+        self.std = torch.tensor(std, dtype=torch.float32).view(1, 3, 1, 1)
+
+        # Decode JPEGs at no less than draft_factor x the target size so the
+        # final bilinear resize still has enough pixels to filter from
+        self.draft_size = size * draft_factor
+
+        # Batch buffers are per thread since several executor threads run batches
+        self._local = threading.local()
+
+    def load(self, image: DecodedImage) -> np.ndarray:
+        """Decode (reduced-size when possible) and resize to a (size, size, 3) uint8 array"""
+        if image.image_bytes is not None:
+            # Always the draft decode, even when another stage has decoded full pixels,
+            # so the same bytes get the same score (and cache entry) whichever ran first
+            source = image.open_draft(self.draft_size)
+        else:
+            source = self._reduce(image.rgb)
+
+        resized = source.resize((self.size, self.size), Image.Resampling.BILINEAR)
+        return np.asarray(resized)
+
+    def _reduce(self, array: np.ndarray) -> Image.Image:
+        """RGB image of an (H, W, 3) array box-reduced to no less than the draft size, in row bands"""
+        height, width = array.shape[:2]
+        factor = max(1, min(height, width) // self.draft_size)
+        if factor == 1:
+            return Image.fromarray(array)
+
+        band_rows = factor * max(1, REDUCE_BAND_BYTES // (factor * width * 3))
+        bands = []
+        for start in range(0, height, band_rows):
+            band = Image.fromarray(np.ascontiguousarray(array[start:start + band_rows]))
+            bands.append(np.asarray(band.reduce(factor)))
+            # Rows already read leave the resident set again (no-op for in-memory arrays)
+            release_rows(array, start, start + band_rows)
+        return Image.fromarray(np.concatenate(bands))
+
+    def load_tensor(self, image: DecodedImage) -> torch.Tensor:
+        """Resized uint8 pixels as a (1, size, size, 3) tensor ready for batching"""
+        return torch.from_numpy(np.array(self.load(image))).unsqueeze(0)
+
+    def _buffer(self, batch_size: int) -> torch.Tensor:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < batch_size:
+            buffer = torch.empty((batch_size, 3, self.size, self.size), dtype=torch.float32)
+            self._local.buffer = buffer
+        return buffer[:batch_size]
+
+    def normalize_batch(self, batch: torch.Tensor) -> torch.Tensor:
+        """Convert an (N, H, W, 3) uint8 batch to normalized (N, 3, H, W) float32 in place"""
+        output = self._buffer(batch.shape[0])
+        output.copy_(batch.permute(0, 3, 1, 2))
+        output.div_(255.0).sub_(self.mean).div_(self.std)
+        return output
@@ -0,0 +1,95 @@
+"""
+Post-training static INT8 quantization of the ResNet18 scorer (FX graph mode).
+
+Calibrates activation ranges on a set of representative images, converts the
+FP32 model to INT8 and saves it as a TorchScript artifact next to the
+checkpoint, where ImageScoreDetector(precision="int8") loads it from.
+Calibrate on images that are not in the accuracy-gate set
+(benchmarks/quantization_benchmark.py).
+
+Usage:
+    python -m models.quantization --model ml_models/best_model_3.pth --images "calibration/*.jpg"
+"""
+import os
+import copy
+import glob
+import logging
+import argparse
+from typing import Iterable, List
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("fp32", "int8")
+
+def int8_artifact_path(model_path: str) -> str:
+    """Where the INT8 TorchScript artifact of a scorer checkpoint is stored"""
+    return f"{os.path.splitext(model_path)[0]}.int8.ts"
+
+def select_quantized_engine() -> str:
+    """Pick the best available quantized CPU kernel backend and make it current"""
+    supported = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in supported:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError(f"No quantized CPU engine available (supported: {supported})")
+
+def quantize_static(model: nn.Module, calibration_batches: Iterable[torch.Tensor]) -> nn.Module:
+    """FX-graph post-training static quantization of an FP32 model on normalized float batches"""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    engine = select_quantized_engine()
+    batches = iter(calibration_batches)
+    first = next(batches)
+
+    prepared = prepare_fx(copy.deepcopy(model).cpu().eval(), get_default_qconfig_mapping(engine), example_inputs=(first,))
+    with torch.no_grad():
+        prepared(first)
+        for batch in batches:
+            prepared(batch)
+    return convert_fx(prepared)
+
+def _calibration_batches(detector, paths: List[str], batch_size: int) -> Iterable[torch.Tensor]:
+    """Normalized (N, 3, 224, 224) batches through the scorer's own fast preprocessing"""
+    from .decoded_image import DecodedImage
+
+    for start in range(0, len(paths), batch_size):
+        tensors = []
+        for path in paths[start:start + batch_size]:
+            with open(path, "rb") as f:
+                tensors.append(detector.preprocessor.load_tensor(DecodedImage.from_bytes(f.read())))
+        # normalize_batch reuses its buffer, so hand out a copy
+        yield detector.preprocessor.normalize_batch(torch.cat(tensors, dim=0)).clone()
+
+def main(args):
+    from .score_inference import ImageScoreDetector
+    from .checkpoints import save_scripted
+
+    paths = sorted(glob.glob(args.images))[:args.count]
+    if not paths:
+        raise SystemExit(f"No calibration images match {args.images}")
+
+    detector = ImageScoreDetector(model_path=args.model, device="cpu", cache=None)
+    logger.info(f"Calibrating on {len(paths)} images")
+    quantized = quantize_static(detector.model, _calibration_batches(detector, paths, args.batch_size))
+
+    output = args.output or int8_artifact_path(args.model)
+    example = torch.randn(1, 3, 224, 224)
+    if not save_scripted(quantized, output, example, check_inputs=[example.repeat(2, 1, 1, 1)]):
+        raise SystemExit(f"Could not save the INT8 model to {output}")
+    detector.close()
+    print(f"Saved INT8 scorer ({torch.backends.quantized.engine}) to {output}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="ml_models/best_model_3.pth")
+    parser.add_argument("--images", required=True, help="Glob of representative calibration images")
+    parser.add_argument("--count", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--output", help="Defaults to <checkpoint>.int8.ts")
+    main(parser.parse_args())
@@ -0,0 +1,185 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry bookkeeping cost for the metadata dict
+ENTRY_OVERHEAD_BYTES = 1024
+
+def hash_bytes(data: bytes) -> str:
+    """Content hash used as the cache key for input images"""
+    return hashlib.sha256(data).hexdigest()
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash a weights file so cache entries are tied to the exact checkpoint"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def model_identity(weights_hash: str, **settings: Any) -> str:
+    """Combine the weights hash with the settings that change model output"""
+    parts = [weights_hash] + [f"{name}={settings[name]}" for name in sorted(settings)]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+class ResultCache:
+    """Content-addressed LRU cache with an optional on-disk tier for payloads"""
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None, disk_max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], Optional[bytes], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(namespace: str, model_id: str, content_hash: str) -> str:
+        """Build a cache key from the model identity and the input content hash"""
+        return f"{namespace}-{model_id}-{content_hash}"
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], Optional[bytes]]]:
+        """Look up a cached (value, payload) pair, promoting disk hits to memory"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0]), entry[1]
+
+        cached = self._read_disk(key)
+
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+
+        value, payload = cached
+        self._put_memory(key, value, payload)
+        return dict(value), payload
+
+    def put(self, key: str, value: Dict[str, Any], payload: Optional[bytes] = None):
+        """Store a JSON-serializable value plus optional binary payload"""
+        self._put_memory(key, value, payload)
+
+        if self.disk_dir and payload is not None:
+            self._write_disk(key, value, payload)
+
+    def _put_memory(self, key: str, value: Dict[str, Any], payload: Optional[bytes]):
+        """Insert into the memory tier, evicting least recently used entries"""
+        size = ENTRY_OVERHEAD_BYTES + (len(payload) if payload is not None else 0)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[2]
+
+            self._entries[key] = (dict(value), payload, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _disk_paths(self, key: str) -> Tuple[str, str]:
+        return (
+            os.path.join(self.disk_dir, f"{key}.json"),
+            os.path.join(self.disk_dir, f"{key}.bin")
+        )
+
+    def _read_disk(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        if not self.disk_dir:
+            return None
+
+        meta_path, payload_path = self._disk_paths(key)
+        try:
+            with open(meta_path, "r") as f:
+                value = json.load(f)
+            with open(payload_path, "rb") as f:
+                payload = f.read()
+            return value, payload
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: Dict[str, Any], payload: bytes):
+        meta_path, payload_path = self._disk_paths(key)
+        try:
+            # Write payload first so a visible .json always has its data
+            tmp_path = f"{payload_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, payload_path)
+
+            tmp_path = f"{meta_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, meta_path)
+
+            self._trim_disk()
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write cache entry to disk: {e}")
+
+    def _trim_disk(self):
+        """Drop the oldest on-disk entries once the disk budget is exceeded"""
+        if not self.disk_max_bytes:
+            return
+
+        entries = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".bin"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-len(".bin")]))
+            total += stat.st_size
+
+        for _, size, key in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            for path in self._disk_paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            self.disk_evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters and memory usage"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_enabled": bool(self.disk_dir)
+            }
@@ -0,0 +1,131 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on bound parameters is 999
+LOOKUP_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    content_hash TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    checkpoint TEXT NOT NULL,
+    raw_score REAL NOT NULL,
+    scaled_score REAL NOT NULL,
+    inference_time REAL,
+    width INTEGER,
+    height INTEGER,
+    format TEXT,
+    mode TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (content_hash, model_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scores_checkpoint ON scores (checkpoint, model_id);
+"""
+
+class ScoreStore:
+    """Scores persisted in SQLite by input content hash and scorer model identity.
+
+    The model identity includes the checkpoint's hash, so scores from a
+    replaced checkpoint are never returned; invalidate() also deletes them.
+    The database is opened in WAL mode, so several worker processes can share
+    one file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.invalidated = 0
+
+    def invalidate(self, checkpoint: str, model_id: str) -> int:
+        """Delete scores made by an earlier version of this checkpoint file"""
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM scores WHERE checkpoint = ? AND model_id != ?", (checkpoint, model_id)
+            ).rowcount
+        if removed:
+            self.invalidated += removed
+            logger.info(f"Dropped {removed} stored scores of a previous {os.path.basename(checkpoint)}")
+        return removed
+
+    @staticmethod
+    def _result(row: tuple) -> Dict[str, Any]:
+        raw_score, scaled_score, inference_time, width, height, format, mode = row
+        return {
+            "raw_score": raw_score,
+            "scaled_score": scaled_score,
+            "inference_time": inference_time,
+            "image_info": {"width": width, "height": height, "format": format, "mode": mode}
+        }
+
+    def get(self, content_hash: str, model_id: str) -> Optional[Dict[str, Any]]:
+        """Stored score for one input, or None"""
+        return self.get_many([content_hash], model_id).get(content_hash)
+
+    def get_many(self, content_hashes: Iterable[str], model_id: str) -> Dict[str, Dict[str, Any]]:
+        """Stored scores by content hash; unknown hashes are left out"""
+        content_hashes = list(dict.fromkeys(content_hashes))
+        found = {}
+        with self._lock:
+            for start in range(0, len(content_hashes), LOOKUP_CHUNK):
+                chunk = content_hashes[start:start + LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT content_hash, raw_score, scaled_score, inference_time, width, height, format, mode "
+                    f"FROM scores WHERE model_id = ? AND content_hash IN ({', '.join('?' * len(chunk))})",
+                    (model_id, *chunk)
+                )
+                for row in rows:
+                    found[row[0]] = self._result(row[1:])
+        self.hits += len(found)
+        self.misses += len(content_hashes) - len(found)
+        return found
+
+    def put(self, content_hash: str, model_id: str, checkpoint: str, result: Dict[str, Any]):
+        """Store a scoring result (raw/scaled score, inference time and image_info)"""
+        info = result.get("image_info") or {}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    content_hash, model_id, checkpoint, result["raw_score"], result["scaled_score"],
+                    result.get("inference_time"), info.get("width"), info.get("height"),
+                    info.get("format"), info.get("mode"), time.time()
+                )
+            )
+        self.writes += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "invalidated": self.invalidated
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
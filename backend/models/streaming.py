@@ -0,0 +1,97 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+class ChunkWriter(io.RawIOBase):
+    """Write-only file object that hands fixed-size chunks to an asyncio queue.
+
+    Writes happen on an executor thread; each full chunk is put on the queue
+    with backpressure, so at most max_chunks chunks are buffered at a time.
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._queue = queue
+        self._loop = loop
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._cancelled = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._cancelled:
+            raise BrokenPipeError("Stream consumer went away")
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            self._emit(bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+        return len(data)
+
+    def _emit(self, chunk: Optional[bytes]):
+        if self._cancelled:
+            return
+        asyncio.run_coroutine_threadsafe(self._queue.put(chunk), self._loop).result()
+
+    def cancel(self):
+        """Make further writes fail so the producer stops early"""
+        self._cancelled = True
+
+    def finish(self):
+        """Flush the remaining bytes and signal the end of the stream"""
+        if self._buffer:
+            self._emit(bytes(self._buffer))
+            self._buffer.clear()
+        self._emit(None)
+
+async def iter_writer_output(
+    write_fn: Callable[[io.RawIOBase], None],
+    executor: Optional[Executor] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_chunks: int = 4
+) -> AsyncIterator[bytes]:
+    """Run write_fn(file) on an executor and yield what it writes as it is produced"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_chunks)
+    writer = ChunkWriter(queue, loop, chunk_size)
+
+    def produce():
+        try:
+            write_fn(writer)
+        finally:
+            writer.finish()
+
+    producer = loop.run_in_executor(executor, produce)
+    finished = False
+
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            yield chunk
+        finished = True
+    finally:
+        if not finished:
+            # Consumer went away mid-stream: stop the producer and unblock it
+            writer.cancel()
+            while not producer.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+
+    # Surface encoder errors
+    await producer
+
+async def iter_bytes(data: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield an in-memory payload in fixed-size chunks"""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
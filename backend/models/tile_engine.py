@@ -0,0 +1,295 @@
+import os
+import math
+import logging
+import threading
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from .buffer_pool import BufferPool
+from .output_buffer import allocate_output, release_rows
+
+logger = logging.getLogger(__name__)
+
+# Compute precision of the network's forward pass (bf16 = bfloat16 autocast)
+PRECISIONS = ("fp32", "bf16")
+
+MEMORY_FORMATS = {"contiguous": torch.contiguous_format, "channels_last": torch.channels_last}
+
+def bf16_supported() -> bool:
+    """Whether the CPU has native bfloat16 kernels (otherwise bf16 is emulated and slow)"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+class Tile(NamedTuple):
+    """One padded input tile and where its unpadded output lands"""
+    input_rows: slice
+    input_cols: slice
+    output_rows: slice
+    output_cols: slice
+    crop_rows: slice
+    crop_cols: slice
+
+def plan_tiles(height: int, width: int, tile_size: int, tile_pad: int, scale: int) -> List[Tile]:
+    """Split an image into padded tiles exactly like RealESRGANer.tile_process"""
+    tiles = []
+    for y in range(math.ceil(height / tile_size)):
+        for x in range(math.ceil(width / tile_size)):
+            start_x, end_x = x * tile_size, min(x * tile_size + tile_size, width)
+            start_y, end_y = y * tile_size, min(y * tile_size + tile_size, height)
+
+            # Padding is clipped at the image borders
+            pad_start_x, pad_end_x = max(start_x - tile_pad, 0), min(end_x + tile_pad, width)
+            pad_start_y, pad_end_y = max(start_y - tile_pad, 0), min(end_y + tile_pad, height)
+
+            crop_x = (start_x - pad_start_x) * scale
+            crop_y = (start_y - pad_start_y) * scale
+            tiles.append(Tile(
+                input_rows=slice(pad_start_y, pad_end_y),
+                input_cols=slice(pad_start_x, pad_end_x),
+                output_rows=slice(start_y * scale, end_y * scale),
+                output_cols=slice(start_x * scale, end_x * scale),
+                crop_rows=slice(crop_y, crop_y + (end_y - start_y) * scale),
+                crop_cols=slice(crop_x, crop_x + (end_x - start_x) * scale)
+            ))
+    return tiles
+
+class TileEngine:
+    """Runs Real-ESRGAN tiles across a thread pool and stitches them into a uint8 image.
+
+    In fp32 it produces the same pixels as RealESRGANer.enhance(rgb_array,
+    outscale=scale) for 8-bit RGB input, including its BGR channel handling;
+    bf16 runs the forward pass under bfloat16 autocast, and channels_last feeds
+    tiles in NHWC to a network converted to match. Each worker thread
+    gets its own intra-op thread count so tiles don't oversubscribe the cores.
+
+    Only one padded tile per worker is ever held as float, in a per-thread
+    buffer reused across tiles; outputs larger than memmap_threshold bytes go
+    to a file-backed buffer whose finished row bands are dropped from the
+    resident set, so peak memory follows the tile size rather than the image
+    size. Smaller outputs (and reflect-padded inputs) come from buffer_pool.
+    """
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        scale: int,
+        tile_size: int,
+        tile_pad: int = 10,
+        workers: int = 0,
+        threads_per_worker: int = 0,
+        device: str = "cpu",
+        memmap_threshold: int = 256 * 1024 * 1024,
+        memmap_dir: Optional[str] = None,
+        precision: str = "fp32",
+        memory_format: str = "contiguous",
+        buffer_pool: Optional[BufferPool] = None
+    ):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown enhancer precision {precision!r} (expected one of {', '.join(PRECISIONS)})")
+        if memory_format not in MEMORY_FORMATS:
+            raise ValueError(f"Unknown memory format {memory_format!r} (expected one of {', '.join(MEMORY_FORMATS)})")
+
+        self.model = model
+        self.scale = scale
+        self.tile_size = tile_size
+        self.tile_pad = tile_pad
+        self.device = device
+        self.memmap_threshold = memmap_threshold
+        self.memmap_dir = memmap_dir
+        self.precision = precision
+        self.memory_format = memory_format
+        self.buffer_pool = buffer_pool
+        self._device_type = torch.device(device).type
+
+        # 0 = size the pool from the available cores
+        cpu_count = os.cpu_count() or 1
+        self.workers = workers if workers > 0 else cpu_count
+        self.threads_per_worker = threads_per_worker
+        self._cpu_count = cpu_count
+        self._local = threading.local()
+        self.executor = self._make_executor()
+
+        # Runs infer_tile somewhere else (an inference worker process) when set
+        self.remote: Optional[Callable[[np.ndarray, slice, slice], np.ndarray]] = None
+
+    def _make_executor(self) -> Optional[ThreadPoolExecutor]:
+        if self.workers <= 1:
+            return None
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="enhance-tile")
+
+    def use_remote(self, remote: Callable[[np.ndarray, slice, slice], np.ndarray], workers: int):
+        """Send tiles to remote(tile_array, crop_rows, crop_cols), keeping `workers` tiles in flight"""
+        self.shutdown()
+        self.remote = remote
+        self.workers = max(1, workers)
+        self.executor = self._make_executor()
+
+    def _threads_for(self, tile_count: int) -> int:
+        """Intra-op threads per tile so that all running tiles together fill the cores"""
+        if self.threads_per_worker > 0:
+            return self.threads_per_worker
+        return max(1, self._cpu_count // min(self.workers, tile_count))
+
+    def _buffer(self, name: str, count: int) -> np.ndarray:
+        """Per-thread float32 scratch of at least count elements, reused across tiles"""
+        buffer = getattr(self._local, name, None)
+        if buffer is None or buffer.size < count:
+            buffer = np.empty(count, dtype=np.float32)
+            setattr(self._local, name, buffer)
+        return buffer[:count]
+
+    def _prepare_tile(self, tile_array: np.ndarray) -> torch.Tensor:
+        """uint8 RGB tile -> (1, 3, h, w) float tensor in [0, 1], channels reversed as RealESRGANer does"""
+        height, width = tile_array.shape[:2]
+        buffer = self._buffer("input", 3 * height * width)
+        bgr = tile_array[:, :, ::-1]
+        if self.memory_format == "channels_last":
+            # NHWC in memory, so the NCHW view is already channels_last
+            pixels = buffer.reshape(height, width, 3)
+            np.divide(bgr, np.float32(255), out=pixels)
+            tensor = torch.from_numpy(pixels).permute(2, 0, 1)
+        else:
+            pixels = buffer.reshape(3, height, width)
+            np.divide(np.transpose(bgr, (2, 0, 1)), np.float32(255), out=pixels)
+            tensor = torch.from_numpy(pixels)
+        tensor = tensor.unsqueeze(0).to(self.device)
+        return tensor.contiguous(memory_format=MEMORY_FORMATS[self.memory_format])
+
+    def infer_tile(
+        self,
+        tile_array: np.ndarray,
+        crop_rows: slice,
+        crop_cols: slice,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Upscale one padded uint8 RGB tile to its unpadded uint8 RGB output (written into out if given)"""
+        # Grad mode is thread-local, so it has to be disabled on each worker
+        with torch.no_grad(), torch.autocast(self._device_type, dtype=torch.bfloat16, enabled=self.precision == "bf16"):
+            output_tile = self.model(self._prepare_tile(tile_array))
+
+        crop = output_tile[0, :, crop_rows, crop_cols].float().cpu().clamp_(0, 1).numpy()
+        height, width = crop.shape[1:]
+        pixels = self._buffer("output", 3 * height * width).reshape(height, width, 3)
+        np.multiply(np.transpose(crop[::-1], (1, 2, 0)), np.float32(255.0), out=pixels)
+        np.round(pixels, out=pixels)
+        if out is None:
+            return pixels.astype(np.uint8)
+        np.copyto(out, pixels, casting="unsafe")
+        return out
+
+    def _run_tile(self, image_array: np.ndarray, tile: Tile, output: np.ndarray, threads: Optional[int]):
+        tile_array = image_array[tile.input_rows, tile.input_cols]
+        if self.remote is not None:
+            output[tile.output_rows, tile.output_cols] = self.remote(
+                np.ascontiguousarray(tile_array), tile.crop_rows, tile.crop_cols
+            )
+            return
+
+        if threads is not None and getattr(self._local, "threads", None) != threads:
+            torch.set_num_threads(threads)
+            self._local.threads = threads
+        self.infer_tile(tile_array, tile.crop_rows, tile.crop_cols, out=output[tile.output_rows, tile.output_cols])
+
+    def enhance(
+        self,
+        image_array: np.ndarray,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> np.ndarray:
+        """Upscale an (H, W, 3) uint8 RGB array by self.scale"""
+        height, width = image_array.shape[:2]
+
+        # RRDBNet pixel-unshuffles x2 and x1 inputs, so pad them to a multiple of the
+        # unshuffle factor with reflection, as RealESRGANer.pre_process does
+        mod = {2: 2, 1: 4}.get(self.scale)
+        if mod is not None and (height % mod or width % mod):
+            image_array = self._pad_reflect(image_array, -height % mod, -width % mod)
+
+        padded_height, padded_width = image_array.shape[:2]
+        output = allocate_output(
+            (padded_height * self.scale, padded_width * self.scale, 3),
+            self.memmap_threshold,
+            self.memmap_dir,
+            self.buffer_pool
+        )
+        self._run_tiles(image_array, output, progress_callback)
+        return output[:height * self.scale, :width * self.scale]
+
+    def _pad_reflect(self, image_array: np.ndarray, pad_rows: int, pad_cols: int) -> np.ndarray:
+        """np.pad(..., mode="reflect") on the bottom and right edges, into a pooled buffer"""
+        height, width = image_array.shape[:2]
+        if self.buffer_pool is None or height <= pad_rows or width <= pad_cols:
+            # Reflecting more than the edge holds repeats it, which np.pad handles
+            return np.pad(image_array, ((0, pad_rows), (0, pad_cols), (0, 0)), mode="reflect")
+
+        padded = self.buffer_pool.take((height + pad_rows, width + pad_cols, 3))
+        padded[:height, :width] = image_array
+        # Reflection excludes the edge row/column itself
+        padded[height:, :width] = image_array[height - 2 - np.arange(pad_rows)]
+        padded[:, width:] = padded[:, width - 2 - np.arange(pad_cols)]
+        return padded
+
+    def _run_tiles(
+        self,
+        image_array: np.ndarray,
+        output: np.ndarray,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ):
+        height, width = image_array.shape[:2]
+        tiles = plan_tiles(height, width, self.tile_size, self.tile_pad, self.scale)
+
+        def tile_done(tile: Tile):
+            # Page out the rows this tile touched; the data stays in the backing file, and
+            # pages shared with tiles still being written are simply faulted back in
+            release_rows(output, tile.output_rows.start, tile.output_rows.stop)
+
+        if self.executor is None or len(tiles) == 1:
+            # Sequential on the calling thread with the process-wide thread setting
+            for index, tile in enumerate(tiles):
+                self._run_tile(image_array, tile, output, None)
+                tile_done(tile)
+                if progress_callback is not None:
+                    progress_callback(index + 1, len(tiles))
+            return
+
+        # Bound the tiles in flight so the pool moves down the image instead of queueing every tile
+        threads = self._threads_for(len(tiles))
+        pending = deque()
+        next_tile = 0
+        for done in range(1, len(tiles) + 1):
+            while next_tile < len(tiles) and len(pending) < 2 * self.workers:
+                tile = tiles[next_tile]
+                pending.append((tile, self.executor.submit(self._run_tile, image_array, tile, output, threads)))
+                next_tile += 1
+
+            tile, future = pending.popleft()
+            try:
+                future.result()
+            except Exception:
+                for _, other in pending:
+                    other.cancel()
+                raise
+            tile_done(tile)
+            if progress_callback is not None:
+                progress_callback(done, len(tiles))
+
+    def get_info(self):
+        return {
+            "tile_size": self.tile_size,
+            "tile_pad": self.tile_pad,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker or "auto",
+            "remote": self.remote is not None,
+            "precision": self.precision,
+            "memory_format": self.memory_format,
+            "memmap_threshold_mb": self.memmap_threshold / (1024 * 1024) if self.memmap_threshold > 0 else None
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
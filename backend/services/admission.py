@@ -0,0 +1,144 @@
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request can't be queued; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RequestTooLargeError(Exception):
+    """Raised when a single request's estimated memory exceeds the whole budget"""
+
+def estimate_enhance_bytes(width: int, height: int, scale: int, memmap_threshold: int = 0) -> int:
+    """Rough resident memory of enhancing one image: decoded input plus output buffer.
+
+    Outputs above memmap_threshold are file-backed and release finished rows,
+    so they count as at most the threshold. The tile working set is per engine
+    rather than per request and is left to the budget's headroom.
+    """
+    input_bytes = width * height * 3
+    output_bytes = width * scale * height * scale * 3
+    if memmap_threshold > 0:
+        output_bytes = min(output_bytes, memmap_threshold)
+    return input_bytes + output_bytes
+
+class AdmissionController:
+    """Caps the estimated memory of requests in flight and the number waiting for room.
+
+    Requests are admitted in arrival order while their estimated cost fits in
+    max_bytes (0 = no memory cap); the rest wait in a queue of at most max_queue.
+    Beyond that they are rejected with a Retry-After derived from the measured
+    service time. Used from the event loop only.
+    """
+
+    def __init__(self, max_bytes: int, max_queue: int, initial_service_time: float = 5.0):
+        self.max_bytes = max_bytes
+        self.max_queue = max_queue
+        self.service_time = initial_service_time
+        self.in_flight = 0
+        self.in_flight_bytes = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+        # Counters
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_too_large = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def retry_after(self) -> int:
+        """Seconds until the requests ahead should have drained, at the measured service time"""
+        ahead = len(self._waiters) + self.in_flight
+        return max(1, math.ceil(self.service_time * ahead / max(1, self.in_flight)))
+
+    def check(self):
+        """Reject early, before the image is decoded or enhanced, when the queue is already full"""
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejectedError(
+                f"Too many enhancement requests waiting ({len(self._waiters)}), try again later",
+                self.retry_after()
+            )
+
+    def _fits(self, cost: int) -> bool:
+        return self.max_bytes <= 0 or self.in_flight == 0 or self.in_flight_bytes + cost <= self.max_bytes
+
+    def _grant(self, cost: int):
+        self.in_flight += 1
+        self.in_flight_bytes += cost
+
+    def _wake(self):
+        """Admit waiting requests in order while the next one fits"""
+        while self._waiters and self._fits(self._waiters[0][0]):
+            cost, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._grant(cost)
+            future.set_result(None)
+
+    def _release(self, cost: int):
+        self.in_flight -= 1
+        self.in_flight_bytes -= cost
+        self._wake()
+
+    async def acquire(self, cost: int) -> float:
+        """Wait for room for a request of the given estimated cost; returns the admission time"""
+        if self.max_bytes > 0 and cost > self.max_bytes:
+            self.rejected_too_large += 1
+            raise RequestTooLargeError(
+                f"Request needs an estimated {cost / 1e6:.0f} MB, more than the {self.max_bytes / 1e6:.0f} MB budget"
+            )
+
+        start = time.monotonic()
+        if self._waiters or not self._fits(cost):
+            self.check()
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((cost, future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                # Granted just before the caller went away: give the room back
+                if future.done() and not future.cancelled():
+                    self._release(cost)
+                else:
+                    future.cancel()
+                    self._waiters = deque(waiter for waiter in self._waiters if waiter[1] is not future)
+                raise
+        else:
+            self._grant(cost)
+
+        admitted_at = time.monotonic()
+        wait = admitted_at - start
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return admitted_at
+
+    def release(self, cost: int, admitted_at: float):
+        """Give back an admitted request's room and fold its duration into the service time"""
+        # Moving average of how long an admitted request holds its room
+        self.service_time = 0.8 * self.service_time + 0.2 * (time.monotonic() - admitted_at)
+        self._release(cost)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "in_flight_mb": self.in_flight_bytes / (1024 * 1024),
+            "budget_mb": self.max_bytes / (1024 * 1024) if self.max_bytes > 0 else None,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_too_large": self.rejected_too_large,
+            "avg_wait_s": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait_s": self.max_wait,
+            "service_time_s": self.service_time
+        }
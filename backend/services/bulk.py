@@ -0,0 +1,374 @@
+"""
+Offline bulk scoring and enhancement, without the HTTP API.
+
+Reads images from a directory (recursively), a glob, or a CSV/JSONL manifest
+with a "path" column (and optionally "id"), and runs them through the same
+models the server uses: files are read and decoded on --decode-workers
+threads, scored in batches of --batch-size, and (with --enhance) upscaled on a
+pool of --enhance-workers threads with a bounded number in flight. One row per
+input goes to --results (.jsonl, or .parquet for a directory of Parquet parts)
+in input order, and enhanced images to <output-dir>/images.
+
+Progress is checkpointed to <output-dir>/checkpoint.json every
+--checkpoint-every rows; rerunning the same command resumes after the last
+checkpoint (--restart starts over). With --score-store, scores are read from
+and written to the server's SCORE_STORE_PATH index, so a backfill only runs
+the model on images it hasn't scored with the current checkpoint.
+
+Usage:
+    python -m services.bulk --input photos/ --output-dir backfill/ --enhance --enhance-below 5
+    python -m services.bulk --input manifest.csv --output-dir backfill/ --results backfill/scores.parquet
+"""
+import os
+import csv
+import glob
+import json
+import time
+import asyncio
+import logging
+import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff")
+
+# Result columns, in order (Parquet schema types in ResultWriter)
+COLUMNS = (
+    "index", "id", "path", "raw_score", "quality_score", "width", "height", "format",
+    "enhanced_path", "enhanced_width", "enhanced_height", "error"
+)
+
+def iter_inputs(source: str) -> Iterator[Tuple[str, str]]:
+    """Yield (id, path) for every input, in a stable order so a run can resume by position"""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_SUFFIXES):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), path
+    elif source.lower().endswith(".csv"):
+        with open(source, newline="") as f:
+            for row in csv.DictReader(f):
+                yield row.get("id") or row["path"], row["path"]
+    elif source.lower().endswith(".jsonl"):
+        with open(source) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield str(row.get("id") or row["path"]), row["path"]
+    else:
+        # glob order is directory order, so sort it (this lists every match up front)
+        for path in sorted(glob.glob(source, recursive=True)):
+            if os.path.isfile(path):
+                yield path, path
+
+def output_name(item_id: str, extension: str) -> str:
+    """Relative path for an input's enhanced image, kept inside the images directory"""
+    parts = [part for part in os.path.splitdrive(item_id)[1].replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return f"{os.path.splitext(os.path.join(*parts or ['image']))[0]}.{extension}"
+
+def write_json_atomic(path: str, value: Dict[str, Any]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(value, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class ResultWriter:
+    """Appends result rows to JSONL, or to numbered Parquet part files under a directory.
+
+    commit() makes everything written so far durable and returns the state a
+    resumed run passes to resume(), which drops rows written after it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.lower().endswith(".parquet")
+        self._rows: List[Dict[str, Any]] = []
+        self._parts = 0
+        self._file = None
+
+    def resume(self, state: Optional[Dict[str, Any]]):
+        if self.parquet:
+            os.makedirs(self.path, exist_ok=True)
+            self._parts = state["parts"] if state else 0
+            for name in os.listdir(self.path):
+                if name.endswith(".tmp") or (name.startswith("part-") and int(name[5:10]) >= self._parts):
+                    os.remove(os.path.join(self.path, name))
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._file.truncate(state["offset"] if state else 0)
+        self._file.seek(0, os.SEEK_END)
+
+    def write(self, row: Dict[str, Any]):
+        if self.parquet:
+            self._rows.append(row)
+        else:
+            self._file.write(json.dumps(row).encode("utf-8") + b"\n")
+
+    def commit(self) -> Dict[str, Any]:
+        if not self.parquet:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            return {"offset": self._file.tell()}
+
+        if self._rows:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = pa.schema([
+                ("index", pa.int64()), ("id", pa.string()), ("path", pa.string()),
+                ("raw_score", pa.float64()), ("quality_score", pa.float64()),
+                ("width", pa.int64()), ("height", pa.int64()), ("format", pa.string()),
+                ("enhanced_path", pa.string()), ("enhanced_width", pa.int64()), ("enhanced_height", pa.int64()),
+                ("error", pa.string())
+            ])
+            table = pa.Table.from_pylist(self._rows, schema=schema)
+            path = os.path.join(self.path, f"part-{self._parts:05d}.parquet")
+            pq.write_table(table, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            self._parts += 1
+            self._rows = []
+        return {"parts": self._parts}
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+class BulkRunner:
+    """Streams inputs through batched scoring and a bounded enhancement pool, writing rows in input order"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.images_dir = os.path.join(args.output_dir, "images")
+        self.checkpoint_path = os.path.join(args.output_dir, "checkpoint.json")
+        self.writer = ResultWriter(args.results or os.path.join(args.output_dir, "results.jsonl"))
+        self.enhance_executor = ThreadPoolExecutor(max_workers=args.enhance_workers, thread_name_prefix="bulk-enhance")
+        self.scorer = None
+        self.enhancer = None
+        self.encoding = None
+
+        # Counters
+        self.rows = 0
+        self.errors = 0
+        self.enhanced = 0
+
+    def load_models(self):
+        import torch
+        from models.score_inference import ImageScoreDetector
+        from models.image_enhancer import ImageEnhancer
+        from models.image_encoder import OutputEncoding
+        from models.score_store import ScoreStore
+
+        args = self.args
+        device = args.device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.scorer = ImageScoreDetector(
+            model_path=args.scorer,
+            device=device,
+            max_batch_size=args.batch_size,
+            cache=None,
+            decode_workers=args.decode_workers,
+            score_store=ScoreStore(args.score_store) if args.score_store else None
+        )
+        if args.enhance:
+            self.enhancer = ImageEnhancer(
+                model_path=args.enhancer,
+                device=device,
+                scale=args.scale,
+                num_block=args.num_block,
+                cache=None,
+                tile_workers=args.tile_workers
+            )
+            self.encoding = OutputEncoding(args.format, quality=args.quality)
+            os.makedirs(self.images_dir, exist_ok=True)
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if self.args.restart or not os.path.exists(self.checkpoint_path):
+            return {"next_index": 0, "writer": None}
+
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint["input"] != self.args.input or checkpoint["results"] != self.writer.path:
+            raise SystemExit(
+                f"{self.checkpoint_path} belongs to a run over {checkpoint['input']} -> {checkpoint['results']}; "
+                f"pass --restart to start over"
+            )
+        logger.info(f"Resuming after {checkpoint['next_index']} inputs")
+        return checkpoint
+
+    def _save_checkpoint(self, next_index: int):
+        write_json_atomic(self.checkpoint_path, {
+            "input": self.args.input,
+            "results": self.writer.path,
+            "next_index": next_index,
+            "writer": self.writer.commit(),
+            "rows": self.rows,
+            "errors": self.errors,
+            "enhanced": self.enhanced,
+            "updated_at": time.time()
+        })
+
+    def _enhance(self, item_id: str, path: str) -> Dict[str, Any]:
+        """Enhance one input and write its image (enhancement worker thread)"""
+        with open(path, "rb") as f:
+            image_bytes = f.read()
+        result = self.enhancer.enhance_sync(image_bytes, item_id, encode=False, encoding=self.encoding)
+
+        relative = output_name(item_id, self.encoding.extension)
+        output_path = os.path.join(self.images_dir, relative)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(f"{output_path}.tmp", "wb") as f:
+            self.enhancer.write_encoded(result, f, self.encoding)
+        os.replace(f"{output_path}.tmp", output_path)
+
+        width, height = result["enhancement_info"]["enhanced_size"]
+        return {"enhanced_path": relative, "enhanced_width": width, "enhanced_height": height}
+
+    def _wants_enhancement(self, row: Dict[str, Any]) -> bool:
+        if self.enhancer is None or row["error"] is not None:
+            return False
+        return self.args.enhance_below is None or row["quality_score"] < self.args.enhance_below
+
+    def _finish(self, row: Dict[str, Any], enhancement: Optional[asyncio.Future]):
+        if enhancement is not None:
+            try:
+                row.update(enhancement.result())
+                self.enhanced += 1
+            except Exception as e:
+                logger.error(f"Error enhancing {row['path']}: {e}")
+                row["error"] = f"enhance: {e}"
+        if row["error"] is not None:
+            self.errors += 1
+        self.writer.write(row)
+        self.rows += 1
+
+    async def run(self):
+        args = self.args
+        checkpoint = self._load_checkpoint()
+        start_index = checkpoint["next_index"]
+        self.writer.resume(checkpoint["writer"])
+        self.rows = checkpoint.get("rows", 0)
+        self.errors = checkpoint.get("errors", 0)
+        self.enhanced = checkpoint.get("enhanced", 0)
+
+        inputs = itertools.islice(iter_inputs(args.input), start_index, None)
+        paths: Deque[Tuple[str, str]] = deque()
+
+        def read_inputs() -> Iterator[Tuple[str, bytes]]:
+            # Runs on the scorer's decode threads, one batch ahead of the model
+            for item_id, path in inputs:
+                paths.append((item_id, path))
+                try:
+                    with open(path, "rb") as f:
+                        image_bytes = f.read()
+                except OSError as e:
+                    logger.error(f"Error reading {path}: {e}")
+                    image_bytes = b""
+                yield item_id, image_bytes
+
+        loop = asyncio.get_running_loop()
+        window: Deque[Tuple[Dict[str, Any], Optional[asyncio.Future]]] = deque()
+        max_in_flight = 2 * args.enhance_workers
+        max_rows = 4 * max_in_flight + args.batch_size
+        in_flight = 0
+        next_index = start_index
+        started = time.time()
+
+        async def drain(max_rows: int, max_enhancements: int):
+            """Write finished rows from the head of the window, waiting on it while either limit is exceeded"""
+            nonlocal in_flight, next_index
+            while window and (
+                window[0][1] is None or window[0][1].done() or len(window) > max_rows or in_flight > max_enhancements
+            ):
+                row, enhancement = window.popleft()
+                if enhancement is not None:
+                    await asyncio.wait([enhancement])
+                    in_flight -= 1
+                self._finish(row, enhancement)
+                next_index += 1
+                if (next_index - start_index) % args.checkpoint_every == 0:
+                    self._save_checkpoint(next_index)
+                    rate = (next_index - start_index) / (time.time() - started)
+                    logger.info(f"{next_index} inputs done ({rate:.1f}/s, {self.errors} errors, {self.enhanced} enhanced)")
+
+        async for scored in self.scorer.predict_many(read_inputs(), batch_size=args.batch_size):
+            item_id, path = paths.popleft()
+            info = scored.get("image_info") or {}
+            row = {column: None for column in COLUMNS}
+            row.update({
+                "index": next_index + len(window),
+                "id": item_id,
+                "path": path,
+                "raw_score": scored.get("raw_score"),
+                "quality_score": scored.get("scaled_score"),
+                "width": info.get("width"),
+                "height": info.get("height"),
+                "format": info.get("format"),
+                "error": scored.get("error")
+            })
+
+            enhancement = None
+            if self._wants_enhancement(row):
+                # Bounded pool: wait for the oldest enhancement before starting another
+                await drain(max_rows, max_in_flight - 1)
+                enhancement = loop.run_in_executor(self.enhance_executor, self._enhance, item_id, path)
+                in_flight += 1
+            window.append((row, enhancement))
+            await drain(max_rows, max_in_flight)
+
+        await drain(0, 0)
+        self._save_checkpoint(next_index)
+        logger.info(f"Done: {self.rows} rows ({self.errors} errors, {self.enhanced} enhanced), this run took {time.time() - started:.0f}s")
+
+    def close(self):
+        self.writer.close()
+        self.enhance_executor.shutdown(wait=True)
+        if self.scorer is not None:
+            self.scorer.close()
+            if self.scorer.score_store is not None:
+                self.scorer.score_store.close()
+        if self.enhancer is not None:
+            self.enhancer.close()
+
+def main(args: argparse.Namespace):
+    os.makedirs(args.output_dir, exist_ok=True)
+    runner = BulkRunner(args)
+    try:
+        runner.load_models()
+        asyncio.run(runner.run())
+    finally:
+        runner.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="Directory, glob, or .csv/.jsonl manifest with a path column")
+    parser.add_argument("--output-dir", required=True, help="Checkpoint and enhanced images go here")
+    parser.add_argument("--results", help="Results file: .jsonl, or .parquet (a directory of parts); default <output-dir>/results.jsonl")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--checkpoint-every", type=int, default=1000)
+    parser.add_argument("--scorer", default="ml_models/best_model_3.pth")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--score-store", help="SQLite score index to reuse and fill (the server's SCORE_STORE_PATH)")
+    parser.add_argument("--decode-workers", type=int, default=0, help="0 = one per core")
+    parser.add_argument("--enhance", action="store_true", help="Also enhance images and write them to <output-dir>/images")
+    parser.add_argument("--enhance-below", type=float, help="Only enhance images scoring below this")
+    parser.add_argument("--enhancer", default="ml_models/RealESRGAN_x4plus_anime_6B.pth")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--num-block", type=int, default=6)
+    parser.add_argument("--enhance-workers", type=int, default=1)
+    parser.add_argument("--tile-workers", type=int, default=0, help="0 = one per core")
+    parser.add_argument("--format", default="png", choices=("png", "webp", "jpeg"))
+    parser.add_argument("--quality", type=int)
+    parser.add_argument("--device", help="Default: cuda if available, else cpu")
+    main(parser.parse_args())
@@ -0,0 +1,332 @@
+import os
+import time
+import signal
+import logging
+import operator
+import itertools
+import threading
+from typing import Dict, Any, List, Optional
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import connection, reduction
+from multiprocessing.connection import Connection
+
+import torch
+import torch.multiprocessing as mp
+
+logger = logging.getLogger(__name__)
+
+class InferenceWorkerError(Exception):
+    """Raised when an inference worker process fails a call or dies"""
+
+def share_weights(model: torch.nn.Module) -> int:
+    """Move a model's parameters and buffers into shared memory; returns the bytes moved"""
+    shared = 0
+    for tensor in itertools.chain(model.parameters(), model.buffers()):
+        if not tensor.is_shared():
+            tensor.share_memory_()
+            shared += tensor.numel() * tensor.element_size()
+    return shared
+
+def _worker_main(models: Dict[str, Any], requests, results, threads: int):
+    """Inference worker loop: run (call_id, model name, method path, args) requests until None"""
+    # Ctrl+C goes to the whole process group; the supervisor shuts workers down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    torch.set_num_threads(threads)
+
+    while True:
+        try:
+            message = requests.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        call_id, name, method, args = message
+        try:
+            with torch.no_grad():
+                result = operator.attrgetter(method)(models[name])(*args)
+            results.send(("result", call_id, result))
+        except Exception as e:
+            results.send(("error", call_id, f"{type(e).__name__}: {e}"))
+
+def _zygote_main(models: Dict[str, Any], control, threads: int):
+    """Fork an inference worker for each (requests, results) pipe pair received until None; reply with its pid"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Exited workers are reaped by the kernel; the supervisor sees them go as EOF on their result pipe
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    while True:
+        try:
+            message = control.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        requests_fd = reduction.recv_handle(control)
+        results_fd = reduction.recv_handle(control)
+        pid = os.fork()
+        if pid == 0:
+            control.close()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            code = 0
+            try:
+                _worker_main(models, Connection(requests_fd, writable=False), Connection(results_fd, readable=False), threads)
+            except BaseException:
+                logger.exception("Inference worker failed")
+                code = 1
+            finally:
+                os._exit(code)
+
+        # Only the worker keeps these ends, so its exit closes the pipes
+        os.close(requests_fd)
+        os.close(results_fd)
+        control.send(pid)
+
+class InferencePool:
+    """Forked inference worker processes sharing the supervisor's model weights.
+
+    start() moves each model's weights into shared memory and forks a zygote,
+    a process that does nothing but fork the workers, so every worker maps the
+    same weight pages instead of holding a copy. Each worker has its own
+    request and result pipe; a call goes to the worker with the fewest calls
+    in flight, and tensors in either direction travel as shared-memory
+    handles. When a worker dies, only the calls it held fail and the zygote
+    forks a replacement; the multithreaded supervisor never forks once it is
+    serving. If the zygote is gone too, the slot is dropped and the pool is
+    marked degraded. Models must be loaded before start(); none may be loaded
+    lazily into a running pool.
+    """
+
+    def __init__(self, workers: int, threads_per_worker: int = 0, call_timeout: float = 300.0):
+        self.workers = max(1, workers)
+        cpu_count = os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker if threads_per_worker > 0 else max(1, cpu_count // self.workers)
+        self.call_timeout = call_timeout
+        self.models: Dict[str, Any] = {}
+        self.shared_bytes = 0
+
+        self._context = mp.get_context("fork")
+        self._zygote = None
+        self._control = None
+        self._zygote_lock = threading.Lock()
+        self._workers: List[Dict[str, Any]] = []
+        self._pending: Dict[int, Future] = {}
+        self._call_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector: Optional[threading.Thread] = None
+        self._closed = False
+        self.degraded = False
+
+        # Counters
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.respawns = 0
+
+    def start(self, models: Dict[str, Any]):
+        """Share the models' weights, fork the workers, then route the models' inference to them"""
+        self.models = dict(models)
+        for name, instance in self.models.items():
+            # ONNX Runtime sessions hold their weights outside torch and are rebuilt per worker
+            if isinstance(instance.model, torch.nn.Module):
+                self.shared_bytes += share_weights(instance.model)
+
+        self._control, control = self._context.Pipe()
+        self._zygote = self._context.Process(
+            target=_zygote_main,
+            args=(self.models, control, self.threads_per_worker),
+            name="inference-zygote",
+            daemon=True
+        )
+        self._zygote.start()
+        control.close()
+        self._workers = [self._spawn(index) for index in range(self.workers)]
+
+        self._collector = threading.Thread(target=self._collect, name="inference-results", daemon=True)
+        self._collector.start()
+
+        # Only the supervisor's copies are redirected; the forked workers keep running locally
+        for name, instance in self.models.items():
+            instance.attach_pool(self, name)
+
+        logger.info(
+            f"Started {self.workers} inference workers ({self.threads_per_worker} threads each) "
+            f"for {', '.join(self.models)}; {self.shared_bytes / 1e6:.0f} MB of weights shared"
+        )
+
+    def _spawn(self, index: int) -> Dict[str, Any]:
+        """Have the zygote fork worker number index with its own request and result pipes"""
+        requests_reader, requests_writer = self._context.Pipe(duplex=False)
+        results_reader, results_writer = self._context.Pipe(duplex=False)
+        try:
+            with self._zygote_lock:
+                self._control.send(index)
+                reduction.send_handle(self._control, requests_reader.fileno(), self._zygote.pid)
+                reduction.send_handle(self._control, results_writer.fileno(), self._zygote.pid)
+                pid = self._control.recv()
+        except Exception:
+            requests_writer.close()
+            results_reader.close()
+            raise
+        finally:
+            # The worker's ends; closing them here lets either side see EOF when the other goes away
+            requests_reader.close()
+            results_writer.close()
+        return {
+            "index": index,
+            "pid": pid,
+            "requests": requests_writer,
+            "results": results_reader,
+            "send_lock": threading.Lock(),
+            "calls": set()
+        }
+
+    def call(self, name: str, method: str, *args: Any) -> Any:
+        """Run models[name].<method>(*args) on the least busy worker and wait for the result"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed or not self._workers:
+                raise InferenceWorkerError("No inference workers are running")
+            worker = min(self._workers, key=lambda candidate: len(candidate["calls"]))
+            call_id = next(self._call_ids)
+            self._pending[call_id] = future
+            worker["calls"].add(call_id)
+            self.calls += 1
+
+        try:
+            with worker["send_lock"]:
+                worker["requests"].send((call_id, name, method, args))
+        except (BrokenPipeError, OSError):
+            # The worker died before taking the call; the collector fails it and replaces the worker
+            pass
+
+        try:
+            return future.result(timeout=self.call_timeout)
+        except FutureTimeoutError:
+            # The worker is still busy with it, so it stays counted in worker["calls"] until the reply comes
+            with self._lock:
+                self._pending.pop(call_id, None)
+                self.timeouts += 1
+            raise InferenceWorkerError(f"Inference call {method} on {name} timed out after {self.call_timeout:.0f}s")
+
+    def _collect(self):
+        """Resolve call futures from the workers' result pipes and replace workers that exited"""
+        while not self._closed:
+            with self._lock:
+                readers = {worker["results"]: worker for worker in self._workers}
+            try:
+                ready = connection.wait(list(readers), timeout=1.0)
+            except OSError:
+                continue
+
+            # A ready pipe at EOF is an exited worker, so steady traffic from the others can't hide it
+            for reader in ready:
+                if not self._receive(readers[reader]) and not self._closed:
+                    self._replace(readers[reader])
+
+    def _receive(self, worker: Dict[str, Any]) -> bool:
+        """Resolve the future of one result a worker sent; False once its pipe is closed"""
+        try:
+            kind, call_id, payload = worker["results"].recv()
+        except (EOFError, OSError):
+            return False
+
+        with self._lock:
+            future = self._pending.pop(call_id, None)
+            worker["calls"].discard(call_id)
+            if kind == "error":
+                self.errors += 1
+        if future is not None:
+            if kind == "error":
+                future.set_exception(InferenceWorkerError(payload))
+            else:
+                future.set_result(payload)
+        return True
+
+    def _replace(self, worker: Dict[str, Any]):
+        """Fail the calls an exited worker held and have the zygote fork a replacement in its slot"""
+        logger.error(f"Inference worker {worker['pid']} exited; starting a replacement")
+        try:
+            replacement = self._spawn(worker["index"])
+        except (EOFError, OSError) as e:
+            logger.error(f"Could not replace inference worker {worker['pid']} ({e}); the pool is degraded")
+            replacement = None
+
+        with self._lock:
+            lost = [self._pending.pop(call_id) for call_id in worker["calls"] if call_id in self._pending]
+            if replacement is not None:
+                self._workers[self._workers.index(worker)] = replacement
+                self.respawns += 1
+            else:
+                self._workers.remove(worker)
+                self.degraded = True
+            self.errors += len(lost)
+        for future in lost:
+            future.set_exception(InferenceWorkerError(f"Inference worker {worker['pid']} exited during the call"))
+
+        for connection_end in (worker["requests"], worker["results"]):
+            connection_end.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._pending)
+            pids = [worker["pid"] for worker in self._workers]
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "worker_pids": pids,
+            "alive": len(pids),
+            "degraded": self.degraded,
+            "models": list(self.models),
+            "shared_weights_mb": self.shared_bytes / (1024 * 1024),
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "respawns": self.respawns,
+            "in_flight": in_flight
+        }
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the workers after their current call, then the zygote"""
+        if self._closed:
+            return
+        self._closed = True
+
+        for worker in self._workers:
+            try:
+                with worker["send_lock"]:
+                    worker["requests"].send(None)
+            except (BrokenPipeError, OSError):
+                pass
+
+        # The collector stops within one wait; after that only this thread reads the result pipes
+        if self._collector is not None:
+            self._collector.join(timeout)
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            exited = False
+            while not exited and connection.wait([worker["results"]], max(0.0, deadline - time.monotonic())):
+                exited = not self._receive(worker)
+            if not exited:
+                try:
+                    os.kill(worker["pid"], signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for connection_end in (worker["requests"], worker["results"]):
+                connection_end.close()
+
+        if self._zygote is not None:
+            try:
+                self._control.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self._zygote.join(timeout)
+            if self._zygote.is_alive():
+                self._zygote.terminate()
+            self._control.close()
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(InferenceWorkerError("Inference pool shut down"))
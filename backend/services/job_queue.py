@@ -0,0 +1,215 @@
+import os
+import math
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from models.image_encoder import OutputEncoding
+from .model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+class JobQueueFullError(Exception):
+    """Raised when the enhancement job queue has no room for another job; retry_after is in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class EnhancementJobQueue:
+    """Background enhancement jobs on a bounded worker pool with a local spool directory.
+
+    Each job leases its enhancer variant from the model registry while it runs.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        spool_dir: str,
+        max_workers: int = 1,
+        max_pending: int = 32,
+        ttl_seconds: float = 3600.0,
+        initial_job_time: float = 30.0
+    ):
+        self.registry = registry
+        self.spool_dir = spool_dir
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        # Moving average of a job's run time, for Retry-After when the queue is full
+        self.job_time = initial_job_time
+        self.ttl_seconds = ttl_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="enhance-job")
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    def _update(self, job_id: str, **fields: Any):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def result_path(self, job_id: str) -> Optional[str]:
+        """Spool path of a finished job's image, or None if not available"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "completed":
+                return None
+            extension = job["extension"]
+        path = os.path.join(self.spool_dir, f"{job_id}.{extension}")
+        return path if os.path.exists(path) else None
+
+    def submit(
+        self,
+        image_bytes: bytes,
+        filename: str,
+        encoding: Optional[OutputEncoding] = None,
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Queue an enhancement job and return its initial status"""
+        # Fail fast on unknown model names instead of when the job runs
+        model = self.registry.resolve("enhancer", model)
+
+        with self._lock:
+            pending = sum(1 for job in self.jobs.values() if job["status"] in ("queued", "running"))
+            if pending >= self.max_pending:
+                raise JobQueueFullError(
+                    f"Enhancement queue is full ({pending} jobs pending)",
+                    max(1, math.ceil(self.job_time * pending / max(1, self.max_workers)))
+                )
+
+            encoding = encoding or OutputEncoding()
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "filename": filename,
+                "model": model,
+                "media_type": encoding.media_type,
+                "extension": encoding.extension,
+                "status": "queued",
+                "stage": "queued",
+                "progress": 0.0,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+                "result": None
+            }
+            job = dict(self.jobs[job_id])
+
+        self.executor.submit(self._run, job_id, image_bytes, filename, encoding, model)
+        return job
+
+    def _run(self, job_id: str, image_bytes: bytes, filename: str, encoding: OutputEncoding, model: str):
+        """Run one job on a worker thread and spool its output"""
+        started_at = time.time()
+        self._update(job_id, status="running", stage="starting", started_at=started_at)
+
+        def on_progress(progress: float, stage: str):
+            self._update(job_id, progress=progress, stage=stage)
+
+        try:
+            on_progress(0.0, "loading model")
+            with self.registry.lease("enhancer", model) as enhancer:
+                result = enhancer.enhance_sync(
+                    image_bytes,
+                    filename,
+                    progress_callback=on_progress,
+                    encode=False,
+                    encoding=encoding
+                )
+
+                # Encode straight into the spool file; write atomically so readers never see a partial file
+                on_progress(0.9, "encoding")
+                path = os.path.join(self.spool_dir, f"{job_id}.{encoding.extension}")
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    enhancer.write_encoded(result, f, encoding)
+                os.replace(tmp_path, path)
+
+            with self._lock:
+                self.job_time = 0.8 * self.job_time + 0.2 * (time.time() - started_at)
+
+            self._update(
+                job_id,
+                status="completed",
+                stage="completed",
+                progress=1.0,
+                finished_at=time.time(),
+                result={
+                    "original_info": result["original_info"],
+                    "enhancement_info": result["enhancement_info"],
+                    "output_encoding": result["output_encoding"],
+                    "processing_time": result["total_processing_time"],
+                    "size_bytes": os.path.getsize(path)
+                }
+            )
+            logger.info(f"Enhancement job {job_id} completed")
+
+        except Exception as e:
+            logger.error(f"Enhancement job {job_id} failed: {e}")
+            self._update(job_id, status="failed", stage="failed", finished_at=time.time(), error=str(e))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current status of a job, or None if unknown or expired"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def cleanup_expired(self) -> int:
+        """Drop finished jobs and spool files older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job["finished_at"] is not None and job["finished_at"] < cutoff
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+            known = set(self.jobs)
+
+        # Also sweeps files left over from a previous process
+        for name in os.listdir(self.spool_dir):
+            job_id = name.split(".", 1)[0]
+            if job_id in known:
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+
+        if removed or expired:
+            logger.info(f"Cleaned up {len(expired)} expired jobs and {removed} spool files")
+        return removed
+
+    async def run_cleanup(self, interval: float = 60.0):
+        """Periodically expire old jobs (run as a background task)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.cleanup_expired)
+            except Exception as e:
+                logger.error(f"Error cleaning up enhancement jobs: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Count jobs by status"""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"jobs": counts, "max_pending": self.max_pending, "ttl_seconds": self.ttl_seconds}
+
+    def shutdown(self):
+        """Stop accepting work; running jobs finish in the background"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
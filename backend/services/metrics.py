@@ -0,0 +1,90 @@
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, ProcessCollector
+except ImportError:
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages timed per request
+STAGES = ("upload_read", "decode", "preprocess", "queue_wait", "forward", "encode", "serialize")
+
+# Seconds, from a cache-hit encode (~1ms) to a large enhancement (~1min)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class PipelineMetrics:
+    """Prometheus histograms of per-stage latency by endpoint and model, queue depth gauges and admission waits/rejections.
+
+    Uses its own registry (with the process collector for RSS and CPU) so
+    only these series are exported. When disabled, or without prometheus_client
+    installed, every call is a no-op and enabled is False.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled and prometheus_client is not None
+        if enabled and prometheus_client is None:
+            logger.warning("prometheus_client is not installed, /metrics is disabled")
+        if not self.enabled:
+            return
+
+        self.registry = CollectorRegistry()
+        ProcessCollector(registry=self.registry)
+        self.stage_seconds = Histogram(
+            "pipeline_stage_seconds",
+            "Time spent in each request pipeline stage",
+            ["endpoint", "model", "stage"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry
+        )
+        self.queue_depth = Gauge(
+            "queue_depth",
+            "Requests waiting (or running, for executors) in each queue",
+            ["queue"],
+            registry=self.registry
+        )
+        self.admission_wait = Histogram(
+            "admission_wait_seconds",
+            "Time enhancement requests waited for admission",
+            ["model"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry
+        )
+        self.admission_rejections = Counter(
+            "admission_rejections",
+            "Enhancement requests rejected by admission control",
+            ["model", "reason"],
+            registry=self.registry
+        )
+
+    def observe(self, endpoint: str, model: str, stage: str, seconds: Optional[float]):
+        """Record one stage duration; None (stage skipped, e.g. on a cache hit) is ignored"""
+        if self.enabled and seconds is not None:
+            self.stage_seconds.labels(endpoint, model, stage).observe(seconds)
+
+    def observe_admission(self, model: str, seconds: float):
+        if self.enabled:
+            self.admission_wait.labels(model).observe(seconds)
+
+    def count_rejection(self, model: str, reason: str):
+        """Count an admission rejection: queue_full (429) or too_large (413)"""
+        if self.enabled:
+            self.admission_rejections.labels(model, reason).inc()
+
+    @contextmanager
+    def time(self, endpoint: str, model: str, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(endpoint, model, stage, time.perf_counter() - start)
+
+    def render(self, queue_depths: Dict[str, int]) -> Tuple[bytes, str]:
+        """Exposition-format body and content type, with the queue gauges refreshed"""
+        for queue, depth in queue_depths.items():
+            self.queue_depth.labels(queue).set(depth)
+        return prometheus_client.generate_latest(self.registry), prometheus_client.CONTENT_TYPE_LATEST
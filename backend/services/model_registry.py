@@ -0,0 +1,242 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Callable, Iterator, AsyncIterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class UnknownModelError(Exception):
+    """Raised when a request names a model that is not registered"""
+
+class ModelRegistry:
+    """Named model variants loaded lazily on first use and evicted LRU-first.
+
+    Each entry has a factory that builds the model wrapper. Concurrent first
+    uses of the same name wait on one load. Models in use are pinned; once the
+    resident models exceed max_bytes the least recently used idle ones are
+    closed and dropped (0 = no budget).
+    """
+
+    def __init__(self, max_bytes: int = 0, load_workers: int = 4):
+        self.max_bytes = max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=load_workers, thread_name_prefix="model-load")
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._defaults: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.loads = 0
+        self.evictions = 0
+
+    def register(self, name: str, kind: str, factory: Callable[[], Any], default: bool = False, **details: Any):
+        """Add a model variant; details are reported as-is in get_info()"""
+        with self._lock:
+            self._entries[name] = {
+                "name": name,
+                "kind": kind,
+                "factory": factory,
+                "details": details,
+                "instance": None,
+                "size_bytes": 0,
+                "in_use": 0,
+                "loads": 0,
+                "last_used": None,
+                "load_time": None,
+                "load_lock": threading.Lock()
+            }
+            if default or kind not in self._defaults:
+                self._defaults[kind] = name
+
+    def resolve(self, kind: str, name: Optional[str] = None) -> str:
+        """Name of the requested model of a kind, or the kind's default"""
+        with self._lock:
+            name = name or self._defaults.get(kind)
+            entry = self._entries.get(name) if name else None
+            if entry is None or entry["kind"] != kind:
+                available = ", ".join(n for n, e in self._entries.items() if e["kind"] == kind)
+                raise UnknownModelError(f"Unknown {kind} model '{name}' (available: {available})")
+            return name
+
+    def kind_of(self, name: str) -> str:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                raise UnknownModelError(f"Unknown model '{name}'")
+            return entry["kind"]
+
+    def details(self, name: str) -> Dict[str, Any]:
+        """Registration details of a model (its catalog spec)"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                raise UnknownModelError(f"Unknown model '{name}'")
+            return dict(entry["details"])
+
+    def names(self, kind: str) -> List[str]:
+        with self._lock:
+            return [name for name, entry in self._entries.items() if entry["kind"] == kind]
+
+    def loaded(self, kind: str) -> Dict[str, Any]:
+        """Resident instances of a kind by name, without pinning them"""
+        with self._lock:
+            return {
+                name: entry["instance"] for name, entry in self._entries.items()
+                if entry["kind"] == kind and entry["instance"] is not None
+            }
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry is not None and entry["instance"] is not None
+
+    def acquire(self, kind: str, name: Optional[str] = None) -> Any:
+        """Pin a model and return it, loading it first if needed (blocking)"""
+        name = self.resolve(kind, name)
+        with self._lock:
+            entry = self._entries[name]
+            # Pinned before loading so a concurrent eviction can't drop it mid-load
+            entry["in_use"] += 1
+
+        try:
+            with entry["load_lock"]:
+                if entry["instance"] is None:
+                    self._load(entry)
+        except Exception:
+            self.release(name)
+            raise
+
+        with self._lock:
+            instance = entry["instance"]
+            entry["last_used"] = time.time()
+            self._entries.move_to_end(name)
+            evicted = self._evict_over_budget()
+        self._close(evicted)
+        return instance
+
+    def release(self, name: str):
+        """Unpin a model; evicts idle models if the budget is exceeded"""
+        with self._lock:
+            self._entries[name]["in_use"] -= 1
+            evicted = self._evict_over_budget()
+        self._close(evicted)
+
+    @contextmanager
+    def lease(self, kind: str, name: Optional[str] = None) -> Iterator[Any]:
+        """Use a model from a worker thread"""
+        name = self.resolve(kind, name)
+        instance = self.acquire(kind, name)
+        try:
+            yield instance
+        finally:
+            self.release(name)
+
+    @asynccontextmanager
+    async def alease(self, kind: str, name: Optional[str] = None) -> AsyncIterator[Any]:
+        """Use a model from the event loop; loads run on the registry's executor"""
+        name = self.resolve(kind, name)
+        loop = asyncio.get_running_loop()
+        acquired = loop.run_in_executor(self.executor, self.acquire, kind, name)
+        try:
+            instance = await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # The load carries on without us; unpin the model once it's done
+            acquired.add_done_callback(
+                lambda done: self.release(name) if not done.cancelled() and done.exception() is None else None
+            )
+            raise
+        try:
+            yield instance
+        finally:
+            self.release(name)
+
+    def _load(self, entry: Dict[str, Any]):
+        """Build a model (caller holds its load lock)"""
+        start_time = time.time()
+        logger.info(f"Loading {entry['kind']} model '{entry['name']}'...")
+        instance = entry["factory"]()
+        size_bytes = instance.memory_bytes() if hasattr(instance, "memory_bytes") else 0
+
+        with self._lock:
+            entry["instance"] = instance
+            entry["size_bytes"] = size_bytes
+            entry["loads"] += 1
+            entry["load_time"] = time.time() - start_time
+            self.loads += 1
+        logger.info(f"Loaded '{entry['name']}' ({size_bytes / 1e6:.1f} MB) in {entry['load_time']:.2f}s")
+
+    def _resident_bytes(self) -> int:
+        return sum(entry["size_bytes"] for entry in self._entries.values() if entry["instance"] is not None)
+
+    def _evict_over_budget(self) -> List[Tuple[str, Any]]:
+        """Drop idle models, least recently used first, until within budget (caller holds the lock)"""
+        evicted = []
+        if self.max_bytes <= 0:
+            return evicted
+
+        resident = self._resident_bytes()
+        for entry in list(self._entries.values()):
+            if resident <= self.max_bytes:
+                break
+            if entry["instance"] is None or entry["in_use"] > 0:
+                continue
+            evicted.append((entry["name"], entry["instance"]))
+            entry["instance"] = None
+            resident -= entry["size_bytes"]
+            self.evictions += 1
+
+        if resident > self.max_bytes:
+            logger.warning(f"Resident models use {resident / 1e6:.0f} MB, over the {self.max_bytes / 1e6:.0f} MB budget")
+        return evicted
+
+    def _close(self, evicted: List[Tuple[str, Any]]):
+        for name, instance in evicted:
+            logger.info(f"Unloading model '{name}'")
+            try:
+                if hasattr(instance, "close"):
+                    instance.close()
+            except Exception as e:
+                logger.error(f"Error closing model '{name}': {e}")
+
+    def get_info(self) -> Dict[str, Any]:
+        """Registered models with residency, size and usage"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+            resident = self._resident_bytes()
+            defaults = dict(self._defaults)
+
+        models = {}
+        for entry in entries:
+            instance = entry["instance"]
+            models[entry["name"]] = {
+                "kind": entry["kind"],
+                "default": defaults.get(entry["kind"]) == entry["name"],
+                "loaded": instance is not None,
+                "in_use": entry["in_use"],
+                "size_mb": entry["size_bytes"] / (1024 * 1024) if instance is not None else None,
+                "loads": entry["loads"],
+                "last_load_time": entry["load_time"],
+                "last_used": entry["last_used"],
+                **entry["details"],
+                "info": instance.get_model_info() if instance is not None else None
+            }
+
+        return {
+            "models": models,
+            "resident_mb": resident / (1024 * 1024),
+            "budget_mb": self.max_bytes / (1024 * 1024) if self.max_bytes > 0 else None,
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
+
+    def shutdown(self):
+        """Close every loaded model"""
+        with self._lock:
+            evicted = [(name, entry["instance"]) for name, entry in self._entries.items() if entry["instance"] is not None]
+            for entry in self._entries.values():
+                entry["instance"] = None
+        self._close(evicted)
+        self.executor.shutdown(wait=False)
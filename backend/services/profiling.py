@@ -0,0 +1,206 @@
+import os
+import sys
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TORCH_TRACE_SUFFIX = ".pt.trace.json.gz"
+STACKS_SUFFIX = ".stacks.folded"
+
+# Leaf frames of threads parked waiting for work, left out of the stack samples
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+class StackSampler:
+    """Samples the Python stack of every thread on an interval into collapsed-stack counts.
+
+    A request's decode, tiles and encode run on executor threads, which
+    cProfile (one thread per profiler) can't follow; sampling covers them all.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write(self, path: str):
+        """Write flamegraph.pl / speedscope collapsed stacks, one 'frames count' line each"""
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+class RequestProfiler:
+    """Profiles sampled requests under torch.profiler plus a stack sampler.
+
+    Every sample_every-th request (0 = none) is profiled, as is any request the
+    caller forces. One request is profiled at a time; others arriving meanwhile
+    run unprofiled. Traces are written to directory, dropping the oldest once
+    they exceed max_bytes.
+    """
+
+    def __init__(self, directory: str, sample_every: int = 0, max_bytes: int = 256 * 1024 * 1024, interval: float = 0.005):
+        self.directory = directory
+        self.sample_every = sample_every
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._active = False
+        self._seen = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.profiled = 0
+        self.skipped_busy = 0
+        self.failures = 0
+        self.evictions = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def should_profile(self, forced: bool = False) -> bool:
+        """Count a request and decide whether it is sampled"""
+        self._seen += 1
+        return forced or (self.sample_every > 0 and self._seen % self.sample_every == 0)
+
+    @asynccontextmanager
+    async def profile(self, label: str) -> AsyncIterator[Optional[str]]:
+        """Profile the enclosed work; yields the trace id, or None if another profile is running"""
+        if self._active:
+            self.skipped_busy += 1
+            yield None
+            return
+
+        self._active = True
+        trace_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{label.strip('/').replace('/', '_')}-{uuid.uuid4().hex[:8]}"
+        try:
+            torch_profiler = self._start_torch_profiler()
+        except Exception as e:
+            logger.warning(f"torch.profiler unavailable, profile {trace_id} has stack samples only: {e}")
+            torch_profiler = None
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        try:
+            yield trace_id
+        finally:
+            sampler.stop()
+            if torch_profiler is not None:
+                torch_profiler.__exit__(None, None, None)
+            try:
+                # Exporting a large trace takes a while; keep it off the event loop
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._write, trace_id, torch_profiler, sampler)
+                self.profiled += 1
+                logger.info(f"Wrote profile {trace_id} ({sampler.samples} stack samples)")
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Failed to write profile {trace_id}: {e}")
+            finally:
+                self._active = False
+
+    def _start_torch_profiler(self):
+        try:
+            import torch
+        except ImportError:
+            return None
+
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        torch_profiler = torch.profiler.profile(activities=activities)
+        torch_profiler.__enter__()
+        return torch_profiler
+
+    def _write(self, trace_id: str, torch_profiler, sampler: StackSampler):
+        base = os.path.join(self.directory, trace_id)
+        sampler.write(f"{base}{STACKS_SUFFIX}")
+        if torch_profiler is not None:
+            torch_profiler.export_chrome_trace(f"{base}{TORCH_TRACE_SUFFIX}")
+        self._trim()
+
+    def _trim(self):
+        """Drop the oldest trace files once the size cap is exceeded"""
+        with self._lock:
+            entries = []
+            total = 0
+            for trace in self.list_traces():
+                entries.append((trace["modified"], trace["size"], trace["name"]))
+                total += trace["size"]
+
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def list_traces(self) -> List[Dict[str, Any]]:
+        """Trace files on disk, newest first"""
+        traces = []
+        for name in os.listdir(self.directory):
+            if not name.endswith((TORCH_TRACE_SUFFIX, STACKS_SUFFIX)):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            traces.append({"name": name, "size": stat.st_size, "modified": stat.st_mtime})
+        return sorted(traces, key=lambda trace: trace["modified"], reverse=True)
+
+    def trace_path(self, name: str) -> Optional[str]:
+        """Path of a listed trace file, or None for unknown (or path-like) names"""
+        if os.path.basename(name) != name or not name.endswith((TORCH_TRACE_SUFFIX, STACKS_SUFFIX)):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "sample_every": self.sample_every,
+            "active": self._active,
+            "profiled": self.profiled,
+            "skipped_busy": self.skipped_busy,
+            "failures": self.failures,
+            "evictions": self.evictions,
+            "max_mb": self.max_bytes / (1024 * 1024)
+        }
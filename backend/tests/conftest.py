@@ -0,0 +1,118 @@
+import glob
+import io
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Tiny bundled sample set: smooth color fields with grain, 48-96 px per side
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+@pytest.fixture(scope="session")
+def sample_paths():
+    return sorted(glob.glob(os.path.join(DATA_DIR, "*.png")))
+
+@pytest.fixture(scope="session")
+def sample_images(sample_paths):
+    images = []
+    for path in sample_paths:
+        with open(path, "rb") as f:
+            images.append(f.read())
+    return images
+
+@pytest.fixture(scope="session")
+def sample_arrays(sample_images):
+    """The samples decoded to (H, W, 3) uint8 RGB arrays"""
+    np = pytest.importorskip("numpy")
+    Image = pytest.importorskip("PIL.Image")
+    return [np.array(Image.open(io.BytesIO(data)).convert("RGB")) for data in sample_images]
+
+@pytest.fixture(scope="session")
+def gates():
+    """Gate thresholds: the benchmarks' defaults, looser only where the fixed random weights need it"""
+    return SimpleNamespace(
+        preprocess_score_tolerance=0.1,  # preprocess_benchmark.SCORE_TOLERANCE
+        int8_max_mae=0.5,  # quantization_benchmark --max-mae is 0.15 for the trained scorer
+        min_psnr=40.0,  # enhancer_precision --min-psnr
+        bf16_min_psnr=30.0,
+        onnx_score_tolerance=0.01,  # backend_benchmark --score-tolerance
+        onnx_max_pixel_diff=2  # backend_benchmark --max-pixel-diff
+    )
+
+@pytest.fixture(scope="session")
+def score_samples():
+    """Score encoded images through a detector's fast preprocessing in one batch; returns scaled scores"""
+    torch = pytest.importorskip("torch")
+    from models.decoded_image import DecodedImage
+
+    def score(detector, images):
+        batch = torch.cat([detector.preprocessor.load_tensor(DecodedImage.from_bytes(data)) for data in images], dim=0)
+        return [result["scaled_score"] for result in detector._predict_batch(batch)]
+
+    return score
+
+@pytest.fixture(scope="session")
+def scorer_checkpoint(tmp_path_factory):
+    """ResNet18 regression-head checkpoint with fixed random weights (same layout as the trained scorer)"""
+    torch = pytest.importorskip("torch")
+    models = pytest.importorskip("torchvision.models")
+
+    torch.manual_seed(0)
+    model = models.resnet18(weights=None).eval()
+    model.fc = torch.nn.Linear(model.fc.in_features, 1)
+
+    # Rescale the head so raw scores spread around 0 and scaled scores land
+    # mid-range rather than clamped at 0 or 10, where differences vanish
+    with torch.no_grad():
+        raw = model(torch.randn(8, 3, 224, 224)).view(-1)
+        spread = raw.std() * 4
+        model.fc.weight /= spread
+        model.fc.bias.copy_((model.fc.bias - raw.mean()) / spread)
+    path = tmp_path_factory.mktemp("scorer") / "scorer.pth"
+    torch.save(model.state_dict(), path)
+    return str(path)
+
+@pytest.fixture(scope="session")
+def enhancer_settings(tmp_path_factory):
+    """ImageEnhancer arguments for a one-block x4 RRDBNet with fixed random weights"""
+    torch = pytest.importorskip("torch")
+    rrdbnet_arch = pytest.importorskip("basicsr.archs.rrdbnet_arch")
+
+    torch.manual_seed(0)
+    model = rrdbnet_arch.RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=1, num_grow_ch=32, scale=4)
+    path = tmp_path_factory.mktemp("enhancer") / "enhancer.pth"
+    torch.save({"params_ema": model.state_dict()}, path)
+    return {"model_path": str(path), "scale": 4, "num_block": 1}
+
+@pytest.fixture
+def make_scorer(scorer_checkpoint):
+    """Build scorers on the test checkpoint; they are closed after the test"""
+    from models.score_inference import ImageScoreDetector
+
+    made = []
+
+    def make(**kwargs):
+        made.append(ImageScoreDetector(model_path=scorer_checkpoint, device="cpu", cache=None, **kwargs))
+        return made[-1]
+
+    yield make
+    for detector in made:
+        detector.close()
+
+@pytest.fixture
+def make_enhancer(enhancer_settings):
+    """Build enhancers on the test checkpoint; they are closed after the test"""
+    from models.image_enhancer import ImageEnhancer
+
+    made = []
+
+    def make(**kwargs):
+        made.append(ImageEnhancer(device="cpu", cache=None, tile_workers=1, **enhancer_settings, **kwargs))
+        return made[-1]
+
+    yield make
+    for enhancer in made:
+        enhancer.close()
@@ -0,0 +1,29 @@
+import argparse
+
+import pytest
+
+pytest.importorskip("torch")
+np = pytest.importorskip("numpy")
+
+from benchmarks.backend_benchmark import parity_diffs, parity_failures
+
+def test_onnx_matches_torch(scorer_checkpoint, enhancer_settings, sample_images, sample_arrays,
+                            make_scorer, make_enhancer, score_samples, gates):
+    pytest.importorskip("onnxruntime")
+    from models import onnx_export
+
+    for kind, model_path in (("scorer", scorer_checkpoint), ("enhancer", enhancer_settings["model_path"])):
+        onnx_export.main(argparse.Namespace(
+            kind=kind, model=model_path, scale=enhancer_settings["scale"], num_block=enhancer_settings["num_block"],
+            atol=1e-3, output=None
+        ))
+
+    scores, pixels = {}, {}
+    for backend in ("torch", "onnx"):
+        scorer = make_scorer(backend=backend)
+        assert scorer.get_model_info()["backend"] == backend
+        scores[backend] = score_samples(scorer, sample_images)
+        pixels[backend] = np.array(make_enhancer(backend=backend).tile_engine.enhance(sample_arrays[0]))
+
+    score_diff, pixel_diff = parity_diffs(scores["onnx"], scores["torch"], pixels["onnx"], pixels["torch"])
+    assert parity_failures("onnx", score_diff, pixel_diff, gates.onnx_score_tolerance, gates.onnx_max_pixel_diff) == []
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("torch")
+np = pytest.importorskip("numpy")
+
+from benchmarks.enhancer_precision import fidelity_failures, psnr
+
+TILE_SIZES = [32, 64]
+
+def test_settings_within_fidelity_gate(sample_arrays, make_enhancer, gates):
+    from models.tile_engine import TileEngine, bf16_supported
+
+    inputs = sample_arrays[:3]
+    settings = [("fp32", "contiguous"), ("fp32", "channels_last")]
+    if bf16_supported():
+        settings.append(("bf16", "channels_last"))
+
+    # Same procedure as the benchmark: fp32 contiguous at each tile size is the reference
+    references, fidelity = {}, {}
+    for precision, memory_format in settings:
+        enhancer = make_enhancer(precision=precision, memory_format=memory_format)
+        for tile_size in TILE_SIZES:
+            engine = TileEngine(
+                enhancer.model, scale=enhancer.scale, tile_size=tile_size, tile_pad=enhancer.tile_pad,
+                workers=1, precision=precision, memory_format=memory_format
+            )
+            outputs = [np.array(engine.enhance(image)) for image in inputs]
+            engine.shutdown()
+
+            reference = references.setdefault(tile_size, outputs)
+            fidelity[(precision, memory_format, tile_size)] = min(psnr(a, b) for a, b in zip(reference, outputs))
+
+    assert outputs[0].shape == (inputs[0].shape[0] * 4, inputs[0].shape[1] * 4, 3)
+    assert fidelity_failures(fidelity, ["fp32:channels_last"], TILE_SIZES, gates.min_psnr) == []
+    if bf16_supported():
+        assert fidelity_failures(fidelity, ["bf16:channels_last"], TILE_SIZES, gates.bf16_min_psnr) == []
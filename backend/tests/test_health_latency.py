@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.health_latency import percentile, probe_loop, responsiveness_failure
+
+# Same bound as the load test's --max-p99-increase-ms default
+MAX_P99_INCREASE_MS = 250.0
+PROBE_INTERVAL = 0.005
+
+async def loop_delays(work):
+    """Event loop wake-up delays sampled while work() runs"""
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop(stop, PROBE_INTERVAL))
+    await asyncio.sleep(PROBE_INTERVAL * 4)
+    try:
+        await work()
+    finally:
+        stop.set()
+    return await probe
+
+def idle_and_loaded(work):
+    async def measure():
+        idle = await loop_delays(lambda: asyncio.sleep(0.2))
+        loaded = await loop_delays(work)
+        return idle, loaded
+
+    return asyncio.run(measure())
+
+def test_percentile():
+    values = [0.5, 0.1, 0.4, 0.2, 0.3]
+    assert percentile(values, 50) == 0.3
+    assert percentile(values, 99) == 0.5
+    assert percentile([0.7], 99) == 0.7
+
+def test_responsiveness_gate():
+    idle = [0.001] * 100
+    assert responsiveness_failure(idle, [0.002] * 100, MAX_P99_INCREASE_MS) is None
+    assert "above idle" in responsiveness_failure(idle, [0.001] * 98 + [2.0] * 2, MAX_P99_INCREASE_MS)
+    assert responsiveness_failure(idle, [], MAX_P99_INCREASE_MS) is not None
+
+def test_check_catches_a_blocked_loop():
+    async def blocking():
+        time.sleep(0.5)
+
+    idle, loaded = idle_and_loaded(blocking)
+    assert responsiveness_failure(idle, loaded, MAX_P99_INCREASE_MS) is not None
+
+def test_scoring_keeps_the_loop_responsive(scorer_checkpoint, sample_images):
+    from models.score_inference import ImageScoreDetector
+
+    detector = ImageScoreDetector(model_path=scorer_checkpoint, device="cpu", cache=None)
+    try:
+        async def score_all():
+            results = await asyncio.gather(*[
+                detector.predict(image, f"sample_{i}.png") for i, image in enumerate(sample_images * 4)
+            ])
+            assert all(0.0 <= result["scaled_score"] <= 10.0 for result in results)
+
+        idle, loaded = idle_and_loaded(score_all)
+    finally:
+        detector.close()
+    assert responsiveness_failure(idle, loaded, MAX_P99_INCREASE_MS) is None
+
+def test_complete_processing_keeps_the_loop_responsive(scorer_checkpoint, enhancer_settings, sample_images):
+    from models.score_inference import ImageScoreDetector
+    from models.image_enhancer import ImageEnhancer
+
+    # The /process/complete stages: scoring the original while it is enhanced
+    detector = ImageScoreDetector(model_path=scorer_checkpoint, device="cpu", cache=None)
+    enhancer = ImageEnhancer(device="cpu", cache=None, tile_workers=1, **enhancer_settings)
+    try:
+        async def process_all():
+            for i, image in enumerate(sample_images[:2]):
+                score, enhanced = await asyncio.gather(
+                    detector.predict(image, f"sample_{i}.png"),
+                    enhancer.enhance(image, f"sample_{i}.png")
+                )
+                assert 0.0 <= score["scaled_score"] <= 10.0
+                assert enhanced["enhanced_image_bytes"]
+
+        idle, loaded = idle_and_loaded(process_all)
+    finally:
+        enhancer.close()
+        detector.close()
+    assert responsiveness_failure(idle, loaded, MAX_P99_INCREASE_MS) is None
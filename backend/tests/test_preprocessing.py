@@ -0,0 +1,39 @@
+import io
+
+import pytest
+
+pytest.importorskip("torch")
+Image = pytest.importorskip("PIL.Image")
+
+from models.decoded_image import DecodedImage
+
+# Enough that a JPEG of the sample decodes at half size and still covers the draft size
+JPEG_UPSCALE = 24
+
+def max_score_diff(detector, images):
+    """Largest |fast - reference preprocessing| on the scaled score over encoded images"""
+    worst = 0.0
+    for data in images:
+        reference = detector._predict_batch(detector._preprocess_reference(DecodedImage.from_bytes(data)))[0]
+        fast = detector._predict_batch(detector._preprocess_image(DecodedImage.from_bytes(data)))[0]
+        worst = max(worst, abs(fast["scaled_score"] - reference["scaled_score"]))
+    return worst
+
+def test_fast_preprocessing_within_tolerance(sample_images, make_scorer, gates):
+    assert max_score_diff(make_scorer(), sample_images) <= gates.preprocess_score_tolerance
+
+def test_draft_decode_within_tolerance(sample_arrays, make_scorer, gates):
+    detector = make_scorer()
+    jpegs = []
+    for array in sample_arrays:
+        height, width = array.shape[:2]
+        image = Image.fromarray(array).resize((width * JPEG_UPSCALE, height * JPEG_UPSCALE), Image.Resampling.BICUBIC)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        jpegs.append(buffer.getvalue())
+
+    draft = DecodedImage.from_bytes(jpegs[0]).open_draft(detector.preprocessor.draft_size)
+    assert draft.width < sample_arrays[0].shape[1] * JPEG_UPSCALE
+    assert min(draft.size) >= detector.preprocessor.draft_size
+
+    assert max_score_diff(detector, jpegs) <= gates.preprocess_score_tolerance
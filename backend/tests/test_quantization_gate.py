@@ -0,0 +1,27 @@
+import argparse
+import os
+
+import pytest
+
+pytest.importorskip("torch")
+
+from benchmarks.quantization_benchmark import accuracy_failure, score_drift
+
+def test_int8_scores_within_gate(scorer_checkpoint, sample_paths, sample_images, make_scorer, score_samples, gates):
+    from models import quantization
+
+    # Calibrate on the first half of the sample set and gate on the other half
+    calibration = len(sample_paths) // 2
+    images = os.path.join(os.path.dirname(sample_paths[0]), f"sample_[0-{calibration - 1}].png")
+    quantization.main(argparse.Namespace(model=scorer_checkpoint, images=images, count=calibration, batch_size=2, output=None))
+
+    int8 = make_scorer(precision="int8")
+    assert int8.get_model_info()["precision"] == "int8"
+
+    reference = score_samples(make_scorer(), sample_images[calibration:])
+    mae, _ = score_drift(reference, score_samples(int8, sample_images[calibration:]))
+    assert accuracy_failure(mae, gates.int8_max_mae) is None
+
+    # A uniform one-point shift is far outside the gate
+    shifted, _ = score_drift(reference, [score + 1.0 for score in reference])
+    assert accuracy_failure(shifted, gates.int8_max_mae) is not None